@@ -1,117 +1,626 @@
+import os
+import sys
 import argparse
-from modules.log_reader import LogReader
-from modules.log_analyzer import LogAnalyzer
-from modules.log_ai import LogAI  # Importer la classe LogAI pour l'option GPT
-from modules.notification import Notification  # Import de la classe Notification
+from modules.etat_lecture import EtatLecture  # État de lecture pour le mode incrémental
+from modules.persistance import BaseEvenements
+from modules.metriques import Metriques, ServeurMetriques, profiler  # Instrumentation des étapes
+# Les modules qui chargent NumPy, pandas, matplotlib, le client OpenAI, l'envoi d'e-mails ou asyncio
+# (lecture et extraction, cache, suivi des fichiers, analyse, détection, GPT, notification, syslog) sont
+# importés dans les fonctions qui s'en servent : une exécution ne charge que ce dont elle a besoin, et le
+# lancement reste rapide, pour --help et le rapport notamment (voir benchmark.py --demarrage).
 import schedule
 import time  # Nécessaire pour le délai entre les exécutions
 from datetime import datetime # pour afficher l'heure entre les exécutions
 
-def analyser_logs(args):
+def analyser_logs(args, metriques=None):
     """
     Fonction principale d'analyse des logs. Cette fonction sera appelée à chaque exécution programmée.
-    Elle prend les arguments fournis en ligne de commande via l'objet args.
+    Elle prend les arguments fournis en ligne de commande via l'objet args ; la durée de chaque étape
+    et les volumes traités sont enregistrés dans les métriques (cumulées d'une exécution à l'autre).
     """
+    from modules.log_reader import LogReader  # Charge NumPy
+    from modules.cache_evenements import CacheEvenements  # Cache des événements extraits des fichiers inchangés
+
+    if metriques is None:
+        metriques = Metriques()
     print(f"\nDémarrage de l'analyse des logs à {datetime.now()}")
 
+    # En mode incrémental (explicite ou planifié), ne lire que les octets ajoutés depuis la dernière exécution
+    etat = None
+    if args.incremental or args.planifier:
+        etat = EtatLecture(args.fichier_etat, fenetre=args.intervalle)
+
+    # Cache des événements déjà extraits des fichiers inchangés (lecture complète uniquement)
+    cache = None
+    if etat is None and not args.no_cache:
+        cache = CacheEvenements(reconstruire=args.rebuild_cache)
+
     # Créer une instance de LogReader avec le chemin du répertoire
-    lecteur = LogReader(args.repertoire)
+    lecteur = LogReader(args.repertoire, etat=etat, cache=cache)
 
     # Trouver tous les fichiers de logs correspondant au pattern dans le répertoire
     fichiers_logs = lecteur.trouver_fichiers_logs(pattern=args.pattern)
+    metriques.definir('fichiers_trouves', len(fichiers_logs))
 
     # Si des fichiers de logs sont trouvés, les lire un par un et extraire les informations
     if fichiers_logs:
         for fichier_log in fichiers_logs:
             print(f"\nLecture du fichier : {fichier_log}")
 
-        # Option 1 : Utiliser GPT pour analyser les logs avec OpenAI (si --use-gpt est spécifié)
-        if args.use_gpt:
-            print("\nAnalyse des logs avec GPT via l'API OpenAI...")
+        with metriques.etape('extraction', workers=args.workers):
+            if args.workers > 1:
+                # Lire et extraire les informations des fichiers de logs sur plusieurs processus
+                lecteur.lire_et_extraire_logs_parallele(fichiers_logs, args.workers)
+            else:
+                for fichier_log in fichiers_logs:
+                    lecteur.lire_et_extraire_logs(fichier_log)  # Lire et extraire les informations du fichier de logs
+        enregistrer_extraction(metriques, lecteur.colonnes, len(lecteur.colonnes) - lecteur.nb_evenements_recents)
+        # Avec --use-gpt, la détection locale a lieu d'abord : seules les adresses IP qu'elle retient sont
+        # résumées et soumises à GPT (voir confirmer_avec_gpt)
+        print("\nAnalyse des logs avec les méthodes traditionnelles...")
+
+        if len(lecteur.colonnes) == lecteur.nb_evenements_recents:
+            # Aucune ligne ajoutée depuis l'exécution précédente : rien à détecter, et ni le DataFrame ni
+            # pandas ne sont chargés (cas le plus fréquent des exécutions rapprochées lancées par cron)
+            print("Aucun nouvel événement à analyser.")
+        else:
+            analyser_evenements(args, lecteur, metriques)
 
-            # Lire les logs bruts pour l'analyse avec GPT
-            lecteur.lire_logs_bruts(fichier_log)
-            # Créer une instance de LogAI avec la liste de logs
-            analyseur_ai = LogAI(lecteur.lignes_extraites_brut[:10])  # Limiter à 10 lignes pour l'exemple
+        # Afficher le DataFrame contenant les informations extraites
+        # lecteur.afficher_dataframe()
 
-            # Analyser les logs avec OpenAI GPT
-            try:
-                analyseur_ai.analyser_logs_avec_gpt()
-                print("Résultat de l'analyse par GPT en JSON :")
-                print(analyseur_ai.dump_reponse())  # Afficher la réponse JSON
-            except ValueError as e:
-                print(e)
+        if etat is not None:
+            # Sauvegarder les positions de lecture une fois l'analyse terminée
+            etat.nettoyer(fichiers_logs)
+            etat.sauvegarder()
+    else:
+        print(f"Aucun fichier de logs correspondant au pattern '{args.pattern}' n'a été trouvé dans le répertoire.")
 
-        # Option 2 : Analyse traditionnelle des logs (si --use-gpt n'est pas spécifié)
-        else:
-            lecteur.lire_et_extraire_logs(fichier_log)  # Lire et extraire les informations du fichier de logs
-            print("\nAnalyse des logs avec les méthodes traditionnelles...")
+    metriques.incrementer('executions')
+    metriques.bilan()
 
-            # Créer le DataFrame une fois que tous les fichiers ont été lus
-            lecteur.creer_dataframe()
+def analyser_evenements(args, lecteur, metriques):
+    """
+    Analyse traditionnelle des événements extraits par le lecteur : création du DataFrame, détection des
+    adresses IP (et des préfixes réseau) suspectes, confirmation par GPT (avec --use-gpt), puis graphe,
+    notification et persistance des alertes.
 
-            # Créer une instance de LogAnalyzer pour analyser les logs
-            analyseur = LogAnalyzer(lecteur.df_logs)
+    Paramètres :
+    args (argparse.Namespace) : Arguments de la ligne de commande.
+    lecteur (LogReader) : Lecteur ayant extrait les événements des fichiers de logs.
+    metriques (Metriques) : Métriques à mettre à jour.
+    """
+    from modules.log_analyser import LogAnalyzer  # Charge pandas
 
-            # Analyser la fréquence des adresses IP dans l'intervalle de temps spécifié
-            lignes_suspectes = analyseur.analyser_frequence_ips(intervalle_temps=args.intervalle, seuil_alerte=args.seuil)
+    # Créer le DataFrame une fois que tous les fichiers ont été lus
+    with metriques.etape('dataframe'):
+        lecteur.creer_dataframe()
 
-            if lignes_suspectes:
-                if args.graphe:
-                    # Afficher un graphe des événements critiques
-                    analyseur.afficher_evenements_par_date()
+    # Créer une instance de LogAnalyzer pour analyser les logs
+    with metriques.etape('detection'):
+        analyseur = LogAnalyzer(lecteur.df_logs)
 
-                if args.notifier:
-                    # Envoyer une notification par email si des événements critiques sont détectés
-                    print("Événements critiques détectés, envoi d'une notification par email...")
+        # Analyser la fréquence des adresses IP dans l'intervalle de temps spécifié (en lecture incrémentale,
+        # en reprenant les adresses encore en alerte à la fin de l'exécution précédente)
+        alertes_en_cours = lecteur.etat.adresses_en_alerte if lecteur.etat is not None else None
+        lignes_suspectes = analyseur.analyser_frequence_ips(intervalle_temps=args.intervalle,
+                                                            seuil_alerte=args.seuil,
+                                                            depuis=lecteur.horodatage_reprise,
+                                                            evenements=lecteur.extracteur.evenements_comptes,
+                                                            alertes_en_cours=alertes_en_cours)
+        if lecteur.etat is not None and analyseur.adresses_en_alerte is not None:
+            # Une rafale encore en cours ne sera pas signalée à nouveau lors de l'exécution suivante
+            lecteur.etat.adresses_en_alerte = sorted(analyseur.adresses_en_alerte)
+    metriques.incrementer('alertes', len(lignes_suspectes or ()))
 
-                    # Créer une instance de Notification avec le fichier de configuration
-                    notification = Notification()
+    if args.prefixes:
+        # Détecter aussi les réseaux dont les adresses restent chacune sous le seuil
+        with metriques.etape('detection_prefixes'):
+            alertes_prefixes = analyseur.analyser_frequence_prefixes(
+                intervalle_temps=args.intervalle, seuil_alerte=seuil_prefixe(args),
+                adresses_min=args.adresses_min_prefixe, depuis=lecteur.horodatage_reprise,
+                evenements=lecteur.extracteur.evenements_comptes)
+        metriques.incrementer('alertes_prefixes', len(alertes_prefixes or ()))
+        if alertes_prefixes:
+            for alerte in alertes_prefixes:
+                print(f"- {alerte}")
+            lignes_suspectes = (lignes_suspectes or []) + alertes_prefixes
 
-                    # Envoyer la notification avec les événements critiques
-                    notification.envoyer_notification_evenements_critiques(lignes_suspectes[:10])
+    avis_gpt = None
+    if args.use_gpt and lignes_suspectes:
+        # Faire juger les adresses IP retenues par GPT, à partir d'un résumé de leur activité
+        avis_gpt = confirmer_avec_gpt(analyseur, lignes_suspectes, metriques)
 
-                if args.persister:
-                    # Persister les événements critiques dans une base de données SQLite
-                    print("Persistance des événements critiques dans une base de données SQLite...")
-                    analyseur.persister_evenements_critique()
-            else:
-                print("Aucun événement critique détecté.")
+    if args.graphe_fichier:
+        # Enregistrer un graphe des événements dans un fichier, sans affichage (exécutions planifiées, serveurs)
+        with metriques.etape('graphe'):
+            analyseur.enregistrer_graphique(args.graphe_fichier, vue=args.vue_graphe)
+
+    if lignes_suspectes:
+        if args.graphe:
+            # Afficher un graphe des événements critiques
+            with metriques.etape('graphe'):
+                analyseur.afficher_evenements_par_date()
+
+        if args.notifier:
+            # Envoyer une notification par email si des événements critiques sont détectés
+            print("Événements critiques détectés, envoi d'une notification par email...")
 
-            # Afficher le DataFrame contenant les informations extraites
-            # lecteur.afficher_dataframe()
+            with metriques.etape('notification'):
+                # Créer une instance de Notification avec le fichier de configuration
+                from modules.notification import Notification
+                notification = Notification()
+
+                # Envoyer la notification avec les événements critiques (regroupés par adresse IP)
+                notification.envoyer_notification_evenements_critiques(lignes_suspectes, avis=avis_gpt)
+                notification.fermer()
+            metriques.incrementer('emails_envoyes', notification.emails_envoyes)
+            metriques.incrementer('emails_en_echec', notification.emails_en_echec)
+
+        if args.persister:
+            # Persister les événements critiques dans une base de données SQLite
+            print("Persistance des événements critiques dans une base de données SQLite...")
+            with metriques.etape('persistance'):
+                analyseur.persister_evenements_critique()
     else:
-        print(f"Aucun fichier de logs correspondant au pattern '{args.pattern}' n'a été trouvé dans le répertoire.")
+        print("Aucun événement critique détecté.")
+
+def confirmer_avec_gpt(analyseur, alertes, metriques):
+    """
+    Soumet à GPT un résumé de l'activité de chaque adresse IP retenue par la détection locale (au lieu des
+    lignes de log brutes). Les verdicts ne font qu'accompagner les alertes : une adresse IP que GPT juge
+    légitime reste en alerte, notifiée et persistée, car son résumé contient des noms d'utilisateurs
+    choisis par l'attaquant, qui pourrait s'en servir pour faire lever sa propre alerte.
+
+    Paramètres :
+    analyseur (LogAnalyzer) : Analyseur ayant fait la détection.
+    alertes (list) : Alertes au format ((horodatage, adresse_ip ou préfixe), nombre_acces).
+    metriques (Metriques) : Métriques à mettre à jour.
+
+    Retourne :
+    dict : L'avis de GPT (texte) par adresse IP, à joindre à la notification, ou None si l'analyse par GPT
+           a échoué (configuration absente, cache des verdicts impossible à écrire...) : les alertes sont
+           alors notifiées et persistées sans avis.
+    """
+    from modules.log_ai import LogAI
+
+    print("\nConfirmation des adresses IP suspectes par GPT via l'API OpenAI...")
+    with metriques.etape('analyse_gpt'):
+        resumes = analyseur.resumer_adresses()
+        # Nombre maximal d'accès dans la fenêtre de détection, pour les adresses IP en alerte à titre individuel
+        pics = {}
+        for (_, adresse_ip), nombre_acces in alertes:
+            pics[adresse_ip] = max(nombre_acces, pics.get(adresse_ip, 0))
+        for resume in resumes:
+            resume['pic'] = pics.get(resume['adresse_ip'])
+
+        try:
+            analyseur_ai = LogAI()
+            verdicts = analyseur_ai.analyser_resumes(resumes)
+        except Exception as e:
+            # L'avis de GPT est facultatif : son échec ne doit pas empêcher de traiter les alertes
+            print(f"Analyse par GPT impossible, alertes conservées sans avis : {e!r}")
+            return None
+    metriques.incrementer('resumes_gpt', len(resumes))
+    metriques.incrementer('requetes_gpt', analyseur_ai.requetes)
+    metriques.incrementer('requetes_gpt_en_echec', analyseur_ai.requetes_en_echec)
+
+    avis = {}
+    for adresse_ip, verdict in verdicts.items():
+        etat = {True: "intrusion", False: "activité légitime", None: "non jugée"}[verdict['intrusion_detectee']]
+        avis[adresse_ip] = f"{etat} ({verdict['raison']})"
+        print(f"- {adresse_ip} : {avis[adresse_ip]}")
+    return avis
+
+def enregistrer_extraction(metriques, colonnes, nb_evenements):
+    """
+    Enregistre dans les métriques le volume lu lors de la dernière extraction et le débit obtenu.
+
+    Paramètres :
+    metriques (Metriques) : Les métriques à mettre à jour.
+    colonnes (ColonnesEvenements) : Les colonnes remplies par l'extraction.
+    nb_evenements (int) : Nombre d'événements extraits.
+    """
+    metriques.incrementer('lignes_lues', colonnes.lignes_lues)
+    metriques.incrementer('octets_lus', colonnes.octets_lus)
+    metriques.incrementer('evenements_extraits', nb_evenements)
+    duree = metriques.derniere_duree('extraction')
+    if duree > 0:
+        metriques.definir('debit_lignes_par_seconde', round(colonnes.lignes_lues / duree))
+        metriques.definir('debit_octets_par_seconde', round(colonnes.octets_lus / duree))
+
+def surveiller_logs(args, metriques=None):
+    """
+    Mode démon : suit les fichiers de logs à mesure qu'ils grossissent et fait passer chaque nouvelle ligne
+    dans l'extracteur puis dans le détecteur à fenêtre glissante. Une alerte est émise dès que le seuil
+    est franchi, sans relire les fichiers.
+    """
+    from modules.suivi_fichiers import SuiviFichiers  # Suivi continu des fichiers
+    from modules.extraction import ExtracteurEvenements
+    from modules.detecteur import DetecteurFenetreGlissante
+    from modules.notification import Notification
+
+    if metriques is None:
+        metriques = Metriques()
+    print(f"\nDémarrage de la surveillance continue des logs à {datetime.now()}")
+
+    etat = EtatLecture(args.fichier_etat, fenetre=args.intervalle)
+    suivi = SuiviFichiers(args.repertoire, pattern=args.pattern, etat=etat)
+    extracteur = ExtracteurEvenements()
+    detecteur = DetecteurFenetreGlissante(fenetre=args.intervalle, seuil=args.seuil)
+    index_prefixes = creer_index_prefixes(args)
+    notification = Notification(asynchrone=True) if args.notifier else None  # Envois en arrière-plan
+    base = BaseEvenements() if args.persister else None
+
+    try:
+        for blocs in suivi.surveiller():
+            traiter_blocs(blocs, args, extracteur, detecteur, notification, base, metriques, index_prefixes)
+            metriques.definir('fichiers_suivis', len(suivi.fichiers))
+            if etat.modifie:
+                # Au repos, aucun octet lu : l'état n'est pas réécrit à chaque réveil
+                etat.sauvegarder()
+    except KeyboardInterrupt:
+        print("\nArrêt de la surveillance.")
+    finally:
+        etat.sauvegarder()
+        suivi.fermer()
+        if base is not None:
+            base.fermer()
+        if notification is not None:
+            notification.fermer()
+
+def recevoir_syslog(args, metriques=None):
+    """
+    Mode récepteur : reçoit les logs des hôtes par le réseau (syslog UDP/TCP) au lieu de lire des fichiers,
+    et fait passer chaque lot de messages dans l'extracteur puis dans le détecteur à fenêtre glissante.
+    La détection porte sur l'ensemble des hôtes : une adresse IP qui attaque plusieurs serveurs est
+    comptée sur tous à la fois.
+    """
+    from modules.recepteur_syslog import RecepteurSyslog
+    from modules.extraction import ExtracteurEvenements
+    from modules.detecteur import DetecteurFenetreGlissante
+    from modules.notification import Notification
+
+    if metriques is None:
+        metriques = Metriques()
+    print(f"\nDémarrage de la réception syslog à {datetime.now()}")
+
+    recepteur = RecepteurSyslog(args.adresse_syslog, args.port_syslog)
+    extracteur = ExtracteurEvenements()
+    detecteur = DetecteurFenetreGlissante(fenetre=args.intervalle, seuil=args.seuil)
+    index_prefixes = creer_index_prefixes(args)
+    notification = Notification(asynchrone=True) if args.notifier else None  # Envois en arrière-plan
+    base = BaseEvenements() if args.persister else None
+
+    def traiter(bloc):
+        traiter_blocs([bloc], args, extracteur, detecteur, notification, base, metriques, index_prefixes)
+        metriques.definir('messages_syslog_recus', recepteur.messages_recus, compteur=True)
+        metriques.definir('messages_syslog_perdus', recepteur.messages_perdus, compteur=True)
+        metriques.definir('file_syslog', len(recepteur.file))
+        metriques.definir('connexions_syslog_tcp', len(recepteur.transports_tcp))
+
+    try:
+        recepteur.servir(traiter)
+    except KeyboardInterrupt:
+        print(f"\nArrêt de la réception ({recepteur.messages_recus} message(s) reçu(s), "
+              f"{recepteur.messages_perdus} perdu(s)).")
+    except OSError as e:
+        print(f"Erreur : impossible d'écouter sur {args.adresse_syslog}:{args.port_syslog} : {e}")
+    finally:
+        if base is not None:
+            base.fermer()
+        if notification is not None:
+            notification.fermer()
+
+def seuil_prefixe(args):
+    """
+    Seuil d'alerte par préfixe réseau : celui de la ligne de commande, ou par défaut trois fois le seuil par adresse IP.
+    """
+    return args.seuil_prefixe if args.seuil_prefixe is not None else 3 * args.seuil
+
+def creer_index_prefixes(args):
+    """
+    Crée l'index des accès par préfixe réseau pour les modes continus (None si --prefixes n'est pas demandé).
+    """
+    if not args.prefixes:
+        return None
+    from modules.prefixes import IndexPrefixes
+    return IndexPrefixes(fenetre=args.intervalle, seuil=seuil_prefixe(args), adresses_min=args.adresses_min_prefixe)
+
+def traiter_blocs(blocs, args, extracteur, detecteur, notification, base, metriques, index_prefixes=None):
+    """
+    Fait passer des blocs de lignes reçues en continu (mode démon ou récepteur syslog) dans l'extracteur
+    puis dans le détecteur à fenêtre glissante, et signale et persiste les alertes.
+
+    Paramètres :
+    blocs (list) : Blocs de lignes complètes (bytes).
+    args : Arguments de la ligne de commande (seuil et intervalle).
+    extracteur (ExtracteurEvenements) : Moteur d'extraction.
+    detecteur (DetecteurFenetreGlissante) : Détecteur, conservé d'un lot à l'autre.
+    notification (Notification) : Notification asynchrone des alertes, ou None.
+    base (BaseEvenements) : Base où persister les événements des adresses IP en alerte, ou None.
+    metriques (Metriques) : Métriques à mettre à jour.
+    index_prefixes (IndexPrefixes) : Index des accès par préfixe réseau, conservé d'un lot à l'autre, ou None.
+    """
+    from modules.extraction import ColonnesEvenements
+
+    extracteur.definir_reference(time.time())  # Lignes écrites à l'instant : année courante
+    colonnes = ColonnesEvenements()
+    with metriques.etape('extraction'):
+        for bloc in blocs:
+            extracteur.extraire_bloc(bloc, colonnes)
+    enregistrer_extraction(metriques, colonnes, len(colonnes))
+    if not len(colonnes):
+        return
+
+    acces = colonnes.acces_a_compter(extracteur.evenements_comptes)
+    with metriques.etape('detection'):
+        alertes = detecteur.ajouter_lot(*acces)
+    metriques.incrementer('alertes', len(alertes))
+    metriques.definir('adresses_suivies', len(detecteur))
+    alertes_prefixes = []
+    if index_prefixes is not None:
+        with metriques.etape('detection_prefixes'):
+            alertes_prefixes = index_prefixes.ajouter_lot(*acces)
+        metriques.incrementer('alertes_prefixes', len(alertes_prefixes))
+        metriques.definir('prefixes_suivis', len(index_prefixes))
+        if alertes_prefixes:
+            print(f"\nAccès suspects détectés par préfixe (plus de {index_prefixes.seuil} accès par préfixe "
+                  f"dans {args.intervalle}) :")
+            for alerte in alertes_prefixes:
+                print(f"- {alerte}")
+
+    df_lot = None
+    if alertes:
+        # Hôtes visés par chaque adresse IP en alerte dans ce lot
+        df_lot = colonnes.vers_dataframe()
+        hotes_par_ip = df_lot[df_lot['Hote'] != ''].groupby('AdresseIP', observed=True)['Hote'].unique()
+        print(f"\nAccès suspects détectés (plus de {args.seuil} accès par IP dans {args.intervalle}) :")
+        for alerte in alertes:
+            hotes = sorted(hotes_par_ip.get(alerte[0][1], []))
+            if len(hotes) > 5:
+                hotes[5:] = [f"{len(hotes) - 5} autre(s)"]
+            print(f"- {alerte}" + (f" (hôte(s) : {', '.join(hotes)})" if hotes else ""))
+
+    if notification is not None and (alertes or alertes_prefixes):
+        notification.envoyer_notification_evenements_critiques(alertes + alertes_prefixes)
+
+    if notification is not None:
+        # Les emails sont envoyés par le thread de notification : relever ses compteurs et sa file
+        metriques.definir('file_notification', notification.file.qsize())
+        metriques.definir('emails_envoyes', notification.emails_envoyes, compteur=True)
+        metriques.definir('emails_en_echec', notification.emails_en_echec, compteur=True)
+
+    if base is not None:
+        # Persister les événements des adresses IP en alerte
+        with metriques.etape('persistance'):
+            if df_lot is None:
+                df_lot = colonnes.vers_dataframe()
+            adresses_en_alerte = detecteur.adresses_en_alerte()
+            if index_prefixes is not None:
+                adresses_en_alerte |= index_prefixes.adresses_en_alerte()
+            base.inserer(df_lot[df_lot['AdresseIP'].isin(adresses_en_alerte)], suite=True)
+
+def afficher_rapport(arguments):
+    """
+    Sous-commande 'rapport' : interroge les tables de cumuls de la base des événements persistés
+    (adresses IP les plus actives, série temporelle, historique d'une adresse IP) sans relire les logs.
+
+    Paramètres :
+    arguments (list) : Arguments de la ligne de commande suivant 'rapport'.
+    """
+    # Options communes à tous les rapports
+    commun = argparse.ArgumentParser(add_help=False)
+    commun.add_argument("--base", help="Base SQLite des évènements (par défaut 'logs_analyses.db')", type=str,
+                        default="logs_analyses.db")
+    commun.add_argument("--depuis", help="Début de la période, inclus ('YYYY-MM-DD' ou 'YYYY-MM-DD HH:MM')", type=str)
+    commun.add_argument("--jusqu-a", help="Fin de la période, incluse ('YYYY-MM-DD' ou 'YYYY-MM-DD HH:MM')", type=str)
+    commun.add_argument("--evenement", help="Ne compter que ce type d'évènement (par exemple 'Failed password')", type=str)
+
+    parser = argparse.ArgumentParser(prog="analyse.py rapport",
+                                     description="Rapports sur les évènements critiques persistés (option --persister)")
+    sous_commandes = parser.add_subparsers(dest="rapport", required=True)
+    plus_actifs = sous_commandes.add_parser("top", parents=[commun],
+                                            help="Adresses IP (ou utilisateurs, ou évènements) les plus actives")
+    plus_actifs.add_argument("-k", help="Nombre de résultats (par défaut 10)", type=int, default=10)
+    plus_actifs.add_argument("--par", help="Critère de classement (par défaut 'ip')",
+                             choices=["ip", "utilisateur", "evenement"], default="ip")
+    serie = sous_commandes.add_parser("serie", parents=[commun], help="Nombre d'évènements par heure ou par jour")
+    serie.add_argument("--pas", help="Pas de la série (par défaut 'heure')", choices=["heure", "jour"], default="heure")
+    serie.add_argument("--ip", help="Ne compter que les évènements de cette adresse IP", type=str)
+    historique = sous_commandes.add_parser("ip", parents=[commun], help="Historique d'une adresse IP")
+    historique.add_argument("adresse_ip", help="Adresse IP", type=str)
+    graphe = sous_commandes.add_parser("graphe", parents=[commun],
+                                       help="Graphe PNG ou SVG de l'évolution des évènements ou des adresses IP les plus actives")
+    graphe.add_argument("fichier", help="Fichier à écrire ('.png' ou '.svg')", type=str)
+    graphe.add_argument("--vue", help="Évolution par jour ou par heure, ou adresses IP les plus actives (par défaut 'jour')",
+                        choices=["jour", "heure", "ip"], default="jour")
+    graphe.add_argument("--ip", help="Évolution des évènements de cette adresse IP seulement", type=str)
+    graphe.add_argument("-k", help="Nombre d'adresses IP de la vue 'ip' (par défaut 20)", type=int, default=20)
+    graphe.add_argument("--points", help="Nombre maximal de points de l'évolution (par défaut 500)", type=int, default=500)
+    args = parser.parse_args(arguments)
+    if args.rapport == "graphe":
+        from modules.graphiques import format_fichier
+        try:
+            format_fichier(args.fichier)
+        except ValueError as e:
+            print(f"Erreur : {e}")
+            return
+    if not os.path.exists(args.base):
+        print(f"Erreur : la base {args.base} n'existe pas (les évènements sont persistés avec l'option --persister).")
+        return
+
+    base = BaseEvenements(args.base)
+    debut = time.perf_counter()
+    try:
+        if args.rapport == "top":
+            critere = {"ip": "adresse_ip"}.get(args.par, args.par)
+            resultats = base.plus_actifs(args.k, args.depuis, args.jusqu_a, critere=critere, evenement=args.evenement)
+            duree = time.perf_counter() - debut
+            print(f"{'Adresse IP' if args.par == 'ip' else args.par.capitalize():<40} {'Évènements':>12} {'Périodes':>9}")
+            for valeur, nombre, nb_periodes in resultats:
+                print(f"{valeur:<40} {nombre:>12} {nb_periodes:>9}")
+        elif args.rapport == "serie":
+            resultats = base.serie(args.pas, args.depuis, args.jusqu_a, adresse_ip=args.ip, evenement=args.evenement)
+            duree = time.perf_counter() - debut
+            maximum = max((nombre for _, nombre in resultats), default=0)
+            for periode, nombre in resultats:
+                print(f"{periode:<16} {nombre:>10} {'#' * round(50 * nombre / maximum)}")
+        elif args.rapport == "graphe":
+            from modules.graphiques import enregistrer_serie, enregistrer_barres
+            if args.vue == "ip":
+                resultats = base.plus_actifs(args.k, args.depuis, args.jusqu_a, evenement=args.evenement)
+                if resultats:
+                    enregistrer_barres(args.fichier, [valeur for valeur, _, _ in resultats],
+                                       [nombre for _, nombre, _ in resultats],
+                                       titre=f"Les {len(resultats)} adresses IP les plus actives")
+            else:
+                resultats = base.serie(args.vue, args.depuis, args.jusqu_a, adresse_ip=args.ip, evenement=args.evenement)
+                if resultats:
+                    enregistrer_serie(args.fichier, [periode for periode, _ in resultats],
+                                      [nombre for _, nombre in resultats], pas=args.vue, nb_points=args.points,
+                                      titre=f"Évolution des évènements par {args.vue}"
+                                            + (f" de l'adresse IP {args.ip}" if args.ip else ""))
+            duree = time.perf_counter() - debut
+            if resultats:
+                print(f"Graphique enregistré dans {args.fichier}.")
+            else:
+                print("Aucun évènement persisté sur cette période : pas de graphique.")
+        else:
+            historique = base.historique_adresse(args.adresse_ip, args.depuis, args.jusqu_a, evenement=args.evenement)
+            duree = time.perf_counter() - debut
+            if historique["premier"] is None:
+                print(f"Aucun évènement persisté pour l'adresse IP {args.adresse_ip}.")
+            else:
+                print(f"Adresse IP {args.adresse_ip} : premier évènement le {historique['premier']}, "
+                      f"dernier le {historique['dernier']}.")
+                print(f"\n{'Jour':<12} {'Évènement':<30} {'Nombre':>10} {'Utilisateurs':>13}")
+                for jour, evenement, nombre, nb_utilisateurs in historique["jours"]:
+                    print(f"{jour:<12} {evenement:<30} {nombre:>10} {nb_utilisateurs:>13}")
+                print("\nUtilisateurs les plus visés : "
+                      + ", ".join(f"{utilisateur or '-'} ({nombre})" for utilisateur, nombre in historique["utilisateurs"]))
+    except ValueError as e:
+        print(f"Erreur : période invalide ({e}).")
+        return
+    except OSError as e:
+        print(f"Erreur lors de l'écriture de {args.fichier} : {e}")
+        return
+    finally:
+        base.fermer()
+    print(f"\n(Rapport obtenu en {duree * 1000:.1f} ms)")
 
 def main():
+    # Sous-commande de rapport sur la base des évènements persistés
+    if len(sys.argv) > 1 and sys.argv[1] == "rapport":
+        afficher_rapport(sys.argv[2:])
+        return
+
     # Gestion des arguments en ligne de commande
     parser = argparse.ArgumentParser(description="Script d'analyse de logs")
-    parser.add_argument("repertoire", help="Chemin vers le répertoire contenant les fichiers de logs", type=str)
+    parser.add_argument("repertoire", help="Chemin vers le répertoire contenant les fichiers de logs (sauf avec --syslog)",
+        type=str, nargs="?")
     parser.add_argument("--pattern", help="Pattern pour filtrer les fichiers de logs (par défaut 'secure*')", type=str, default="secure*")
     parser.add_argument("--seuil", help="Seuil d'alerte pour les adresses IP suspectes", type=int, default=10)
     parser.add_argument("--intervalle", help="Intervalle de temps pour l'analyse des accès (par défaut '1min')", type=str, default="1min")
-    parser.add_argument("--use-gpt", help="Utiliser GPT pour l'analyse des logs avec OpenAI", action="store_true")
+    parser.add_argument("--use-gpt",
+        help="Faire juger par GPT (OpenAI) les adresses IP suspectes, à partir d'un résumé de leur activité "
+             "(avis joint aux alertes, qui sont toutes conservées)",
+        action="store_true")
     parser.add_argument("--notifier", help="Notifier les évènements critiques par e-mail", action="store_true")
     parser.add_argument("--graphe", help="Afficher un graphe des évènements critiques", action="store_true")
+    parser.add_argument("--graphe-fichier", metavar="FICHIER",
+        help="Enregistrer un graphe des évènements dans un fichier PNG ou SVG, sans affichage (exécutions planifiées, serveurs)")
+    parser.add_argument("--vue-graphe", choices=["jour", "heure", "ip"], default="jour",
+        help="Graphe enregistré : évolution par jour ou par heure, ou adresses IP les plus actives (par défaut 'jour')")
     parser.add_argument("--persister", help="Persister les évènements critiques dans SQLite", action="store_true")
     parser.add_argument("--planifier",
         help="Planification du script, indiquer le nombre de minutes entre chaque exécution", type=int)
+    parser.add_argument("--incremental",
+        help="Ne lire que les lignes ajoutées depuis la dernière exécution (activé avec --planifier)", action="store_true")
+    parser.add_argument("--fichier-etat",
+        help="Fichier de sauvegarde des positions de lecture (par défaut '.etat_lecture.json')", type=str,
+        default=".etat_lecture.json")
+    parser.add_argument("--workers",
+        help="Nombre de processus pour lire les fichiers de logs en parallèle (par défaut 1)", type=int, default=1)
+    parser.add_argument("--no-cache", help="Ne pas utiliser le cache des événements déjà extraits", action="store_true")
+    parser.add_argument("--rebuild-cache", help="Reconstruire le cache des événements extraits", action="store_true")
+    parser.add_argument("--daemon",
+        help="Surveiller les fichiers de logs en continu et alerter dès que le seuil est franchi", action="store_true")
+    parser.add_argument("--prefixes",
+        help="Détecter aussi les attaques réparties sur un réseau (préfixes /24 et /16 en IPv4, /64 et /48 en IPv6)",
+        action="store_true")
+    parser.add_argument("--seuil-prefixe",
+        help="Seuil d'alerte par préfixe réseau (par défaut trois fois --seuil)", type=int)
+    parser.add_argument("--adresses-min-prefixe",
+        help="Nombre minimal d'adresses IP distinctes d'un préfixe en alerte (par défaut 3)", type=int, default=3)
+    parser.add_argument("--syslog",
+        help="Recevoir les logs des hôtes par le réseau (syslog UDP et TCP) au lieu de lire des fichiers", action="store_true")
+    parser.add_argument("--adresse-syslog", help="Adresse d'écoute syslog (par défaut '0.0.0.0')", type=str, default="0.0.0.0")
+    parser.add_argument("--port-syslog", help="Port d'écoute syslog UDP et TCP (par défaut 5140)", type=int, default=5140)
+    parser.add_argument("--journal-json",
+        help="Écrire la durée de chaque étape et le bilan de chaque exécution dans un journal JSON ('-' pour la sortie d'erreur)",
+        type=str)
+    parser.add_argument("--port-metriques",
+        help="Exposer les métriques au format Prometheus sur http://127.0.0.1:PORT/metrics (avec --daemon, --syslog ou --planifier)",
+        type=int)
+    parser.add_argument("--profile", nargs="?", const="profil_analyse.prof", metavar="FICHIER",
+        help="Profiler la première exécution avec cProfile et tracemalloc (profil enregistré par défaut dans 'profil_analyse.prof')")
     args = parser.parse_args()
+    if args.repertoire is None and not args.syslog:
+        parser.error("le répertoire des fichiers de logs est requis (sauf avec --syslog)")
+    if args.graphe_fichier:
+        from modules.graphiques import format_fichier
+        try:
+            format_fichier(args.graphe_fichier)
+        except ValueError as e:
+            parser.error(str(e))
 
-    # Si l'option --planifier est utilisée, planifier l'exécution du script
-    if args.planifier:
-        print(f"Planification du script toutes les {args.planifier} minutes.")
+    metriques = Metriques(args.journal_json)
+    serveur_metriques = None
+    if args.port_metriques is not None:
+        if args.daemon or args.syslog or args.planifier:
+            try:
+                serveur_metriques = ServeurMetriques(metriques, args.port_metriques)
+            except OSError as e:
+                print(f"Erreur : impossible d'exposer les métriques sur le port {args.port_metriques} : {e}")
+        else:
+            print("L'option --port-metriques n'est utilisée qu'avec --daemon, --syslog ou --planifier.")
 
-        # Planifier l'analyse des logs en fonction de l'intervalle spécifié
-        schedule.every(args.planifier).minutes.do(analyser_logs, args=args)
+    try:
+        # Si l'option --syslog est utilisée, recevoir les logs par le réseau
+        if args.syslog:
+            if args.profile:
+                profiler(recevoir_syslog, args, metriques, fichier_profil=args.profile)
+            else:
+                recevoir_syslog(args, metriques)
+        # Si l'option --daemon est utilisée, suivre les fichiers de logs en continu
+        elif args.daemon:
+            if args.profile:
+                profiler(surveiller_logs, args, metriques, fichier_profil=args.profile)
+            else:
+                surveiller_logs(args, metriques)
+        # Si l'option --planifier est utilisée, planifier l'exécution du script
+        elif args.planifier:
+            print(f"Planification du script toutes les {args.planifier} minutes.")
+            if args.profile:
+                # Profiler une première exécution immédiate
+                profiler(analyser_logs, args, metriques, fichier_profil=args.profile)
 
-        # Boucle infinie pour exécuter les tâches planifiées
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
-    else:
-        # Si la planification n'est pas spécifiée, exécuter une seule fois
-        analyser_logs(args)
+            # Planifier l'analyse des logs en fonction de l'intervalle spécifié
+            schedule.every(args.planifier).minutes.do(analyser_logs, args=args, metriques=metriques)
+
+            # Boucle infinie pour exécuter les tâches planifiées
+            while True:
+                schedule.run_pending()
+                time.sleep(1)
+        elif args.profile:
+            profiler(analyser_logs, args, metriques, fichier_profil=args.profile)
+        else:
+            # Si la planification n'est pas spécifiée, exécuter une seule fois
+            analyser_logs(args, metriques)
+    finally:
+        if serveur_metriques is not None:
+            serveur_metriques.fermer()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,334 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from modules.compression import ouvrir_fichier_log
+from modules.extraction import lire_blocs
+from modules.generateur_logs import GenerateurLogs
+from modules.log_reader import LogReader
+from modules.log_analyser import LogAnalyzer
+
+# En deçà de cet écart (en secondes), une étape plus lente que la référence n'est pas une régression :
+# la durée des étapes très courtes varie trop d'une exécution à l'autre
+ECART_NEGLIGEABLE = 0.05
+
+# Dépendances lourdes dont le chargement au lancement de analyse.py est suivi
+MODULES_LOURDS = ('numpy', 'pandas', 'matplotlib', 'openai')
+
+
+def reinitialiser_pic_memoire():
+    """
+    Remet à zéro le pic de mémoire résidente du processus (Linux uniquement), pour mesurer le pic de chaque étape.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def pic_memoire():
+    """
+    Renvoie le pic de mémoire résidente du processus en Mio (depuis la dernière remise à zéro sous Linux).
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for ligne in f:
+                if ligne.startswith('VmHWM:'):
+                    return int(ligne.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def compter_lignes(fichiers_logs):
+    """
+    Compte les lignes et les octets (décompressés) des fichiers de logs.
+    """
+    lignes = octets = 0
+    for fichier_log in fichiers_logs:
+        with ouvrir_fichier_log(fichier_log) as f:
+            for bloc in lire_blocs(f):
+                lignes += bloc.count(b'\n')
+                octets += len(bloc)
+    return lignes, octets
+
+
+def mesurer_pipeline(repertoire, workers, intervalle, seuil):
+    """
+    Exécute une fois la chaîne de traitement sur un répertoire de logs en mesurant séparément chaque étape.
+
+    Retourne :
+    dict : Pour chaque étape, la durée en secondes et le pic de mémoire résidente en Mio.
+    """
+    mesures = {}
+
+    @contextlib.contextmanager
+    def etape(nom):
+        reinitialiser_pic_memoire()
+        debut = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # Les messages de progression ne sont pas mesurés
+            yield
+        mesures[nom] = {'secondes': time.perf_counter() - debut, 'pic_rss_mio': pic_memoire()}
+
+    repertoire_base = tempfile.mkdtemp(prefix='benchmark_base_')
+    try:
+        with etape('extraction'):
+            lecteur = LogReader(repertoire)
+            fichiers_logs = lecteur.trouver_fichiers_logs()
+            if workers > 1:
+                lecteur.lire_et_extraire_logs_parallele(fichiers_logs, workers)
+            else:
+                for fichier_log in fichiers_logs:
+                    lecteur.lire_et_extraire_logs(fichier_log)
+
+        with etape('dataframe'):
+            lecteur.creer_dataframe()
+
+        with etape('analyse'):
+            analyseur = LogAnalyzer(lecteur.df_logs)
+            analyseur.analyser_frequence_ips(intervalle_temps=intervalle, seuil_alerte=seuil,
+                                             evenements=lecteur.extracteur.evenements_comptes)
+
+        with etape('persistance'):
+            analyseur.persister_evenements_critique(os.path.join(repertoire_base, 'benchmark.db'))
+    finally:
+        shutil.rmtree(repertoire_base, ignore_errors=True)
+
+    mesures['evenements'] = len(lecteur.df_logs)
+    mesures['adresses_suspectes'] = len(analyseur.adresses_suspectes or ())
+    return mesures
+
+
+def executer(args):
+    """
+    Génère le jeu de logs (si demandé), mesure la chaîne de traitement et renvoie le résultat.
+    """
+    repertoire_temporaire = None
+    repertoire = args.repertoire
+    if repertoire is None:
+        repertoire = repertoire_temporaire = tempfile.mkdtemp(prefix='benchmark_logs_')
+
+    try:
+        if not args.sans_generation:
+            print(f"Génération de {args.lignes} lignes dans {repertoire} (graine {args.graine})...")
+            generateur = GenerateurLogs(graine=args.graine, proportion_attaques=args.attaques,
+                                        nb_attaquants=args.attaquants, taille_rafale=tuple(args.rafales),
+                                        proportion_ipv6=args.ipv6)
+            generateur.generer(repertoire, args.lignes, rotations=args.rotations, compression=args.compression)
+
+        fichiers_logs = LogReader(repertoire).trouver_fichiers_logs()
+        nb_lignes, nb_octets = compter_lignes(fichiers_logs)
+        print(f"{len(fichiers_logs)} fichier(s), {nb_lignes} lignes, {nb_octets / 2 ** 20:.1f} Mio.\n")
+
+        # Garder, pour chaque étape, la meilleure des répétitions (la moins perturbée)
+        etapes = {}
+        for repetition in range(args.repetitions):
+            mesures = mesurer_pipeline(repertoire, args.workers, args.intervalle, args.seuil)
+            for nom in ('extraction', 'dataframe', 'analyse', 'persistance'):
+                if nom not in etapes or mesures[nom]['secondes'] < etapes[nom]['secondes']:
+                    etapes[nom] = mesures[nom]
+        for mesure in etapes.values():
+            mesure['lignes_par_seconde'] = nb_lignes / mesure['secondes'] if mesure['secondes'] else None
+
+        return {
+            'parametres': {
+                'lignes': nb_lignes, 'octets': nb_octets, 'fichiers': len(fichiers_logs),
+                'graine': None if args.sans_generation else args.graine, 'attaques': args.attaques,
+                'attaquants': args.attaquants, 'rafales': args.rafales, 'ipv6': args.ipv6,
+                'rotations': args.rotations, 'compression': args.compression, 'workers': args.workers,
+                'repetitions': args.repetitions, 'intervalle': args.intervalle, 'seuil': args.seuil,
+            },
+            'environnement': {
+                'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                'plateforme': platform.platform(), 'processeurs': os.cpu_count(),
+            },
+            'resultats': {'evenements': mesures['evenements'], 'adresses_suspectes': mesures['adresses_suspectes']},
+            'etapes': etapes,
+        }
+    finally:
+        if repertoire_temporaire is not None:
+            shutil.rmtree(repertoire_temporaire, ignore_errors=True)
+
+
+def lancer(commande, repertoire):
+    """
+    Exécute une commande Python avec -X importtime et mesure sa durée totale.
+
+    Retourne :
+    tuple : (durée en secondes, liste des dépendances lourdes chargées).
+    """
+    debut = time.perf_counter()
+    processus = subprocess.run([sys.executable, '-X', 'importtime'] + commande, cwd=repertoire,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    duree = time.perf_counter() - debut
+    if processus.returncode != 0:
+        raise RuntimeError(f"Échec de {' '.join(commande)} : {processus.stderr[-500:]}")
+    charges = {ligne.rsplit('|', 1)[1].strip() for ligne in processus.stderr.splitlines()
+               if ligne.startswith('import time:')}
+    return duree, [module for module in MODULES_LOURDS if module in charges]
+
+
+def mesurer_demarrage(repetitions):
+    """
+    Mesure la durée de lancement de analyse.py dans les cas où l'analyse elle-même est courte (aide,
+    rapport, exécution incrémentale sans ou avec peu de lignes ajoutées), ainsi que le chargement de
+    toutes les dépendances lourdes pour comparaison. La meilleure des répétitions est retenue.
+
+    Retourne :
+    dict : Pour chaque cas, la durée en secondes et les dépendances lourdes chargées.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analyse.py')
+    repertoire = tempfile.mkdtemp(prefix='benchmark_demarrage_')
+    try:
+        repertoire_logs = os.path.join(repertoire, 'logs')
+        os.makedirs(repertoire_logs)
+        generateur = GenerateurLogs()
+        lignes = generateur.lignes(1_000_000)
+        with open(os.path.join(repertoire_logs, 'secure'), 'w') as f:
+            f.writelines(ligne + '\n' for _, ligne in (next(lignes) for _ in range(10_000)))
+        incremental = [script, repertoire_logs, '--incremental', '--fichier-etat', 'etat.json', '--persister']
+        lancer(incremental, repertoire)  # Première lecture complète, puis création de la base
+
+        def ajouter_lignes(nombre):
+            with open(os.path.join(repertoire_logs, 'secure'), 'a') as f:
+                f.writelines(ligne + '\n' for _, ligne in (next(lignes) for _ in range(nombre)))
+
+        cas = {
+            'aide': ([script, '--help'], None),
+            'rapport': ([script, 'rapport', 'top'], None),
+            'incremental_sans_ajout': (incremental, None),
+            'incremental_100_lignes': (incremental, lambda: ajouter_lignes(100)),
+            'modules_lourds': (['-c', 'import numpy, pandas, matplotlib.pyplot, openai'], None),
+        }
+        mesures = {}
+        for nom, (commande, preparer) in cas.items():
+            for repetition in range(repetitions):
+                if preparer is not None:
+                    preparer()
+                duree, charges = lancer(commande, repertoire)
+                if nom not in mesures or duree < mesures[nom]['secondes']:
+                    mesures[nom] = {'secondes': duree, 'modules_lourds': charges}
+        return mesures
+    finally:
+        shutil.rmtree(repertoire, ignore_errors=True)
+
+
+def afficher_demarrage(mesures, reference=None, tolerance=0.2):
+    """
+    Affiche les durées de lancement et, si une référence est fournie, les compare à celle-ci.
+
+    Retourne :
+    list : Les cas plus lents que la référence au-delà de la tolérance.
+    """
+    regressions = []
+    print(f"{'Cas':<24} {'Durée (s)':>10}  {'Dépendances lourdes chargées':<30}"
+          + (f" {'Référence (s)':>14} {'Écart':>8}" if reference else ""))
+    for nom, mesure in mesures.items():
+        ligne = f"{nom:<24} {mesure['secondes']:>10.3f}  {', '.join(mesure['modules_lourds']) or '-':<30}"
+        if reference and nom in reference:
+            duree_reference = reference[nom]['secondes']
+            ecart = mesure['secondes'] / duree_reference - 1 if duree_reference else 0.0
+            ligne += f" {duree_reference:>14.3f} {ecart:>+8.1%}"
+            if ecart > tolerance and mesure['secondes'] - duree_reference > ECART_NEGLIGEABLE:
+                ligne += "  RÉGRESSION"
+                regressions.append(nom)
+        print(ligne)
+    return regressions
+
+
+def afficher(resultat, reference=None, tolerance=0.2):
+    """
+    Affiche les mesures de chaque étape et, si une référence est fournie, les compare à celle-ci.
+
+    Retourne :
+    list : Les étapes plus lentes que la référence au-delà de la tolérance.
+    """
+    regressions = []
+    print(f"{'Étape':<12} {'Durée (s)':>10} {'Lignes/s':>12} {'Pic RSS (Mio)':>14}"
+          + (f" {'Référence (s)':>14} {'Écart':>8}" if reference else ""))
+    for nom, mesure in resultat['etapes'].items():
+        ligne = f"{nom:<12} {mesure['secondes']:>10.3f} {mesure['lignes_par_seconde'] or 0:>12,.0f} " \
+                f"{mesure['pic_rss_mio']:>14.1f}"
+        if reference and nom in reference['etapes']:
+            duree_reference = reference['etapes'][nom]['secondes']
+            ecart = mesure['secondes'] / duree_reference - 1 if duree_reference else 0.0
+            ligne += f" {duree_reference:>14.3f} {ecart:>+8.1%}"
+            if ecart > tolerance and mesure['secondes'] - duree_reference > ECART_NEGLIGEABLE:
+                ligne += "  RÉGRESSION"
+                regressions.append(nom)
+        print(ligne)
+    print(f"\n{resultat['resultats']['evenements']} événement(s) extrait(s), "
+          f"{resultat['resultats']['adresses_suspectes']} adresse(s) IP suspecte(s).")
+
+    if reference and reference['resultats'] != resultat['resultats']:
+        print(f"Attention : résultats différents de la référence ({reference['resultats']}).")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure des performances de la chaîne d'analyse des logs "
+                                                 "sur un jeu de logs synthétiques reproductible.")
+    parser.add_argument("--lignes", type=int, default=1_000_000, help="Nombre de lignes à générer (par défaut 1 000 000)")
+    parser.add_argument("--graine", type=int, default=42, help="Graine du générateur (par défaut 42)")
+    parser.add_argument("--attaques", type=float, default=0.1, help="Proportion des lignes produites par des attaquants (par défaut 0.1)")
+    parser.add_argument("--attaquants", type=int, default=200, help="Nombre d'adresses IP attaquantes (par défaut 200)")
+    parser.add_argument("--rafales", type=int, nargs=2, default=[5, 40], metavar=('MIN', 'MAX'),
+                        help="Nombre minimal et maximal de tentatives par rafale d'attaque (par défaut 5 40)")
+    parser.add_argument("--ipv6", type=float, default=0.05, help="Proportion d'adresses IPv6 (par défaut 0.05)")
+    parser.add_argument("--rotations", type=int, default=0, help="Nombre de fichiers tournés (par défaut 0)")
+    parser.add_argument("--compression", choices=['gzip', 'bz2', 'xz', 'zstd'], help="Compression des fichiers tournés")
+    parser.add_argument("--repertoire", help="Répertoire des logs générés, conservé après la mesure (par défaut temporaire)")
+    parser.add_argument("--sans-generation", action="store_true",
+                        help="Mesurer les logs déjà présents dans --repertoire au lieu d'en générer")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus pour la lecture (par défaut 1)")
+    parser.add_argument("--repetitions", type=int, default=3, help="Nombre de répétitions, la meilleure est retenue (par défaut 3)")
+    parser.add_argument("--intervalle", default='1min', help="Intervalle de l'analyse de fréquence (par défaut 1min)")
+    parser.add_argument("--seuil", type=int, default=10, help="Seuil de l'analyse de fréquence (par défaut 10)")
+    parser.add_argument("--sauvegarder", metavar="FICHIER", help="Enregistrer les mesures comme référence (JSON)")
+    parser.add_argument("--comparer", metavar="FICHIER", help="Comparer les mesures à une référence enregistrée (JSON)")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Ralentissement toléré par rapport à la référence (par défaut 0.2, soit 20 %%)")
+    parser.add_argument("--demarrage", action="store_true",
+                        help="Mesurer la durée de lancement de analyse.py (aide, rapport, exécutions incrémentales "
+                             "courtes) au lieu de la chaîne de traitement")
+    args = parser.parse_args()
+
+    if args.sans_generation and args.repertoire is None:
+        parser.error("--sans-generation nécessite --repertoire")
+
+    reference = None
+    if args.comparer:
+        with open(args.comparer) as f:
+            reference = json.load(f)
+
+    if args.demarrage:
+        resultat = {'demarrage': mesurer_demarrage(args.repetitions)}
+        regressions = afficher_demarrage(resultat['demarrage'], reference and reference.get('demarrage'),
+                                         args.tolerance)
+    else:
+        resultat = executer(args)
+        regressions = afficher(resultat, reference, args.tolerance)
+
+    if args.sauvegarder:
+        with open(args.sauvegarder, 'w') as f:
+            json.dump(resultat, f, indent=4)
+        print(f"Mesures enregistrées dans {args.sauvegarder}.")
+
+    if regressions:
+        print(f"Régression de performance : {', '.join(regressions)}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
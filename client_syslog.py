@@ -0,0 +1,123 @@
+import re
+import sys
+import time
+import socket
+import random
+import argparse
+from datetime import datetime, timezone
+from modules.generateur_logs import GenerateurLogs
+from modules.recepteur_syslog import RecepteurSyslog
+
+# Message d'une ligne générée : 'application[pid]: texte'
+REGEX_MESSAGE = re.compile(r"(?P<application>[\w.-]+)(?:\[(?P<pid>\d+)\])?: (?P<texte>.*)")
+
+# Priorité des messages : facility authpriv (10), sévérité info (6)
+PRIORITE = 10 * 8 + 6
+
+
+def formater_message(ligne, hote, format_syslog, instant):
+    """
+    Met une ligne générée au format d'un message syslog émis par un hôte, daté de l'instant d'envoi.
+
+    Paramètres :
+    ligne (str) : Ligne au format des fichiers 'secure'.
+    hote (str) : Nom de l'hôte émetteur.
+    format_syslog (str) : '3164' ou '5424'.
+    instant (float) : Instant d'envoi (secondes depuis l'epoch).
+    """
+    message = ligne[16:].split(' ', 1)[1]  # Après 'Mon DD HH:MM:SS serveur'
+    if format_syslog == '3164':
+        return f"<{PRIORITE}>{RecepteurSyslog.formater_date(instant).decode()} {hote} {message}".encode()
+
+    match = REGEX_MESSAGE.match(message)
+    application, pid, texte = (match.group('application'), match.group('pid') or '-', match.group('texte')) \
+        if match else ('-', '-', message)
+    date = datetime.fromtimestamp(instant, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    return f"<{PRIORITE}>1 {date} {hote} {application} {pid} - - {texte}".encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client de test du récepteur syslog : envoie des logs synthétiques "
+                                                 "(attaques et activité normale) comme le feraient plusieurs hôtes.")
+    parser.add_argument("--adresse", default="127.0.0.1", help="Adresse du récepteur (par défaut 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=5140, help="Port du récepteur (par défaut 5140)")
+    parser.add_argument("--protocole", choices=['udp', 'tcp'], default='udp', help="Protocole (par défaut udp)")
+    parser.add_argument("--format", choices=['3164', '5424'], default='3164', help="Format des messages (par défaut 3164)")
+    parser.add_argument("--par-longueur", action="store_true",
+                        help="En TCP, préfixer chaque message par sa longueur (RFC 6587) au lieu d'une fin de ligne")
+    parser.add_argument("--messages", type=int, default=100_000, help="Nombre de messages à envoyer (par défaut 100 000)")
+    parser.add_argument("--hotes", type=int, default=300, help="Nombre d'hôtes simulés (par défaut 300)")
+    parser.add_argument("--debit", type=float, default=0,
+                        help="Débit visé en messages par seconde (par défaut 0 : aussi vite que possible)")
+    parser.add_argument("--attaques", type=float, default=0.1, help="Proportion des messages produits par des attaquants (par défaut 0.1)")
+    parser.add_argument("--graine", type=int, default=42, help="Graine du générateur (par défaut 42)")
+    args = parser.parse_args()
+
+    hasard = random.Random(args.graine)
+    hotes = [f"hote-{numero:03d}" for numero in range(args.hotes)]
+    generateur = GenerateurLogs(graine=args.graine, proportion_attaques=args.attaques)
+
+    if args.protocole == 'udp':
+        connexion = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        connexion.connect((args.adresse, args.port))
+    else:
+        try:
+            connexion = socket.create_connection((args.adresse, args.port))
+        except OSError as e:
+            print(f"Erreur : impossible de se connecter à {args.adresse}:{args.port} : {e}")
+            sys.exit(1)
+
+    # Envoi par paquets de messages, au débit demandé ; les messages d'une même séquence (connexion,
+    # rafale d'attaque) sont émis par un même hôte, mais une adresse IP attaque plusieurs hôtes
+    taille_paquet = 500
+    debut = time.perf_counter()
+    envoyes = 0
+    paquet = []
+    hote = hotes[0]
+    dernier_pid = None
+    for _, ligne in generateur.lignes(args.messages):
+        pid = ligne[ligne.find('[') + 1:ligne.find(']')]
+        if pid != dernier_pid:
+            hote = hasard.choice(hotes)
+            dernier_pid = pid
+        paquet.append(formater_message(ligne, hote, args.format, time.time()))
+        if len(paquet) < taille_paquet:
+            continue
+        envoyes += envoyer(connexion, paquet, args)
+        paquet = []
+        if args.debit:
+            attente = debut + envoyes / args.debit - time.perf_counter()
+            if attente > 0:
+                time.sleep(attente)
+    if paquet:
+        envoyes += envoyer(connexion, paquet, args)
+    connexion.close()
+
+    duree = time.perf_counter() - debut
+    print(f"{envoyes} message(s) envoyé(s) en {args.protocole.upper()} par {args.hotes} hôte(s) en {duree:.2f} s "
+          f"({envoyes / duree:,.0f} messages/s).")
+
+
+def envoyer(connexion, messages, args):
+    """
+    Envoie un paquet de messages : un datagramme par message en UDP, un seul envoi tramé en TCP.
+
+    Retourne :
+    int : Le nombre de messages envoyés.
+    """
+    if args.protocole == 'udp':
+        for message in messages:
+            try:
+                connexion.send(message)
+            except ConnectionRefusedError:
+                pass  # Aucun récepteur à l'écoute : le datagramme est perdu, comme en production
+        return len(messages)
+    if args.par_longueur:
+        connexion.sendall(b''.join(b'%d %s' % (len(message), message) for message in messages))
+    else:
+        connexion.sendall(b'\n'.join(messages) + b'\n')
+    return len(messages)
+
+
+if __name__ == "__main__":
+    main()
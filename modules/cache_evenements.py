@@ -0,0 +1,131 @@
+import os
+import time
+import hashlib
+import zipfile
+import numpy as np
+from modules.extraction import ColonnesEvenements
+
+# Version du format des entrées : la changer invalide les entrées produites par une version précédente
+# (2 : année des horodatages déduite de la date de modification du fichier ; 3 : événements internés ;
+# 4 : hôte émetteur de chaque événement)
+VERSION_FORMAT = 4
+
+class CacheEvenements:
+    def __init__(self, repertoire='.cache_evenements', taille_max=1024 * 1024 * 1024, reconstruire=False,
+                 delai_stabilite=300):
+        """
+        Cache sur disque des événements extraits de chaque fichier de logs, au format colonnes NumPy (.npz).
+        Une entrée est identifiée par le chemin, la taille, la date de modification et l'inode du fichier :
+        un fichier modifié n'est donc jamais servi depuis le cache. Les fichiers tournés, qui ne changent
+        plus, sont ainsi rechargés en quelques millisecondes au lieu d'être analysés à nouveau.
+
+        Paramètres :
+        repertoire (str) : Répertoire des entrées du cache.
+        taille_max (int) : Taille totale maximale du cache en octets ; les entrées les moins récemment
+                           utilisées sont supprimées au-delà.
+        reconstruire (bool) : Ignorer les entrées existantes et les remplacer.
+        delai_stabilite (int) : Un fichier modifié il y a moins de delai_stabilite secondes (fichier en cours
+                                d'écriture) n'est pas mis en cache.
+        """
+        self.repertoire = repertoire
+        self.taille_max = taille_max
+        self.reconstruire = reconstruire
+        self.delai_stabilite = delai_stabilite
+        self.actif = True
+        try:
+            os.makedirs(repertoire, exist_ok=True)
+        except OSError as e:
+            # Répertoire courant en lecture seule, etc. : les fichiers sont simplement relus à chaque fois
+            print(f"Cache des événements {repertoire} désactivé : {e}")
+            self.actif = False
+
+    def __chemin_entree(self, fichier_log, stat, parametres):
+        """
+        Renvoie le chemin de l'entrée du cache correspondant à l'état actuel du fichier.
+        """
+        identite = (f"{os.path.abspath(fichier_log)}|{stat.st_size}|{stat.st_mtime_ns}|"
+                    f"{stat.st_dev}:{stat.st_ino}|{parametres}|{VERSION_FORMAT}")
+        return os.path.join(self.repertoire, hashlib.sha1(identite.encode()).hexdigest() + '.npz')
+
+    def charger(self, fichier_log, parametres):
+        """
+        Charge les événements d'un fichier depuis le cache.
+
+        Paramètres :
+        fichier_log (str) : Chemin vers le fichier de logs.
+        parametres (str) : Paramètres de l'extraction (année de référence des horodatages et empreinte
+                           des règles) : des événements extraits avec d'autres paramètres ne sont pas servis.
+
+        Retourne :
+        ColonnesEvenements : Les événements du fichier, ou None si le cache ne contient pas d'entrée à jour.
+        """
+        if self.reconstruire or not self.actif:
+            return None
+
+        chemin_entree = self.__chemin_entree(fichier_log, os.stat(fichier_log), parametres)
+        try:
+            with np.load(chemin_entree, allow_pickle=False) as tableaux:
+                colonnes = ColonnesEvenements.depuis_tableaux(tableaux)
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Entrée du cache {chemin_entree} illisible ({e}), le fichier {fichier_log} sera relu.")
+            return None
+
+        try:
+            os.utime(chemin_entree)  # Marquer l'entrée comme récemment utilisée
+        except OSError:
+            pass
+        return colonnes
+
+    def enregistrer(self, fichier_log, stat, parametres, colonnes):
+        """
+        Enregistre les événements extraits d'un fichier, si celui-ci n'a pas changé pendant la lecture
+        et n'est plus en cours d'écriture. La mise en cache est facultative : une erreur d'écriture (disque
+        plein, répertoire en lecture seule...) est signalée, sans conséquence sur les événements extraits.
+
+        Paramètres :
+        fichier_log (str) : Chemin vers le fichier de logs.
+        stat (os.stat_result) : Résultat de os.stat sur le fichier avant sa lecture.
+        parametres (str) : Paramètres de l'extraction (année de référence des horodatages et empreinte
+                           des règles) : des événements extraits avec d'autres paramètres ne sont pas servis.
+        colonnes (ColonnesEvenements) : Les événements extraits du fichier.
+        """
+        if not self.actif:
+            return
+        chemin_entree = self.__chemin_entree(fichier_log, stat, parametres)
+        fichier_temporaire = f"{chemin_entree}.{os.getpid()}.tmp"
+        try:
+            stat_apres = os.stat(fichier_log)
+            if (stat_apres.st_size, stat_apres.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                return
+            if time.time() - stat.st_mtime < self.delai_stabilite:
+                return
+
+            with open(fichier_temporaire, 'wb') as f:
+                np.savez(f, **colonnes.vers_tableaux())
+            os.replace(fichier_temporaire, chemin_entree)
+            self.__evincer()
+        except OSError as e:
+            print(f"Mise en cache des informations du fichier {fichier_log} impossible : {e}")
+            try:
+                os.remove(fichier_temporaire)
+            except OSError:
+                pass
+
+    def __evincer(self):
+        """
+        Supprime les entrées les moins récemment utilisées tant que le cache dépasse sa taille maximale.
+        """
+        entrees = []
+        for nom in os.listdir(self.repertoire):
+            if nom.endswith('.npz'):
+                stat = os.stat(os.path.join(self.repertoire, nom))
+                entrees.append((stat.st_mtime, stat.st_size, nom))
+
+        taille_totale = sum(taille for _, taille, _ in entrees)
+        for _, taille, nom in sorted(entrees):
+            if taille_totale <= self.taille_max:
+                break
+            os.remove(os.path.join(self.repertoire, nom))
+            taille_totale -= taille
@@ -0,0 +1,65 @@
+import bz2
+import gzip
+import lzma
+
+# Signatures (magic bytes) des formats de compression reconnus
+SIGNATURES = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+# Nombre d'octets lus pour reconnaître un format (longueur de la plus longue signature)
+TAILLE_ENTETE = max(len(signature) for signature, _ in SIGNATURES)
+
+# Exceptions levées par un fichier illisible ou une archive corrompue / format non supporté
+ERREURS_DECOMPRESSION = (OSError, EOFError, ImportError, lzma.LZMAError)
+
+
+def detecter_compression(fichier_log):
+    """
+    Détecte le format de compression d'un fichier d'après ses premiers octets, indépendamment de son extension.
+
+    Paramètres :
+    fichier_log (str) : Chemin vers le fichier de logs.
+
+    Retourne :
+    str : 'gzip', 'bz2', 'xz' ou 'zstd', ou None si le fichier n'est pas compressé.
+    """
+    with open(fichier_log, 'rb') as f:
+        entete = f.read(TAILLE_ENTETE)
+    for signature, format_compression in SIGNATURES:
+        if entete.startswith(signature):
+            return format_compression
+    return None
+
+
+def ouvrir_fichier_log(fichier_log, format_compression=None):
+    """
+    Ouvre un fichier de logs en binaire, avec décompression à la volée s'il est compressé.
+    Le fichier renvoyé se lit par blocs comme un fichier ordinaire, sans fichier temporaire.
+
+    Paramètres :
+    fichier_log (str) : Chemin vers le fichier de logs.
+    format_compression (str) : Format déjà détecté (par défaut, détection d'après les premiers octets).
+
+    Retourne :
+    file : Un objet fichier binaire à utiliser avec 'with'.
+    """
+    if format_compression is None:
+        format_compression = detecter_compression(fichier_log)
+
+    if format_compression == 'gzip':
+        return gzip.open(fichier_log, 'rb')
+    if format_compression == 'bz2':
+        return bz2.open(fichier_log, 'rb')
+    if format_compression == 'xz':
+        return lzma.open(fichier_log, 'rb')
+    if format_compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(f"Le module 'zstandard' est nécessaire pour lire {fichier_log} (pip install zstandard).")
+        return zstandard.ZstdDecompressor().stream_reader(open(fichier_log, 'rb'), closefd=True)
+    return open(fichier_log, 'rb')
@@ -0,0 +1,148 @@
+from collections import deque
+import pandas as pd
+
+class DetecteurFenetreGlissante:
+    def __init__(self, fenetre='1min', seuil=10):
+        """
+        Détecteur en ligne des adresses IP trop actives sur une fenêtre de temps réellement glissante.
+        Pour chaque adresse IP active, seuls les seuil + 1 derniers horodatages sont conservés (tampon
+        circulaire) : c'est suffisant pour savoir si plus de seuil accès ont eu lieu dans la fenêtre.
+        Une adresse en alerte conserve en revanche tous ses accès de la fenêtre, pour que l'alerte
+        indique le nombre réel d'accès et non le seul franchissement du seuil. Les adresses inactives
+        depuis plus d'une fenêtre sont oubliées, si bien que la mémoire dépend du nombre d'adresses
+        actives (et des accès des adresses en alerte) et non de l'historique.
+
+        Paramètres :
+        fenetre (str) : Durée de la fenêtre glissante (par exemple '1min').
+        seuil (int) : Nombre d'accès dans la fenêtre au-delà duquel une adresse IP est considérée comme suspecte.
+        """
+        self.fenetre = pd.Timedelta(fenetre).value  # Durée de la fenêtre en nanosecondes
+        self.seuil = seuil
+        self.adresses = {}  # adresse IP -> [tampon des derniers horodatages, alerte en cours ou None]
+        self.derniere_purge = None
+        self.alertes_reprises = set()  # Adresses en alerte à la fin de l'exécution précédente
+        self.reprise = None  # Dernier instant analysé lors de l'exécution précédente (nanosecondes)
+
+    def __len__(self):
+        """
+        Nombre d'adresses IP actuellement suivies.
+        """
+        return len(self.adresses)
+
+    def reprendre_alertes(self, adresses_ip, reprise):
+        """
+        Reprend les adresses IP en alerte à la fin de l'exécution précédente (lecture incrémentale), pour
+        qu'une rafale à cheval sur deux exécutions ne soit pas signalée deux fois. Les événements réintégrés
+        de la dernière fenêtre (jusqu'à l'instant de reprise) ne donnent qu'une partie de l'activité passée
+        de chaque adresse : ils ne peuvent donc pas lever ces alertes, seuls les nouveaux événements le peuvent.
+
+        Paramètres :
+        adresses_ip (iterable) : Adresses IP en alerte à la fin de l'exécution précédente.
+        reprise (int) : Dernier instant analysé lors de l'exécution précédente, en nanosecondes.
+        """
+        self.alertes_reprises = set(adresses_ip)
+        self.reprise = reprise
+
+    def __ajouter(self, horodatage, adresse_ip):
+        """
+        Prend en compte un événement et renvoie l'alerte en cours de l'adresse IP si elle vient de dépasser
+        le seuil, sous la forme [horodatage, adresse_ip, nombre maximal d'accès dans la fenêtre], ce nombre
+        étant mis à jour par les événements suivants tant que l'alerte dure.
+        """
+        if self.derniere_purge is None:
+            self.derniere_purge = horodatage
+        elif horodatage - self.derniere_purge > self.fenetre:
+            self.purger(horodatage)
+
+        suivi = self.adresses.get(adresse_ip)
+        if suivi is None:
+            en_cours = None
+            if adresse_ip in self.alertes_reprises and horodatage <= self.reprise:
+                en_cours = [horodatage, adresse_ip, 0]
+            suivi = self.adresses[adresse_ip] = [deque(maxlen=None if en_cours else self.seuil + 1), en_cours]
+        tampon = suivi[0]
+        tampon.append(horodatage)
+
+        en_cours = suivi[1]
+        if en_cours is None:
+            # Le tampon contient plus de seuil accès et le plus ancien est encore dans la fenêtre
+            if len(tampon) > self.seuil and horodatage - tampon[0] < self.fenetre:
+                # Conserver désormais tous les accès de la fenêtre, pour compter les accès au-delà du seuil
+                suivi[0] = deque(tampon)
+                suivi[1] = [horodatage, adresse_ip, len(tampon)]
+                return suivi[1]
+            return None
+
+        while horodatage - tampon[0] >= self.fenetre:
+            tampon.popleft()
+        if len(tampon) > self.seuil:
+            en_cours[2] = max(en_cours[2], len(tampon))
+        elif self.reprise is None or horodatage > self.reprise:
+            # Redescendue sous le seuil : fin de l'alerte
+            suivi[0] = deque(tampon, maxlen=self.seuil + 1)
+            suivi[1] = None
+        return None
+
+    def ajouter(self, horodatage, adresse_ip):
+        """
+        Prend en compte un événement et renvoie une alerte si l'adresse IP vient de dépasser le seuil.
+        Une adresse en alerte ne déclenche pas de nouvelle alerte tant que son nombre d'accès dans la
+        fenêtre n'est pas redescendu sous le seuil.
+
+        Paramètres :
+        horodatage (int) : Horodatage de l'événement en nanosecondes depuis l'epoch.
+        adresse_ip (str) : Adresse IP source de l'événement.
+
+        Retourne :
+        tuple : ((pd.Timestamp, adresse_ip), nombre_acces) si une alerte est déclenchée, sinon None ;
+                nombre_acces est le nombre d'accès dans la fenêtre au franchissement du seuil (voir
+                ajouter_lot pour le nombre atteint ensuite).
+        """
+        alerte = self.__ajouter(horodatage, adresse_ip)
+        if alerte is None:
+            return None
+        return (pd.Timestamp(alerte[0]), adresse_ip), alerte[2]
+
+    def ajouter_lot(self, horodatages, adresses_ip):
+        """
+        Prend en compte un lot d'événements dans l'ordre chronologique.
+
+        Paramètres :
+        horodatages (iterable) : Horodatages en nanosecondes depuis l'epoch.
+        adresses_ip (iterable) : Adresses IP correspondantes.
+
+        Retourne :
+        list : Liste des alertes déclenchées, au format ((pd.Timestamp, adresse_ip), nombre_acces), où
+               l'horodatage est celui du franchissement du seuil et nombre_acces le nombre maximal d'accès
+               de l'adresse dans la fenêtre pendant l'alerte, jusqu'à la fin du lot.
+        """
+        ajouter = self.__ajouter
+        alertes = []
+        for horodatage, adresse_ip in zip(horodatages, adresses_ip):
+            alerte = ajouter(horodatage, adresse_ip)
+            if alerte is not None:
+                alertes.append(alerte)
+        return [((pd.Timestamp(horodatage), adresse_ip), nombre_acces) for horodatage, adresse_ip, nombre_acces in alertes]
+
+    def ajouter_dataframe(self, df_logs):
+        """
+        Prend en compte les événements d'un DataFrame (colonnes 'DateHeure' en datetime et 'AdresseIP').
+
+        Retourne :
+        list : Liste des alertes déclenchées.
+        """
+        return self.ajouter_lot(df_logs['DateHeure'].to_numpy(dtype='int64').tolist(), df_logs['AdresseIP'].tolist())
+
+    def adresses_en_alerte(self):
+        """
+        Renvoie l'ensemble des adresses IP actuellement au-dessus du seuil.
+        """
+        return {adresse_ip for adresse_ip, suivi in self.adresses.items() if suivi[1] is not None}
+
+    def purger(self, horodatage):
+        """
+        Oublie les adresses IP sans aucun accès dans la fenêtre précédant l'horodatage donné.
+        """
+        limite = horodatage - self.fenetre
+        self.adresses = {adresse_ip: suivi for adresse_ip, suivi in self.adresses.items() if suivi[0][-1] >= limite}
+        self.derniere_purge = horodatage
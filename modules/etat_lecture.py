@@ -0,0 +1,157 @@
+import os
+import json
+
+class EtatLecture:
+    def __init__(self, chemin_fichier='.etat_lecture.json', fenetre='1min'):
+        """
+        Constructeur qui initialise l'état de lecture incrémentale des fichiers de logs.
+        L'état est conservé entre deux exécutions dans un fichier JSON.
+
+        Paramètres :
+        chemin_fichier (str) : Chemin du fichier JSON dans lequel l'état est sauvegardé.
+        fenetre (str) : Intervalle de temps d'analyse ; les événements de la dernière fenêtre
+                        sont conservés pour que la détection reste correcte d'une exécution à l'autre.
+        """
+        self.chemin_fichier = chemin_fichier
+        self.fenetre = fenetre  # Convertie en durée au moment de conserver la fenêtre (pandas chargé à ce moment)
+        self.fichiers = {}  # Position de lecture par fichier, indexée par 'device:inode'
+        self.evenements_recents = []  # Événements de la dernière fenêtre de la lecture précédente
+        self.adresses_en_alerte = []  # Adresses IP encore en alerte à la fin de la lecture précédente
+        self.modifie = False  # Positions changées depuis la dernière sauvegarde
+        self.charger()
+        self.premiere_lecture = not self.fichiers  # Aucun fichier encore suivi : lecture initiale complète
+
+    @staticmethod
+    def cle_fichier(stat):
+        """
+        Construit la clé d'identification d'un fichier à partir de son device et de son inode.
+        Un fichier renommé par logrotate conserve ainsi sa position de lecture.
+        """
+        return f"{stat.st_dev}:{stat.st_ino}"
+
+    def charger(self):
+        """
+        Charge l'état sauvegardé lors de l'exécution précédente, s'il existe.
+        """
+        try:
+            with open(self.chemin_fichier, 'r') as f:
+                etat = json.load(f)
+            self.fichiers = etat.get('fichiers', {})
+            self.evenements_recents = etat.get('evenements_recents', [])
+            self.adresses_en_alerte = etat.get('adresses_en_alerte', [])
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Erreur lors de la lecture de l'état {self.chemin_fichier} : {e}, relecture complète des fichiers.")
+
+    def sauvegarder(self):
+        """
+        Sauvegarde l'état courant de manière atomique (fichier temporaire puis renommage).
+        """
+        self.modifie = False
+        fichier_temporaire = f"{self.chemin_fichier}.tmp"
+        with open(fichier_temporaire, 'w') as f:
+            json.dump({'fichiers': self.fichiers, 'evenements_recents': self.evenements_recents,
+                       'adresses_en_alerte': self.adresses_en_alerte}, f)
+        os.replace(fichier_temporaire, self.chemin_fichier)
+
+    def position(self, fichier_log, stat):
+        """
+        Renvoie la position (en octets) à partir de laquelle reprendre la lecture d'un fichier.
+
+        Paramètres :
+        fichier_log (str) : Chemin vers le fichier de logs.
+        stat (os.stat_result) : Résultat de os.stat sur le fichier ouvert.
+
+        Retourne :
+        int : La position de reprise, 0 si le fichier est nouveau ou a été tronqué.
+        """
+        entree = self.fichiers.get(self.cle_fichier(stat))
+        if entree is None:
+            return 0
+
+        # Fichier tronqué (copytruncate ou réécriture) : reprendre depuis le début
+        if stat.st_size < entree['offset']:
+            print(f"Le fichier {fichier_log} a été tronqué, relecture depuis le début.")
+            return 0
+
+        if entree['chemin'] != fichier_log:
+            print(f"Rotation détectée : {entree['chemin']} a été renommé en {fichier_log}.")
+
+        return entree['offset']
+
+    def archive_a_lire(self, fichier_log, stat):
+        """
+        Indique si une archive compressée doit être lue. Une archive déjà suivie ne change plus, et une
+        archive inconnue apparue après la première lecture provient de la compression d'un fichier déjà
+        suivi : son contenu a déjà été analysé.
+
+        Paramètres :
+        fichier_log (str) : Chemin vers l'archive.
+        stat (os.stat_result) : Résultat de os.stat sur l'archive.
+
+        Retourne :
+        bool : True si l'archive doit être lue.
+        """
+        if self.cle_fichier(stat) in self.fichiers:
+            return False
+        if not self.premiere_lecture:
+            print(f"Archive {fichier_log} ignorée : son contenu a déjà été analysé avant la compression.")
+            return False
+        return True
+
+    def mettre_a_jour(self, fichier_log, stat, offset):
+        """
+        Enregistre la position de lecture atteinte pour un fichier.
+
+        Paramètres :
+        fichier_log (str) : Chemin vers le fichier de logs.
+        stat (os.stat_result) : Résultat de os.stat sur le fichier ouvert.
+        offset (int) : Position juste après la dernière ligne complète lue.
+        """
+        entree = {'chemin': fichier_log, 'offset': offset}
+        cle = self.cle_fichier(stat)
+        if self.fichiers.get(cle) != entree:
+            self.fichiers[cle] = entree
+            self.modifie = True
+
+    def nettoyer(self, fichiers_logs):
+        """
+        Supprime de l'état les fichiers qui n'existent plus (rotation définitive, suppression).
+
+        Paramètres :
+        fichiers_logs (list) : Liste des fichiers de logs actuellement présents.
+        """
+        cles_presentes = set()
+        for fichier_log in fichiers_logs:
+            try:
+                cles_presentes.add(self.cle_fichier(os.stat(fichier_log)))
+            except FileNotFoundError:
+                continue
+        fichiers = {cle: entree for cle, entree in self.fichiers.items() if cle in cles_presentes}
+        if len(fichiers) != len(self.fichiers):
+            self.fichiers = fichiers
+            self.modifie = True
+
+    def conserver_fenetre(self, df_logs):
+        """
+        Conserve les événements situés dans la dernière fenêtre d'analyse, afin qu'une rafale
+        à cheval sur deux exécutions soit comptée en entier lors de l'exécution suivante.
+
+        Paramètres :
+        df_logs (pd.DataFrame) : DataFrame des événements extraits lors de cette exécution.
+        """
+        if df_logs.empty:
+            return
+
+        import pandas as pd
+
+        limite = df_logs['DateHeure'].max() - pd.Timedelta(self.fenetre)
+        recents = df_logs[df_logs['DateHeure'] >= limite]
+        self.evenements_recents = [
+            {'DateHeure': int(date_heure), 'Evenement': evenement, 'Utilisateur': utilisateur, 'AdresseIP': adresse_ip,
+             'Hote': hote}
+            for date_heure, evenement, utilisateur, adresse_ip, hote in zip(
+                recents['DateHeure'].astype('int64'), recents['Evenement'].astype(str),
+                recents['Utilisateur'].astype(str), recents['AdresseIP'].astype(str), recents['Hote'].astype(str))
+        ]
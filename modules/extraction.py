@@ -0,0 +1,422 @@
+import calendar
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from modules.regles import MoteurRegles, charger_regles
+
+# Taille des blocs lus en binaire (4 Mio)
+TAILLE_BLOC = 4 * 1024 * 1024
+
+MOIS = {mois.encode(): numero for numero, mois in enumerate(calendar.month_abbr) if mois}
+
+
+def lire_blocs(f, taille_bloc=TAILLE_BLOC, lignes_completes_seulement=False, limite=None):
+    """
+    Générateur qui lit un fichier ouvert en binaire par gros blocs, chaque bloc renvoyé se terminant
+    sur une fin de ligne.
+
+    Paramètres :
+    f (file) : Fichier ouvert en mode binaire, positionné à l'endroit où commencer la lecture.
+    taille_bloc (int) : Nombre d'octets lus à chaque appel à read.
+    lignes_completes_seulement (bool) : Si True, une dernière ligne sans fin de ligne (en cours d'écriture)
+                                        n'est pas renvoyée.
+    limite (int) : Nombre maximal d'octets à lire (par défaut jusqu'à la fin du fichier).
+    """
+    reste = b''
+    while limite is None or limite > 0:
+        donnees = f.read(taille_bloc if limite is None else min(taille_bloc, limite))
+        if not donnees:
+            break
+        if limite is not None:
+            limite -= len(donnees)
+        fin = donnees.rfind(b'\n')
+        if fin == -1:
+            reste += donnees
+            continue
+        yield reste + donnees[:fin + 1]
+        reste = donnees[fin + 1:]
+
+    if reste and not lignes_completes_seulement:
+        yield reste
+
+
+class ConvertisseurHorodatage:
+    def __init__(self, annee=None, reference=None):
+        """
+        Convertit les horodatages syslog 'Mon DD HH:MM:SS' en nanosecondes depuis l'epoch (int64).
+        La conversion du jour est mise en cache, et la dernière seconde convertie est mémorisée
+        puisque les lignes consécutives partagent très souvent le même horodatage.
+
+        Les horodatages syslog ne comportent pas l'année : sauf si elle est imposée, elle est déduite
+        d'un instant de référence (la date de modification du fichier, ou l'instant présent), postérieur
+        à toutes les lignes. Une date située après la référence appartient à l'année précédente, ce qui
+        traite le passage de décembre à janvier une fois par jour distinct et non pour chaque ligne.
+
+        Paramètres :
+        annee (int) : Année à appliquer à toutes les dates (désactive la déduction de l'année).
+        reference (float) : Instant de référence en secondes depuis l'epoch (par défaut l'instant présent).
+        """
+        self.annee_imposee = annee
+        self.reference = None
+        self.derniere_cle = None
+        self.derniere_valeur = None
+        self.definir_reference(time.time() if reference is None else reference)
+
+    def definir_reference(self, reference):
+        """
+        Change l'instant de référence utilisé pour déduire l'année (par exemple au changement de fichier).
+        Le cache des jours n'est vidé que si le jour de référence change.
+
+        Paramètres :
+        reference (float) : Instant de référence en secondes depuis l'epoch.
+        """
+        jour_reference = datetime.fromtimestamp(reference, timezone.utc).date()
+        if jour_reference == self.reference:
+            return
+        self.reference = jour_reference
+        self.jours = {}  # 'Mon DD' -> secondes depuis l'epoch à minuit
+        self.derniere_cle = None
+
+        if self.annee_imposee is not None:
+            self.annee = self.annee_imposee
+            self.limite = None
+        else:
+            # Une marge d'un jour absorbe le décalage entre l'heure locale des logs et l'heure UTC
+            lendemain = jour_reference + timedelta(days=1)
+            self.annee = jour_reference.year
+            self.limite = (lendemain.month, lendemain.day) if lendemain.year == self.annee else None
+
+    def __debut_jour(self, jour):
+        """
+        Renvoie le début du jour 'Mon DD' (bytes) en secondes depuis l'epoch, ou None si la date est invalide.
+        """
+        base = self.jours.get(jour)
+        if base is None:
+            try:
+                mois, numero_jour = MOIS[jour[:3]], int(jour[4:6])
+                annee = self.annee
+                if self.limite is not None and (mois, numero_jour) > self.limite:
+                    annee -= 1  # Date postérieure à la référence : année précédente
+                base = calendar.timegm(datetime(annee, mois, numero_jour).timetuple())
+            except (KeyError, ValueError):
+                return None
+            self.jours[jour] = base
+        return base
+
+    def convertir(self, horodatage):
+        """
+        Convertit un horodatage syslog (bytes) en nanosecondes depuis l'epoch.
+
+        Retourne :
+        int : L'horodatage en nanosecondes, ou None si la date est invalide (29 février d'une année non bissextile, etc.).
+        """
+        if horodatage == self.derniere_cle:
+            return self.derniere_valeur
+
+        base = self.__debut_jour(horodatage[:6])
+        if base is None:
+            return None
+
+        secondes = base + int(horodatage[7:9]) * 3600 + int(horodatage[10:12]) * 60 + int(horodatage[13:15])
+        self.derniere_cle = horodatage
+        self.derniere_valeur = secondes * 1_000_000_000
+        return self.derniere_valeur
+
+    def convertir_tableau(self, horodatages):
+        """
+        Convertit un tableau d'horodatages syslog (str) en nanosecondes depuis l'epoch, par opérations
+        sur tableaux : l'heure est calculée directement à partir des chiffres, et seuls les jours
+        distincts passent par le cache des jours. Les valeurs répétées ne sont traitées qu'une fois.
+
+        Paramètres :
+        horodatages (array-like) : Horodatages au format 'Mon DD HH:MM:SS'.
+
+        Retourne :
+        np.ndarray : Tableau int64 des horodatages en nanosecondes (valeur de NaT pour une date invalide).
+        """
+        import pandas as pd
+
+        nat = np.iinfo(np.int64).min
+        codes, valeurs = pd.factorize(np.asarray(horodatages, dtype=object))
+        try:
+            octets = np.asarray(valeurs, dtype='S15')
+        except UnicodeEncodeError:
+            octets = np.array([str(valeur).encode('ascii', 'replace')[:15] for valeur in valeurs], dtype='S15')
+
+        # Chiffres de l'heure aux positions fixes 'Mon DD HH:MM:SS'
+        caracteres = np.frombuffer(octets.tobytes(), dtype=np.uint8).reshape(-1, 15).astype(np.int64)
+        chiffres = caracteres[:, [7, 8, 10, 11, 13, 14]] - ord('0')
+        valides = ((chiffres >= 0) & (chiffres <= 9)).all(axis=1)
+        valides &= (caracteres[:, 9] == ord(':')) & (caracteres[:, 12] == ord(':')) & (caracteres[:, 6] == ord(' '))
+        valides &= np.char.str_len(octets) == 15
+        secondes = ((chiffres[:, 0] * 10 + chiffres[:, 1]) * 3600 + (chiffres[:, 2] * 10 + chiffres[:, 3]) * 60
+                    + chiffres[:, 4] * 10 + chiffres[:, 5])
+
+        # Début de chaque jour distinct, les 6 octets 'Mon DD' servant de clé entière
+        cles_jours = (caracteres[:, :6] << np.arange(0, 48, 8)).sum(axis=1)
+        cles_distinctes, codes_jours = np.unique(cles_jours, return_inverse=True)
+        jours = [int(cle).to_bytes(6, 'little') for cle in cles_distinctes]
+        debuts = np.array([self.__debut_jour(jour) for jour in jours], dtype=object)
+        jours_valides = np.array([debut is not None for debut in debuts], dtype=bool)
+        debuts = np.where(jours_valides, debuts, 0).astype(np.int64)
+        valides &= jours_valides[codes_jours]
+
+        table = np.empty(len(valeurs) + 1, dtype=np.int64)
+        table[:-1] = np.where(valides, (debuts[codes_jours] + secondes) * 1_000_000_000, nat)
+        table[-1] = nat  # Le code -1 (valeur manquante) désigne le dernier élément
+        return table[codes]
+
+
+class ColonnesEvenements:
+    def __init__(self):
+        """
+        Accumule les événements extraits directement sous forme de colonnes compactes :
+        horodatages en int64, événements, utilisateurs, adresses IP et hôtes émetteurs internés (un code
+        entier par ligne, chaque valeur distincte n'étant stockée qu'une fois). Les événements sans adresse
+        IP ou sans utilisateur (sudo, etc.) ont une valeur vide.
+
+        C'est cette représentation qui borne la mémoire de l'extraction : 21 octets par événement
+        retenu, quelle que soit la longueur des lignes, et rien pour les lignes non reconnues ; le
+        DataFrame n'est construit qu'une fois, à partir de ces colonnes.
+        """
+        self.horodatages = array('q')
+        self.evenements = array('b')
+        self.utilisateurs = array('i')
+        self.adresses_ip = array('i')
+        self.hotes = array('i')
+        self.dictionnaire_evenements = {}  # libellé (bytes) -> code
+        self.dictionnaire_utilisateurs = {}  # valeur (bytes) -> code
+        self.dictionnaire_ips = {}  # valeur (bytes) -> code
+        self.dictionnaire_hotes = {}  # valeur (bytes) -> code
+        # Volume lu pour obtenir ces événements (pour les métriques ; non enregistré dans le cache)
+        self.lignes_lues = 0
+        self.octets_lus = 0
+
+    def __len__(self):
+        return len(self.horodatages)
+
+    def ajouter(self, horodatage, evenement, utilisateur, adresse_ip, hote=b''):
+        """
+        Ajoute un événement aux colonnes.
+
+        Paramètres :
+        horodatage (int) : Horodatage en nanosecondes depuis l'epoch.
+        evenement (bytes) : Libellé de l'événement.
+        utilisateur (bytes) : Nom d'utilisateur.
+        adresse_ip (bytes) : Adresse IP source.
+        hote (bytes) : Hôte qui a émis la ligne de log.
+        """
+        code_evenement = self.dictionnaire_evenements.get(evenement)
+        if code_evenement is None:
+            code_evenement = self.dictionnaire_evenements[evenement] = len(self.dictionnaire_evenements)
+        code_utilisateur = self.dictionnaire_utilisateurs.get(utilisateur)
+        if code_utilisateur is None:
+            code_utilisateur = self.dictionnaire_utilisateurs[utilisateur] = len(self.dictionnaire_utilisateurs)
+        code_ip = self.dictionnaire_ips.get(adresse_ip)
+        if code_ip is None:
+            code_ip = self.dictionnaire_ips[adresse_ip] = len(self.dictionnaire_ips)
+        code_hote = self.dictionnaire_hotes.get(hote)
+        if code_hote is None:
+            code_hote = self.dictionnaire_hotes[hote] = len(self.dictionnaire_hotes)
+
+        self.horodatages.append(horodatage)
+        self.evenements.append(code_evenement)
+        self.utilisateurs.append(code_utilisateur)
+        self.adresses_ip.append(code_ip)
+        self.hotes.append(code_hote)
+
+    def ajouter_evenement(self, evenement):
+        """
+        Ajoute un événement fourni sous forme de dictionnaire (par exemple issu de l'état de lecture).
+
+        Paramètres :
+        evenement (dict) : Dictionnaire avec les clés 'DateHeure' (int, nanosecondes), 'Evenement',
+                           'Utilisateur', 'AdresseIP' et 'Hote' (facultative).
+        """
+        self.ajouter(evenement['DateHeure'], evenement['Evenement'].encode(), evenement['Utilisateur'].encode(),
+                     evenement['AdresseIP'].encode(), evenement.get('Hote', '').encode())
+
+    def liste_adresses_ip(self):
+        """
+        Renvoie la liste des adresses IP (str) des événements, dans l'ordre des colonnes.
+        """
+        valeurs = [valeur.decode('ascii') for valeur in self.dictionnaire_ips]
+        return [valeurs[code] for code in self.adresses_ip]
+
+    def acces_a_compter(self, evenements):
+        """
+        Renvoie les horodatages et adresses IP des événements pris en compte pour la détection :
+        ceux dont le libellé fait partie des événements donnés et qui ont une adresse IP.
+
+        Paramètres :
+        evenements (set) : Libellés (str) des événements à prendre en compte.
+
+        Retourne :
+        tuple : (liste des horodatages, liste des adresses IP), dans l'ordre des colonnes.
+        """
+        codes = [code for valeur, code in self.dictionnaire_evenements.items() if valeur.decode() in evenements]
+        masque = np.isin(np.frombuffer(self.evenements, dtype=np.int8), codes)
+        if b'' in self.dictionnaire_ips:
+            masque &= np.frombuffer(self.adresses_ip, dtype=np.int32) != self.dictionnaire_ips[b'']
+        if masque.all():
+            return self.horodatages, self.liste_adresses_ip()
+        indices = np.flatnonzero(masque)
+        adresses_ip = self.liste_adresses_ip()
+        return np.frombuffer(self.horodatages, dtype=np.int64)[indices].tolist(), [adresses_ip[i] for i in indices]
+
+    def fusionner(self, autre):
+        """
+        Ajoute à la suite les événements d'un autre jeu de colonnes (par exemple extrait par un autre
+        processus), en recodant ses valeurs internées dans les dictionnaires de celui-ci.
+
+        Paramètres :
+        autre (ColonnesEvenements) : Les colonnes à ajouter.
+        """
+        self.horodatages.extend(autre.horodatages)
+        self.evenements.frombytes(self.__recoder(autre.evenements, autre.dictionnaire_evenements,
+                                                 self.dictionnaire_evenements, np.int8))
+        self.utilisateurs.frombytes(self.__recoder(autre.utilisateurs, autre.dictionnaire_utilisateurs,
+                                                   self.dictionnaire_utilisateurs))
+        self.adresses_ip.frombytes(self.__recoder(autre.adresses_ip, autre.dictionnaire_ips, self.dictionnaire_ips))
+        self.hotes.frombytes(self.__recoder(autre.hotes, autre.dictionnaire_hotes, self.dictionnaire_hotes))
+        self.lignes_lues += autre.lignes_lues
+        self.octets_lus += autre.octets_lus
+
+    @staticmethod
+    def __recoder(codes, dictionnaire_source, dictionnaire_cible, type_codes=np.int32):
+        """
+        Traduit des codes d'un dictionnaire source vers un dictionnaire cible (complété au besoin),
+        avec une table de correspondance appliquée en une seule opération NumPy.
+        """
+        correspondance = np.empty(len(dictionnaire_source), dtype=type_codes)
+        for code_source, valeur in enumerate(dictionnaire_source):
+            code_cible = dictionnaire_cible.get(valeur)
+            if code_cible is None:
+                code_cible = dictionnaire_cible[valeur] = len(dictionnaire_cible)
+            correspondance[code_source] = code_cible
+        return correspondance[np.frombuffer(codes, dtype=type_codes)].tobytes()
+
+    def vers_tableaux(self):
+        """
+        Renvoie les colonnes sous forme de tableaux NumPy (sans objets Python), pour l'enregistrement sur disque.
+        Les valeurs internées sont concaténées, séparées par des fins de ligne qu'elles ne peuvent pas contenir.
+        """
+        return {
+            'horodatages': np.frombuffer(self.horodatages, dtype=np.int64),
+            'evenements': np.frombuffer(self.evenements, dtype=np.int8),
+            'utilisateurs': np.frombuffer(self.utilisateurs, dtype=np.int32),
+            'adresses_ip': np.frombuffer(self.adresses_ip, dtype=np.int32),
+            'hotes': np.frombuffer(self.hotes, dtype=np.int32),
+            'valeurs_evenements': np.frombuffer(b'\n'.join(self.dictionnaire_evenements), dtype=np.uint8),
+            'valeurs_utilisateurs': np.frombuffer(b'\n'.join(self.dictionnaire_utilisateurs), dtype=np.uint8),
+            'valeurs_ips': np.frombuffer(b'\n'.join(self.dictionnaire_ips), dtype=np.uint8),
+            'valeurs_hotes': np.frombuffer(b'\n'.join(self.dictionnaire_hotes), dtype=np.uint8),
+            'nb_valeurs': np.array([len(self.dictionnaire_evenements), len(self.dictionnaire_utilisateurs),
+                                    len(self.dictionnaire_ips), len(self.dictionnaire_hotes)], dtype=np.int64),
+        }
+
+    @classmethod
+    def depuis_tableaux(cls, tableaux):
+        """
+        Reconstruit des colonnes à partir des tableaux produits par vers_tableaux.
+        """
+        colonnes = cls()
+        colonnes.horodatages.frombytes(tableaux['horodatages'].tobytes())
+        colonnes.evenements.frombytes(tableaux['evenements'].tobytes())
+        colonnes.utilisateurs.frombytes(tableaux['utilisateurs'].tobytes())
+        colonnes.adresses_ip.frombytes(tableaux['adresses_ip'].tobytes())
+        colonnes.hotes.frombytes(tableaux['hotes'].tobytes())
+
+        for nom, nb_valeurs in zip(('evenements', 'utilisateurs', 'ips', 'hotes'), tableaux['nb_valeurs'].tolist()):
+            if nb_valeurs:
+                valeurs = tableaux[f'valeurs_{nom}'].tobytes().split(b'\n')
+                setattr(colonnes, f'dictionnaire_{nom}', {valeur: code for code, valeur in enumerate(valeurs)})
+        return colonnes
+
+    @staticmethod
+    def __categorielle(codes, dictionnaire):
+        """
+        Construit une colonne catégorielle à partir de codes et de leur dictionnaire de valeurs (bytes).
+        Les valeurs non UTF-8 (noms d'utilisateur envoyés par un attaquant, etc.) sont décodées avec
+        des séquences d'échappement ; deux valeurs décodées identiques sont fusionnées.
+        """
+        import pandas as pd
+
+        valeurs = [valeur.decode('utf-8', 'backslashreplace') for valeur in dictionnaire]
+        codes_valeurs, categories = pd.factorize(np.array(valeurs, dtype=object))
+        if len(categories) < len(valeurs):
+            codes = codes_valeurs[codes]
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    def vers_dataframe(self):
+        """
+        Construit un DataFrame à partir des colonnes accumulées, sans passer par des objets Python par ligne.
+
+        Retourne :
+        pd.DataFrame : DataFrame avec les colonnes 'DateHeure' (datetime64), 'Evenement', 'Utilisateur',
+                       'AdresseIP' et 'Hote' (catégorielles).
+        """
+        # Pandas n'est chargé que pour construire un DataFrame : l'extraction seule s'en passe
+        import pandas as pd
+
+        return pd.DataFrame({
+            'DateHeure': pd.to_datetime(np.frombuffer(self.horodatages, dtype=np.int64)),
+            'Evenement': self.__categorielle(np.frombuffer(self.evenements, dtype=np.int8),
+                                             self.dictionnaire_evenements),
+            'Utilisateur': self.__categorielle(np.frombuffer(self.utilisateurs, dtype=np.int32),
+                                               self.dictionnaire_utilisateurs),
+            'AdresseIP': self.__categorielle(np.frombuffer(self.adresses_ip, dtype=np.int32), self.dictionnaire_ips),
+            'Hote': self.__categorielle(np.frombuffer(self.hotes, dtype=np.int32), self.dictionnaire_hotes),
+        })
+
+
+class ExtracteurEvenements:
+    def __init__(self, annee=None, reference=None, regles=None):
+        """
+        Moteur d'extraction en flux : les lignes candidates sont repérées par une simple recherche
+        des littéraux des règles sur le bloc entier, et chaque ligne candidate n'est analysée que par
+        l'expression rationnelle d'une seule règle.
+
+        Paramètres :
+        annee (int) : Année à appliquer aux horodatages (par défaut déduite de l'instant de référence).
+        reference (float) : Instant de référence pour déduire l'année, en secondes depuis l'epoch
+                            (par défaut l'instant présent).
+        regles (list) : Règles d'extraction (par défaut celles du fichier 'config.ini', ou les règles par défaut).
+        """
+        self.convertisseur = ConvertisseurHorodatage(annee, reference)
+        self.moteur = MoteurRegles(charger_regles() if regles is None else regles)
+        # Événements pris en compte pour la détection des adresses IP trop actives
+        self.evenements_comptes = self.moteur.evenements_comptes
+
+    def definir_reference(self, reference):
+        """
+        Change l'instant de référence utilisé pour déduire l'année des horodatages
+        (date de modification du fichier lu, ou instant présent pour une lecture en continu).
+        """
+        self.convertisseur.definir_reference(reference)
+
+    def extraire_bloc(self, bloc, colonnes):
+        """
+        Extrait les événements d'un bloc de lignes complètes et les ajoute aux colonnes.
+
+        Paramètres :
+        bloc (bytes) : Bloc de lignes de logs.
+        colonnes (ColonnesEvenements) : Colonnes dans lesquelles accumuler les événements.
+        """
+        # Méthodes liées en variables locales : cette boucle est exécutée pour chaque ligne candidate
+        analyser = self.moteur.analyser
+        trouver = bloc.find
+        convertir = self.convertisseur.convertir
+        ajouter = colonnes.ajouter
+        taille = len(bloc)
+        colonnes.lignes_lues += bloc.count(b'\n')
+        colonnes.octets_lus += taille
+
+        for debut, indice in self.moteur.lignes_candidates(bloc):
+            fin = trouver(b'\n', debut)
+            resultat = analyser(bloc, debut, fin if fin != -1 else taille, indice)
+            if resultat is not None:
+                horodatage = convertir(resultat[0])
+                if horodatage is not None:
+                    ajouter(horodatage, *resultat[1:])
@@ -0,0 +1,216 @@
+import os
+import bz2
+import gzip
+import lzma
+import random
+from datetime import datetime, timezone
+
+# Extensions des archives selon le format de compression
+EXTENSIONS = {'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz', 'zstd': '.zst'}
+
+UTILISATEURS_ATTAQUES = ('root', 'admin', 'test', 'oracle', 'postgres', 'ubuntu', 'user', 'git', 'pi', 'ftpuser',
+                         'guest', 'support', 'deploy', 'jenkins', 'hadoop', 'minecraft', 'debian', 'centos')
+UTILISATEURS_LEGITIMES = ('alice', 'bob', 'carol', 'dave', 'erin', 'frank')
+
+
+def ouvrir_en_ecriture(fichier_log, format_compression=None):
+    """
+    Ouvre un fichier en écriture binaire, compressé au format demandé.
+
+    Paramètres :
+    fichier_log (str) : Chemin du fichier.
+    format_compression (str) : 'gzip', 'bz2', 'xz', 'zstd' ou None.
+    """
+    if format_compression == 'gzip':
+        return gzip.open(fichier_log, 'wb')
+    if format_compression == 'bz2':
+        return bz2.open(fichier_log, 'wb')
+    if format_compression == 'xz':
+        return lzma.open(fichier_log, 'wb')
+    if format_compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor().stream_writer(open(fichier_log, 'wb'), closefd=True)
+    return open(fichier_log, 'wb')
+
+
+class GenerateurLogs:
+    def __init__(self, graine=42, proportion_attaques=0.1, nb_attaquants=200, taille_rafale=(5, 40),
+                 intervalle_rafale=(0.05, 1.5), proportion_ipv6=0.05, debut=datetime(2024, 9, 29),
+                 sequences_par_seconde=5):
+        """
+        Générateur déterministe de fichiers de logs 'secure' réalistes (sshd, PAM, sudo, cron) pour les
+        mesures de performance : une même graine produit toujours les mêmes fichiers.
+
+        Paramètres :
+        graine (int) : Graine du générateur pseudo-aléatoire.
+        proportion_attaques (float) : Proportion des lignes produites par des attaquants.
+        nb_attaquants (int) : Nombre d'adresses IP attaquantes distinctes.
+        taille_rafale (tuple) : Nombre minimal et maximal de tentatives d'une rafale d'attaque.
+        intervalle_rafale (tuple) : Intervalle minimal et maximal, en secondes, entre deux tentatives d'une rafale.
+        proportion_ipv6 (float) : Proportion des adresses IP en IPv6.
+        debut (datetime) : Horodatage de la première ligne.
+        sequences_par_seconde (float) : Nombre moyen de séquences (connexion, commande sudo, rafale d'attaque...)
+                                        commençant chaque seconde, qui détermine la période couverte.
+        """
+        self.aleatoire = random.Random(graine)
+        self.proportion_attaques = proportion_attaques
+        self.taille_rafale = taille_rafale
+        self.intervalle_rafale = intervalle_rafale
+        self.debut = debut
+        self.intervalle_moyen = 1.0 / sequences_par_seconde
+
+        hasard = self.aleatoire
+        self.attaquants = [self.__adresse_ip(hasard.random() < proportion_ipv6) for _ in range(nb_attaquants)]
+        self.clients = [self.__adresse_ip(hasard.random() < proportion_ipv6) for _ in range(50)]
+
+    def __adresse_ip(self, ipv6):
+        hasard = self.aleatoire
+        if ipv6:
+            return f"2001:db8:{hasard.randrange(65536):x}::{hasard.randrange(1, 65536):x}"
+        return f"{hasard.randrange(1, 224)}.{hasard.randrange(256)}.{hasard.randrange(256)}.{hasard.randrange(1, 255)}"
+
+    def __rafale(self, horodatage, pid):
+        """
+        Génère une rafale de tentatives d'une même adresse IP, à quelques fractions de seconde d'intervalle.
+        """
+        hasard = self.aleatoire
+        adresse_ip = hasard.choice(self.attaquants)
+        lignes = []
+        for _ in range(hasard.randint(*self.taille_rafale)):
+            horodatage += hasard.uniform(*self.intervalle_rafale)
+            pid += 1
+            port = hasard.randrange(1024, 65536)
+            utilisateur = hasard.choice(UTILISATEURS_ATTAQUES)
+            if utilisateur == 'root':
+                messages = (
+                    f"sshd[{pid}]: pam_unix(sshd:auth): authentication failure; logname= uid=0 euid=0 tty=ssh "
+                    f"ruser= rhost={adresse_ip}  user=root",
+                    f"sshd[{pid}]: Failed password for root from {adresse_ip} port {port} ssh2",
+                )
+            else:
+                messages = (
+                    f"sshd[{pid}]: Invalid user {utilisateur} from {adresse_ip} port {port}",
+                    f"sshd[{pid}]: Failed password for invalid user {utilisateur} from {adresse_ip} port {port} ssh2",
+                )
+            messages += (f"sshd[{pid}]: Connection closed by {adresse_ip} port {port} [preauth]",)
+            lignes.extend((horodatage, message) for message in messages)
+        return lignes, horodatage, pid
+
+    def __activite_normale(self, horodatage, pid):
+        """
+        Génère une séquence d'activité légitime (connexion SSH, sudo, cron).
+        """
+        hasard = self.aleatoire
+        pid += 1
+        choix = hasard.random()
+        if choix < 0.4:
+            utilisateur = hasard.choice(UTILISATEURS_LEGITIMES)
+            adresse_ip = hasard.choice(self.clients)
+            port = hasard.randrange(1024, 65536)
+            messages = (
+                f"sshd[{pid}]: Accepted publickey for {utilisateur} from {adresse_ip} port {port} ssh2",
+                f"sshd[{pid}]: pam_unix(sshd:session): session opened for user {utilisateur}(uid=1000) by (uid=0)",
+                f"sshd[{pid}]: pam_unix(sshd:session): session closed for user {utilisateur}",
+            )
+        elif choix < 0.6:
+            utilisateur = hasard.choice(UTILISATEURS_LEGITIMES)
+            messages = (
+                f"sudo[{pid}]:    {utilisateur} : TTY=pts/0 ; PWD=/home/{utilisateur} ; USER=root ; "
+                f"COMMAND=/usr/bin/systemctl status sshd",
+                f"sudo[{pid}]: pam_unix(sudo:session): session opened for user root(uid=0) by {utilisateur}(uid=1000)",
+                f"sudo[{pid}]: pam_unix(sudo:session): session closed for user root",
+            )
+        else:
+            messages = (
+                f"CROND[{pid}]: pam_unix(crond:session): session opened for user root(uid=0) by (uid=0)",
+                f"CROND[{pid}]: pam_unix(crond:session): session closed for user root",
+            )
+        lignes = []
+        for message in messages:
+            horodatage += hasard.uniform(0.01, 0.5)
+            lignes.append((horodatage, message))
+        return lignes, horodatage, pid
+
+    def lignes(self, nb_lignes):
+        """
+        Générateur des lignes de log (str, sans fin de ligne) dans l'ordre chronologique, avec leur horodatage.
+
+        Paramètres :
+        nb_lignes (int) : Nombre de lignes à produire.
+
+        Retourne :
+        iterator : Tuples (horodatage en secondes depuis l'epoch, ligne).
+        """
+        hasard = self.aleatoire
+        horodatage = self.debut.replace(tzinfo=timezone.utc).timestamp()
+        pid = 1000
+        produites = 0
+        lignes_attaques = 0
+        dates = {}  # seconde -> date au format syslog
+        while produites < nb_lignes:
+            horodatage += hasard.expovariate(1.0 / self.intervalle_moyen)
+            # Choisir une rafale d'attaque ou de l'activité normale pour tenir la proportion demandée
+            if lignes_attaques < self.proportion_attaques * (produites + 1):
+                sequence, fin, pid = self.__rafale(horodatage, pid)
+                lignes_attaques += len(sequence)
+            else:
+                sequence, fin, pid = self.__activite_normale(horodatage, pid)
+            for instant, message in sequence[:nb_lignes - produites]:
+                seconde = int(instant)
+                date = dates.get(seconde)
+                if date is None:
+                    date = datetime.fromtimestamp(seconde, timezone.utc).strftime('%b %d %H:%M:%S')
+                    if date[4] == '0':
+                        date = date[:4] + ' ' + date[5:]  # Jour complété par une espace, comme syslog
+                    dates = {seconde: date}
+                yield instant, f"{date} serveur {message}"
+            produites += len(sequence)
+            horodatage = max(horodatage, fin)
+
+    def generer(self, repertoire, nb_lignes, rotations=0, compression=None):
+        """
+        Écrit les fichiers de logs : les lignes sont réparties chronologiquement entre le fichier courant
+        'secure' et rotations fichiers tournés 'secure.1' (le plus récent) à 'secure.N' (compressés si
+        demandé). La date de modification de chaque fichier est celle de sa dernière ligne.
+
+        Paramètres :
+        repertoire (str) : Répertoire de destination (créé au besoin).
+        nb_lignes (int) : Nombre total de lignes.
+        rotations (int) : Nombre de fichiers tournés.
+        compression (str) : Format de compression des fichiers tournés ('gzip', 'bz2', 'xz', 'zstd') ou None.
+
+        Retourne :
+        dict : Statistiques de la génération (fichiers, lignes, octets non compressés).
+        """
+        os.makedirs(repertoire, exist_ok=True)
+        nb_fichiers = rotations + 1
+        lignes_par_fichier = [nb_lignes // nb_fichiers + (1 if i < nb_lignes % nb_fichiers else 0)
+                              for i in range(nb_fichiers)]
+        lignes = self.lignes(nb_lignes)
+
+        fichiers = []
+        octets = 0
+        for numero, nb in enumerate(lignes_par_fichier):
+            contenu = []
+            dernier = self.debut.replace(tzinfo=timezone.utc).timestamp()
+            for _ in range(nb):
+                dernier, ligne = next(lignes)
+                contenu.append(ligne)
+            donnees = ('\n'.join(contenu) + '\n').encode() if contenu else b''
+            octets += len(donnees)
+
+            if numero == nb_fichiers - 1:
+                chemin = os.path.join(repertoire, 'secure')
+                format_compression = None
+            else:
+                chemin = os.path.join(repertoire, f"secure.{nb_fichiers - 1 - numero}")
+                format_compression = compression
+                if compression is not None:
+                    chemin += EXTENSIONS[compression]
+
+            with ouvrir_en_ecriture(chemin, format_compression) as f:
+                f.write(donnees)
+            os.utime(chemin, (dernier, dernier))
+            fichiers.append(chemin)
+
+        return {'fichiers': fichiers, 'lignes': nb_lignes, 'octets': octets}
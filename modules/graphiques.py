@@ -0,0 +1,138 @@
+import os
+import numpy as np
+
+# Nombre de points au-delà duquel une série est réduite par regroupement de périodes consécutives
+NB_POINTS = 500
+
+# Unité numpy de chaque pas de série
+PAS = {'heure': 'h', 'jour': 'D'}
+
+# Formats de fichier pris en charge (déduits de l'extension)
+FORMATS = ('png', 'svg')
+
+
+def format_fichier(fichier):
+    """
+    Renvoie le format d'un fichier de graphique d'après son extension.
+
+    Retourne :
+    str : 'png' ou 'svg'.
+    """
+    extension = os.path.splitext(fichier)[1].lower().lstrip('.')
+    if extension not in FORMATS:
+        raise ValueError(f"Format de graphique non pris en charge : '{fichier}' (extensions acceptées : "
+                         f"{', '.join('.' + format for format in FORMATS)}).")
+    return extension
+
+
+def completer(periodes, nombres, pas):
+    """
+    Range des nombres d'événements par période sur une suite continue de périodes, les périodes absentes
+    comptant zéro. Les nombres d'une même période sont additionnés.
+
+    Paramètres :
+    periodes (array-like) : Périodes (datetime64, datetime ou chaînes 'YYYY-MM-DD[ HH:00]').
+    nombres (array-like) : Nombre d'événements de chaque période, ou None pour compter un événement par période.
+    pas (str) : 'heure' ou 'jour'.
+
+    Retourne :
+    tuple : (périodes consécutives en datetime64, nombres d'événements en int64).
+    """
+    periodes = np.asarray(periodes, dtype=f'datetime64[{PAS[pas]}]')
+    if not len(periodes):
+        return periodes, np.zeros(0, dtype=np.int64)
+    debut = periodes.min()
+    indices = (periodes - debut).astype(np.int64)
+    valeurs = np.bincount(indices, weights=None if nombres is None else np.asarray(nombres, dtype=np.float64))
+    return np.arange(debut, debut + len(valeurs)), valeurs.astype(np.int64)
+
+
+def reduire(periodes, valeurs, nb_points=NB_POINTS):
+    """
+    Réduit une série à nb_points points au plus en additionnant les valeurs de tranches de périodes
+    consécutives de même taille (la dernière tranche peut être incomplète).
+
+    Retourne :
+    tuple : (début de chaque tranche, total de chaque tranche, nombre de périodes par tranche).
+    """
+    taille = max(1, -(-len(valeurs) // nb_points))
+    if taille == 1:
+        return periodes, valeurs, 1
+    nb_tranches = -(-len(valeurs) // taille)
+    valeurs = np.concatenate([valeurs, np.zeros(nb_tranches * taille - len(valeurs), dtype=valeurs.dtype)])
+    return periodes[::taille], valeurs.reshape(nb_tranches, taille).sum(axis=1), taille
+
+
+def creer_figure():
+    """
+    Crée une figure rendue par Agg, indépendante de pyplot : aucune fenêtre n'est ouverte, rien ne bloque
+    et aucun serveur d'affichage n'est nécessaire.
+    """
+    from matplotlib.figure import Figure  # Chargé seulement lors du tracé
+
+    figure = Figure(figsize=(10, 5), layout='constrained')
+    return figure, figure.add_subplot()
+
+
+def enregistrer_serie(fichier, periodes, nombres, pas='jour', titre="Évolution des événements critiques",
+                      nb_points=NB_POINTS):
+    """
+    Trace le nombre d'événements par heure ou par jour dans un fichier PNG ou SVG, à partir de nombres
+    déjà agrégés par période. Une longue série est réduite à nb_points points.
+
+    Paramètres :
+    fichier (str) : Fichier à écrire ('.png' ou '.svg').
+    periodes (array-like) : Périodes, éventuellement non consécutives (les absentes comptent zéro).
+    nombres (array-like) : Nombre d'événements de chaque période.
+    pas (str) : 'heure' ou 'jour'.
+    titre (str) : Titre du graphique.
+    nb_points (int) : Nombre maximal de points tracés.
+
+    Retourne :
+    int : Le nombre de périodes regroupées par point tracé.
+    """
+    format_graphique = format_fichier(fichier)
+    periodes, valeurs = completer(periodes, nombres, pas)
+    periodes, valeurs, taille = reduire(periodes, valeurs, nb_points)
+
+    import matplotlib.dates as mdates
+
+    # La dernière tranche est prolongée jusqu'à sa fin, pour que chaque palier ait sa largeur
+    periodes = np.append(periodes, periodes[-1] + np.timedelta64(taille, PAS[pas]))
+    valeurs = np.append(valeurs, valeurs[-1])
+
+    figure, axes = creer_figure()
+    axes.plot(periodes, valeurs, drawstyle='steps-post', color='tab:blue', linewidth=1)
+    axes.fill_between(periodes, valeurs, step='post', color='tab:blue', alpha=0.2)
+    localisateur = mdates.AutoDateLocator()
+    axes.xaxis.set_major_locator(localisateur)
+    axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(localisateur))
+    axes.set_ylabel(f"Événements par {pas}" if taille == 1 else f"Événements par tranche de {taille} {pas}s")
+    axes.set_title(titre)
+    axes.set_ylim(bottom=0)
+    axes.grid(True, alpha=0.3)
+    figure.savefig(fichier, format=format_graphique)
+    return taille
+
+
+def enregistrer_barres(fichier, etiquettes, nombres, titre="Adresses IP les plus actives"):
+    """
+    Trace des nombres d'événements par adresse IP (ou par utilisateur...) en barres horizontales, dans
+    un fichier PNG ou SVG. La première étiquette est placée en haut.
+
+    Paramètres :
+    fichier (str) : Fichier à écrire ('.png' ou '.svg').
+    etiquettes (list) : Étiquettes des barres.
+    nombres (list) : Nombre d'événements de chaque barre.
+    titre (str) : Titre du graphique.
+    """
+    format_graphique = format_fichier(fichier)
+    figure, axes = creer_figure()
+    figure.set_figheight(max(3, 0.3 * len(etiquettes) + 1))
+    positions = np.arange(len(etiquettes))[::-1]
+    axes.barh(positions, nombres, color='tab:red')
+    axes.set_yticks(positions, [str(etiquette) for etiquette in etiquettes])
+    axes.set_xlabel("Nombre d'événements")
+    axes.set_title(titre)
+    axes.grid(True, axis='x', alpha=0.3)
+    figure.savefig(fichier, format=format_graphique)
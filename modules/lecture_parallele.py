@@ -0,0 +1,117 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from modules.compression import ouvrir_fichier_log, ERREURS_DECOMPRESSION
+from modules.extraction import ExtracteurEvenements, ColonnesEvenements, lire_blocs
+
+# Taille visée pour chaque segment de fichier confié à un processus (64 Mio)
+TAILLE_SEGMENT = 64 * 1024 * 1024
+
+
+def fin_derniere_ligne(f, taille):
+    """
+    Renvoie la position juste après la dernière fin de ligne d'un fichier ouvert en binaire,
+    c'est-à-dire la fin de la dernière ligne complète.
+
+    Paramètres :
+    f (file) : Fichier ouvert en mode binaire.
+    taille (int) : Taille du fichier au moment de la lecture.
+    """
+    position = taille
+    while position > 0:
+        debut = max(0, position - 65536)
+        f.seek(debut)
+        donnees = f.read(position - debut)
+        fin = donnees.rfind(b'\n')
+        if fin != -1:
+            return debut + fin + 1
+        position = debut
+    return 0
+
+
+def decouper_fichier(f, debut, fin, taille_segment=TAILLE_SEGMENT):
+    """
+    Découpe la plage [debut, fin) d'un fichier ouvert en binaire en segments d'environ taille_segment
+    octets, chaque coupure étant placée au début d'une ligne.
+
+    Retourne :
+    list : Liste de tuples (debut, fin) des segments, dans l'ordre du fichier.
+    """
+    segments = []
+    while fin - debut > taille_segment:
+        f.seek(debut + taille_segment)
+        coupure = f.tell() + len(f.readline())
+        if coupure >= fin:
+            break
+        segments.append((debut, coupure))
+        debut = coupure
+    if fin > debut:
+        segments.append((debut, fin))
+    return segments
+
+
+def extraire_segment(fichier_log, debut, fin, reference, annee=None, regles=None):
+    """
+    Extrait les événements d'un segment de fichier. Exécutée dans un processus du pool, elle renvoie
+    des colonnes compactes (tableaux d'entiers et dictionnaires d'internement) plutôt que des objets par ligne.
+
+    Paramètres :
+    fichier_log (str) : Chemin vers le fichier de logs.
+    debut (int) : Position de début du segment (début de ligne).
+    fin (int) : Position de fin du segment (début de ligne ou fin de fichier), None pour lire
+                jusqu'au bout (archive compressée, qui ne peut pas être découpée).
+    reference (float) : Date de modification du fichier, dont est déduite l'année des horodatages ;
+                        identique pour tous les segments d'un même fichier.
+    annee (int) : Année imposée aux horodatages (None pour la déduire de la référence).
+    regles (list) : Règles d'extraction, transmises par le processus principal.
+
+    Retourne :
+    ColonnesEvenements : Les événements extraits du segment.
+    """
+    extracteur = ExtracteurEvenements(annee, reference, regles)
+    colonnes = ColonnesEvenements()
+    with ouvrir_fichier_log(fichier_log) as f:
+        if debut:
+            f.seek(debut)
+        for bloc in lire_blocs(f, limite=None if fin is None else fin - debut):
+            extracteur.extraire_bloc(bloc, colonnes)
+    return colonnes
+
+
+def resultat_ou_erreur(future):
+    """
+    Renvoie le résultat d'une tâche du pool, ou l'exception qu'elle a levée si le fichier est illisible
+    (archive tronquée ou corrompue, format non supporté...), pour que les autres fichiers soient traités.
+    """
+    try:
+        return future.result()
+    except ERREURS_DECOMPRESSION as e:
+        return e
+
+
+def extraire_fichiers_en_parallele(taches, annee, workers, regles=None):
+    """
+    Extrait en parallèle les segments de fichiers demandés et renvoie les résultats dans l'ordre des tâches.
+
+    Paramètres :
+    taches (list) : Liste de tuples (fichier_log, debut, fin, reference).
+    annee (int) : Année imposée aux horodatages (None pour la déduire de la référence de chaque fichier).
+    workers (int) : Nombre de processus.
+    regles (list) : Règles d'extraction (par défaut celles de la configuration).
+
+    Retourne :
+    list : Liste de ColonnesEvenements, une par tâche ; une tâche en échec (fichier illisible) est
+           représentée par l'exception levée.
+    """
+    workers = min(workers, len(taches), os.cpu_count() or 1)
+    if workers <= 1:
+        resultats = []
+        for tache in taches:
+            try:
+                resultats.append(extraire_segment(*tache, annee, regles))
+            except ERREURS_DECOMPRESSION as e:
+                resultats.append(e)
+        return resultats
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(extraire_segment, *tache, annee, regles) for tache in taches]
+        return [resultat_ou_erreur(future) for future in futures]
@@ -1,81 +1,272 @@
+import ipaddress
 import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime
-import sqlite3
+from modules.extraction import ConvertisseurHorodatage
+from modules.persistance import BaseEvenements
+from modules.detecteur import DetecteurFenetreGlissante
+from modules.prefixes import IndexPrefixes
+from modules.graphiques import NB_POINTS, completer, reduire, enregistrer_serie, enregistrer_barres  # Graphiques sans affichage
 
 class LogAnalyzer:
-    def __init__(self, df_logs):
+    def __init__(self, df_logs, annee=None, reference=None):
         """
         Constructeur qui initialise l'objet LogAnalyzer avec un DataFrame contenant les logs extraits.
 
         Paramètres :
         df_logs (pd.DataFrame) : Le DataFrame contenant les informations extraites des logs.
+        annee (int) : Année à appliquer aux dates syslog si la colonne 'DateHeure' est textuelle
+                      (par défaut déduite de l'instant de référence).
+        reference (float) : Instant de référence pour déduire l'année, par exemple la date de modification
+                            du fichier de logs (par défaut l'instant présent).
         """
         self.df_logs = df_logs
+        self.adresses_suspectes = None  # Adresses IP détectées par la dernière analyse de fréquence
+        self.adresses_en_alerte = None  # Adresses IP encore au-dessus du seuil à la fin de cette analyse
+        self.index_prefixes = None  # Index des accès par préfixe réseau de la dernière analyse par préfixe
+        self.comptes_par_heure = None  # Nombre d'événements par heure, calculé une fois pour les graphiques
         # Convertir la colonne 'DateHeure' en datetime si ce n'est pas déjà fait
-        self.__convertir_colonne_datetime('DateHeure')
+        self.__convertir_colonne_datetime('DateHeure', annee, reference)
 
-    def __convertir_colonne_datetime(self, colonne):
+    def __convertir_colonne_datetime(self, colonne, annee=None, reference=None):
         """
         Convertit la colonne spécifiée en type datetime si elle n'est pas déjà typée.
+        Chaque horodatage distinct n'est converti qu'une fois, puis le résultat est diffusé
+        sous forme d'entiers int64 (nanosecondes), sans colonne de chaînes intermédiaire.
         :param colonne: Le nom de la colonne à vérifier et convertir
+        :param annee: Année imposée aux dates (sinon déduite de la référence)
+        :param reference: Instant de référence en secondes depuis l'epoch pour déduire l'année
         """
         # Vérifier si la colonne n'est pas déjà de type datetime
         if not pd.api.types.is_datetime64_any_dtype(self.df_logs[colonne]):
             print(f"Conversion de la colonne '{colonne}' en datetime.")
 
-            # Ajouter l'année courante aux dates avant de les convertir en datetime
-            self.df_logs[colonne] = self.df_logs[colonne].apply(lambda x: f"{x} {datetime.now().year}")
-            try:
-                self.df_logs[colonne] = pd.to_datetime(self.df_logs[colonne], format='%b %d %H:%M:%S %Y')
-            except Exception as e:
-                print(f"Erreur lors de la conversion des dates : {e}")
-                return
+            convertisseur = ConvertisseurHorodatage(annee, reference)
+            self.df_logs[colonne] = pd.to_datetime(convertisseur.convertir_tableau(self.df_logs[colonne]))
+
+            nb_invalides = int(self.df_logs[colonne].isna().sum())
+            if nb_invalides:
+                print(f"Erreur lors de la conversion des dates : {nb_invalides} date(s) invalide(s).")
         else:
             print(f"La colonne '{colonne}' est déjà typée en datetime.")
 
-    def analyser_frequence_ips(self, intervalle_temps='1min', seuil_alerte=10):
+    def analyser_frequence_ips(self, intervalle_temps='1min', seuil_alerte=10, depuis=None, evenements=None,
+                               alertes_en_cours=None):
         """
         Analyse la fréquence d'accès des adresses IP dans un intervalle de temps.
         Détecte les adresses IP suspectes qui accèdent trop souvent dans un court laps de temps.
+        L'intervalle est une fenêtre glissante : une rafale à cheval sur deux minutes est détectée.
 
         Paramètres :
         intervalle_temps (str) : Intervalle de temps pour l'analyse (par exemple, '1min' pour une minute).
         seuil_alerte (int) : Nombre d'accès au-delà duquel une adresse IP est considérée comme suspecte.
+        depuis (pd.Timestamp) : Les alertes jusqu'à cet instant inclus sont ignorées (déjà signalées lors
+                                de l'exécution précédente en lecture incrémentale).
+        evenements (set) : Libellés des événements pris en compte (par exemple les échecs d'authentification,
+                           mais pas les connexions acceptées) ; par défaut tous. Les événements sans adresse
+                           IP ne sont jamais pris en compte.
+        alertes_en_cours (iterable) : Adresses IP encore en alerte à la fin de l'exécution précédente (voir
+                                      DetecteurFenetreGlissante.reprendre_alertes), avec depuis.
         """
         if not self.df_logs.empty:
+            df_acces = self.df_logs[self.df_logs['AdresseIP'] != '']
+            if evenements is not None:
+                df_acces = df_acces[df_acces['Evenement'].isin(evenements)]
 
-            # Grouper par adresse IP et intervalle de temps
-            acces_par_ip = self.df_logs.set_index('DateHeure').groupby(
-                [pd.Grouper(freq=intervalle_temps), 'AdresseIP']
-            ).size()
+            # Faire passer les événements, dans l'ordre chronologique, dans le détecteur à fenêtre glissante
+            detecteur = DetecteurFenetreGlissante(fenetre=intervalle_temps, seuil=seuil_alerte)
+            if depuis is not None and alertes_en_cours:
+                detecteur.reprendre_alertes(alertes_en_cours, depuis.value)
+            acces_suspects = detecteur.ajouter_dataframe(df_acces.sort_values('DateHeure', kind='stable'))
+            self.adresses_en_alerte = detecteur.adresses_en_alerte()
 
-            # Filtrer les groupes qui dépassent le seuil d'alerte
-            acces_suspects = acces_par_ip[acces_par_ip > seuil_alerte]
+            if depuis is not None:
+                acces_suspects = [alerte for alerte in acces_suspects if alerte[0][0] > depuis]
+            self.adresses_suspectes = {adresse_ip for (_, adresse_ip), _ in acces_suspects}
 
             # Afficher les résultats
-            if not acces_suspects.empty:
+            if acces_suspects:
                 print(f"\nAccès suspects détectés (plus de {seuil_alerte} accès par IP dans {intervalle_temps}) :")
-                # return acces_suspects.tolist()
-                return [(index_tuple, valeur) for index_tuple, valeur 
-                        in zip(acces_suspects.index, acces_suspects.values)]
+                return acces_suspects
             else:
                 print(f"Aucun accès suspect détecté dans l'intervalle de {intervalle_temps}.")
         else:
             print("Le DataFrame est vide. Veuillez charger les logs avant l'analyse.")
 
+    def analyser_frequence_prefixes(self, intervalle_temps='1min', seuil_alerte=30, adresses_min=3, depuis=None,
+                                    evenements=None, nb_plus_actifs=5):
+        """
+        Analyse la fréquence d'accès par préfixe réseau (/24 et /16 en IPv4, /64 et /48 en IPv6), afin de
+        détecter les attaques réparties entre de nombreuses adresses d'un même réseau. Les adresses IP des
+        préfixes en alerte sont ajoutées aux adresses suspectes (et donc persistées avec elles).
+
+        Paramètres :
+        intervalle_temps (str) : Durée de la fenêtre glissante (par exemple, '1min').
+        seuil_alerte (int) : Nombre d'accès d'un préfixe au-delà duquel il est considéré comme suspect.
+        adresses_min (int) : Nombre minimal d'adresses IP distinctes du préfixe dans la fenêtre.
+        depuis (pd.Timestamp) : Les alertes jusqu'à cet instant inclus sont ignorées.
+        evenements (set) : Libellés des événements pris en compte ; par défaut tous.
+        nb_plus_actifs (int) : Nombre de préfixes les plus actifs (sur la dernière fenêtre) à afficher.
+
+        Retourne :
+        list : Alertes au format ((horodatage, préfixe), nombre_acces), ou None si aucune.
+        """
+        if self.df_logs.empty:
+            print("Le DataFrame est vide. Veuillez charger les logs avant l'analyse.")
+            return None
+
+        df_acces = self.df_logs[self.df_logs['AdresseIP'] != '']
+        if evenements is not None:
+            df_acces = df_acces[df_acces['Evenement'].isin(evenements)]
+        df_acces = df_acces.sort_values('DateHeure', kind='stable')
+
+        self.index_prefixes = IndexPrefixes(fenetre=intervalle_temps, seuil=seuil_alerte, adresses_min=adresses_min)
+        alertes = self.index_prefixes.ajouter_lot(df_acces['DateHeure'].to_numpy(dtype='int64').tolist(),
+                                                  df_acces['AdresseIP'].astype(str).tolist())
+        if depuis is not None:
+            alertes = [alerte for alerte in alertes if alerte[0][0] > depuis]
+
+        plus_actifs = self.index_prefixes.plus_actifs(nb_plus_actifs)
+        if plus_actifs:
+            print(f"\nPréfixes les plus actifs sur la dernière fenêtre de {intervalle_temps} :")
+            for prefixe, nombre_acces, nb_adresses in plus_actifs:
+                print(f"- {prefixe} : {nombre_acces} accès, {nb_adresses} adresse(s) IP")
+
+        if not alertes:
+            print(f"Aucun préfixe suspect détecté dans l'intervalle de {intervalle_temps}.")
+            return None
+
+        # Les adresses IP des préfixes en alerte sont suspectes, même sous le seuil par adresse
+        prefixes_suspects = [ipaddress.ip_network(prefixe) for (_, prefixe), _ in alertes]
+        adresses = {adresse_ip for adresse_ip in df_acces['AdresseIP'].astype(str).unique()
+                    if self.__dans_prefixes(adresse_ip, prefixes_suspects)}
+        self.adresses_suspectes = (self.adresses_suspectes or set()) | adresses
+
+        print(f"\nAccès suspects détectés par préfixe (plus de {seuil_alerte} accès par préfixe dans "
+              f"{intervalle_temps}, depuis au moins {adresses_min} adresses IP) :")
+        return alertes
+
+    def __dans_prefixes(self, adresse_ip, prefixes):
+        """
+        Indique si une adresse IP appartient à l'un des préfixes donnés.
+        """
+        adresse = self.index_prefixes.convertir_adresse(adresse_ip)
+        if adresse is None:
+            return False
+        version, valeur = adresse
+        return any(prefixe.version == version and
+                   (valeur >> (prefixe.max_prefixlen - prefixe.prefixlen)) ==
+                   (int(prefixe.network_address) >> (prefixe.max_prefixlen - prefixe.prefixlen))
+                   for prefixe in prefixes)
+
+    def resumer_adresses(self, adresses=None, nb_utilisateurs=5):
+        """
+        Résume l'activité de chaque adresse IP en quelques chiffres : nombre d'événements par type,
+        utilisateurs essayés, hôtes visés et période d'activité. Ces résumés remplacent les lignes de
+        log brutes lorsque les adresses suspectes sont soumises à GPT.
+
+        Paramètres :
+        adresses (set) : Adresses IP à résumer (par défaut les adresses suspectes de la dernière analyse).
+        nb_utilisateurs (int) : Nombre d'utilisateurs les plus essayés cités par adresse IP.
+
+        Retourne :
+        list : Un dictionnaire par adresse IP, par nombre d'événements décroissant.
+        """
+        if adresses is None:
+            adresses = self.adresses_suspectes or set()
+        df = self.df_logs[self.df_logs['AdresseIP'].isin(adresses)]
+        if df.empty:
+            return []
+
+        # Quelques agrégations groupées : les lignes de chaque adresse IP ne sont jamais parcourues en Python
+        par_adresse = df.groupby('AdresseIP', observed=True)
+        bornes = par_adresse['DateHeure'].agg(['min', 'max', 'size'])
+        nb_hotes = df[df['Hote'] != ''].groupby('AdresseIP', observed=True)['Hote'].nunique()
+        par_evenement = df.groupby(['AdresseIP', 'Evenement'], observed=True).size()
+        par_utilisateur = df[df['Utilisateur'] != ''].groupby(['AdresseIP', 'Utilisateur'], observed=True).size()
+
+        evenements, utilisateurs = {}, {}
+        for (adresse_ip, evenement), nombre in par_evenement.items():
+            evenements.setdefault(adresse_ip, {})[evenement] = int(nombre)
+        for (adresse_ip, utilisateur), nombre in par_utilisateur.items():
+            utilisateurs.setdefault(adresse_ip, []).append((utilisateur, int(nombre)))
+
+        resumes = []
+        for adresse_ip, (debut, fin, nombre) in bornes.sort_values('size', ascending=False).iterrows():
+            essayes = sorted(utilisateurs.get(adresse_ip, []), key=lambda utilisateur: -utilisateur[1])
+            resumes.append({
+                'adresse_ip': str(adresse_ip),
+                'evenements': int(nombre),
+                'par_evenement': evenements.get(adresse_ip, {}),
+                'nb_utilisateurs': len(essayes),
+                'utilisateurs': essayes[:nb_utilisateurs],
+                'nb_hotes': int(nb_hotes.get(adresse_ip, 0)),
+                'debut': debut,
+                'fin': fin,
+            })
+        return resumes
+
+    def compter_par_periode(self, pas='jour'):
+        """
+        Renvoie le nombre d'événements par heure ou par jour, sur des périodes consécutives. Le DataFrame
+        n'est parcouru qu'une fois : les nombres par heure sont conservés, et ceux par jour en sont déduits.
+
+        Paramètres :
+        pas (str) : 'heure' ou 'jour'.
+
+        Retourne :
+        tuple : (périodes en datetime64, nombres d'événements en int64).
+        """
+        if self.comptes_par_heure is None:
+            heures = self.df_logs['DateHeure'].dropna().to_numpy().astype('datetime64[h]')
+            self.comptes_par_heure = completer(heures, None, 'heure')
+        heures, nombres = self.comptes_par_heure
+        if pas == 'heure':
+            return heures, nombres
+        return completer(heures, nombres, 'jour')
+
+    def enregistrer_graphique(self, fichier, vue='jour', nb_points=NB_POINTS, nb_adresses=20):
+        """
+        Enregistre un graphique des événements critiques dans un fichier PNG ou SVG, sans affichage (rendu
+        Agg) : évolution par jour ou par heure (réduite à nb_points points), ou adresses IP les plus actives.
+
+        Paramètres :
+        fichier (str) : Fichier à écrire ('.png' ou '.svg').
+        vue (str) : 'jour', 'heure' ou 'ip'.
+        nb_points (int) : Nombre maximal de points de l'évolution.
+        nb_adresses (int) : Nombre d'adresses IP de la vue 'ip'.
+        """
+        if self.df_logs.empty:
+            print("Aucun événement à représenter.")
+            return
+        try:
+            if vue == 'ip':
+                comptes = self.df_logs['AdresseIP'].value_counts(sort=True)
+                comptes = comptes[comptes.index != ''].head(nb_adresses)
+                enregistrer_barres(fichier, comptes.index.tolist(), comptes.tolist(),
+                                   titre=f"Les {len(comptes)} adresses IP les plus actives")
+            else:
+                periodes, nombres = self.compter_par_periode(vue)
+                enregistrer_serie(fichier, periodes, nombres, pas=vue,
+                                  titre=f"Évolution des événements critiques par {vue}", nb_points=nb_points)
+        except (ValueError, OSError) as e:
+            print(f"Erreur lors de l'enregistrement du graphique : {e}")
+            return
+        print(f"Graphique enregistré dans {fichier}.")
+
     def afficher_evenements_par_date(self):
         """
         Affiche un graphique de l'évolution des événements critiques par date.
         :param logs_df: DataFrame Pandas contenant les logs avec une colonne 'Date/Heure'.
         """
         if not self.df_logs.empty:
-            # Compter le nombre d'événements critiques par jour
-            evenements_par_date = self.df_logs.groupby(self.df_logs['DateHeure'].dt.date).size()
+            import matplotlib.pyplot as plt  # Chargé seulement pour l'option --graphe
+
+            # Compter le nombre d'événements critiques par jour (réduit à un nombre de points fixe)
+            jours, nombres = self.compter_par_periode('jour')
+            jours, nombres, _ = reduire(jours, nombres)
 
             # Créer le graphique linéaire
             plt.figure(figsize=(10, 6))
-            plt.plot(evenements_par_date.index, evenements_par_date.values, marker='o', linestyle='-', color='blue')
+            plt.plot(jours, nombres, marker='o', linestyle='-', color='blue')
 
             # Ajouter des titres et des labels
             plt.title("Évolution des événements critiques par date")
@@ -88,34 +279,22 @@ class LogAnalyzer:
             plt.tight_layout()
             plt.show()
 
-    def persister_evenements_critique(self):
-        cn = sqlite3.connect('logs_analyses.db')
-
-        # Créer un curseur pour exécuter des requêtes SQL
-        cur = cn.cursor()
-
-        # Créer une table pour stocker les événements critiques, si elle n'existe pas déjà
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS evenement_suspect (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date_heure DATETIME,
-                evenement TEXT,
-                utilisateur TEXT,
-                adresse_ip TEXT
-            )
-        ''')
-
-        # Sauvegarder les changements
-        cn.commit()
-
-        # Parcourir les logs et insérer chaque ligne dans la base de données
-        for index, ligne in self.df_logs.iterrows():
-            cur.execute('''
-                INSERT INTO evenement_suspect (date_heure, evenement, utilisateur, adresse_ip)
-                VALUES (?, ?, ?, ?)
-            ''', (ligne['DateHeure'].strftime('%Y-%m-%d %H:%M:%S'), ligne['Evenement'], 
-                  ligne['Utilisateur'], ligne['AdresseIP']))
-
-        # Sauvegarder les changements
-        cn.commit()
-        cn.close()
\ No newline at end of file
+    def persister_evenements_critique(self, chemin_base='logs_analyses.db'):
+        """
+        Persiste dans SQLite les événements des adresses IP détectées comme suspectes par la dernière
+        analyse (ou tous les événements si aucune analyse n'a été faite). L'insertion est groupée dans une
+        seule transaction et les événements déjà présents en base ne sont pas réinsérés.
+
+        Paramètres :
+        chemin_base (str) : Chemin du fichier de base de données SQLite.
+        """
+        df_suspects = self.df_logs
+        if self.adresses_suspectes is not None:
+            df_suspects = self.df_logs[self.df_logs['AdresseIP'].isin(self.adresses_suspectes)]
+
+        base = BaseEvenements(chemin_base)
+        try:
+            nb_inseres = base.inserer(df_suspects)
+        finally:
+            base.fermer()
+        print(f"{nb_inseres} nouvel(s) événement(s) persisté(s) sur {len(df_suspects)}.")
@@ -1,17 +1,37 @@
+import io
 import os
 import fnmatch
-import re
-import pandas as pd  # Importer Pandas pour utiliser les DataFrames
+from modules.extraction import ExtracteurEvenements, ColonnesEvenements, lire_blocs
+from modules.compression import detecter_compression, ouvrir_fichier_log, ERREURS_DECOMPRESSION
+from modules.lecture_parallele import extraire_fichiers_en_parallele, decouper_fichier, fin_derniere_ligne, TAILLE_SEGMENT
 
 class LogReader:
-    def __init__(self, repertoire):
+    def __init__(self, repertoire, etat=None, cache=None):
         """
         Constructeur qui initialise l'objet avec le chemin du répertoire contenant les fichiers de logs.
+
+        Paramètres :
+        repertoire (str) : Chemin du répertoire contenant les fichiers de logs.
+        etat (EtatLecture) : État de lecture incrémentale ; si fourni, seuls les octets ajoutés
+                             depuis l'exécution précédente sont lus.
+        cache (CacheEvenements) : Cache des événements déjà extraits, utilisé lors des lectures complètes.
         """
         self.repertoire = repertoire  # Attribut pour stocker le chemin du répertoire
-        self.lignes_extraites_dict = []  # Liste pour accumuler les lignes extraites
+        self.etat = etat  # État de lecture incrémentale (None pour une lecture complète)
+        self.cache = cache if etat is None else None  # En lecture incrémentale, seuls les ajouts sont lus
+        self.extracteur = ExtracteurEvenements()  # Moteur d'extraction en flux
+        self.colonnes = ColonnesEvenements()  # Colonnes pour accumuler les informations extraites
         self.lignes_extraites_brut = []  # Liste pour accumuler les lignes extraites en brut
-        self.df_logs = pd.DataFrame(columns=['DateHeure', 'Evenement', 'Utilisateur', 'AdresseIP'])  # DataFrame pour stocker les informations extraites
+        self.df_logs = None  # DataFrame des informations extraites, créé par creer_dataframe()
+
+        # Réintégrer les événements de la dernière fenêtre de l'exécution précédente
+        if self.etat is not None:
+            for evenement in self.etat.evenements_recents:
+                self.colonnes.ajouter_evenement(evenement)
+        self.nb_evenements_recents = len(self.colonnes)
+        # Dernier instant déjà analysé lors de l'exécution précédente (None en lecture complète), en
+        # nanosecondes ; converti en pd.Timestamp par creer_dataframe(), pandas n'étant pas encore chargé
+        self.horodatage_reprise = max(self.colonnes.horodatages) if self.nb_evenements_recents else None
 
     def trouver_fichiers_logs(self, pattern="secure*"):
         """
@@ -29,6 +49,8 @@ class LogReader:
             for fichier in os.listdir(self.repertoire):
                 if fnmatch.fnmatch(fichier, pattern):
                     fichiers_logs.append(os.path.join(self.repertoire, fichier))
+            # Du plus ancien au plus récent (les fichiers tournés avant le fichier courant)
+            fichiers_logs.sort(key=os.path.getmtime)
             return fichiers_logs
         except FileNotFoundError:
             print(f"Erreur : Le répertoire {self.repertoire} n'a pas été trouvé.")
@@ -36,14 +58,14 @@ class LogReader:
 
     def lire_logs_bruts(self, fichier_log):
         """
-        Lit un fichier de logs ligne par ligne, et stocke le résultat dans une liste.
+        Lit un fichier de logs ligne par ligne (compressé ou non), et stocke le résultat dans une liste.
 
         Paramètres :
         fichier_log (str) : Chemin vers le fichier de logs à lire.
         """
 
         try:
-            with open(fichier_log, 'r') as f:
+            with io.TextIOWrapper(ouvrir_fichier_log(fichier_log)) as f:
                 for ligne in f:
                     self.lignes_extraites_brut.append(ligne)
 
@@ -51,51 +73,201 @@ class LogReader:
 
         except FileNotFoundError:
             print(f"Erreur : Le fichier {fichier_log} n'a pas été trouvé.")
+        except ERREURS_DECOMPRESSION as e:
+            print(f"Erreur lors de la lecture du fichier {fichier_log} : {e}")
 
     def lire_et_extraire_logs(self, fichier_log):
         """
-        Lit un fichier de logs ligne par ligne, extrait les informations clés avec une regex,
-        et stocke ces informations dans une liste de dictionnaires.
+        Lit un fichier de logs (compressé ou non) par gros blocs binaires, extrait les informations clés des lignes
+        reconnues par les règles d'extraction, et les accumule sous forme de colonnes.
 
         Paramètres :
         fichier_log (str) : Chemin vers le fichier de logs à lire.
         """
-        # Expression rationnelle pour capturer les informations
-        regex = r"([A-Za-z]{3} \d{2} \d{2}:\d{2}:\d{2}) .* (Invalid user|Failed password) (\w+) from (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"
-
         try:
-            with open(fichier_log, 'r') as f:
-                for ligne in f:
-                    match = re.search(regex, ligne)
-                    if match:
-                        date_heure = match.group(1)
-                        evenement = match.group(2)
-                        utilisateur = match.group(3)
-                        adresse_ip = match.group(4)
-
-                        # Accumuler les informations sous forme de dictionnaire dans une liste
-                        nouvelle_ligne = {
-                            'DateHeure': date_heure,
-                            'Evenement': evenement,
-                            'Utilisateur': utilisateur,
-                            'AdresseIP': adresse_ip
-                        }
-                        self.lignes_extraites_dict.append(nouvelle_ligne)
+            # Déduire l'année des horodatages de la date de modification du fichier
+            stat = os.stat(fichier_log)
+            self.extracteur.definir_reference(stat.st_mtime)
+
+            if self.cache is None:
+                # Les événements ne sont ajoutés qu'une fois le fichier lu en entier : une archive tronquée
+                # est ignorée, comme en lecture parallèle
+                colonnes = ColonnesEvenements()
+                for bloc in self.__lire_blocs(fichier_log):
+                    self.extracteur.extraire_bloc(bloc, colonnes)
+                self.colonnes.fusionner(colonnes)
+            else:
+                parametres = self.__parametres_extraction()
+                colonnes = self.cache.charger(fichier_log, parametres)
+                if colonnes is not None:
+                    self.colonnes.fusionner(colonnes)
+                    print(f"Les informations du fichier {fichier_log} ont été chargées depuis le cache.")
+                    return
+
+                colonnes = ColonnesEvenements()
+                for bloc in self.__lire_blocs(fichier_log):
+                    self.extracteur.extraire_bloc(bloc, colonnes)
+                self.colonnes.fusionner(colonnes)
+                self.cache.enregistrer(fichier_log, stat, parametres, colonnes)
 
             print(f"Le fichier {fichier_log} a été lu et les informations ont été extraites avec succès.")
 
         except FileNotFoundError:
             print(f"Erreur : Le fichier {fichier_log} n'a pas été trouvé.")
+        except ERREURS_DECOMPRESSION as e:
+            print(f"Erreur lors de la lecture du fichier {fichier_log} : {e}")
+
+    def lire_et_extraire_logs_parallele(self, fichiers_logs, workers, taille_segment=TAILLE_SEGMENT):
+        """
+        Lit et extrait les informations de plusieurs fichiers de logs en parallèle sur un pool de processus.
+        Les gros fichiers sont découpés en segments aux frontières de lignes ; les colonnes renvoyées par
+        chaque processus sont fusionnées dans l'ordre des fichiers et des segments, de sorte que le résultat
+        est identique à celui de la lecture séquentielle. Comme en lecture séquentielle, un fichier illisible
+        (archive tronquée ou corrompue...) est signalé et ignoré, sans interrompre la lecture des autres.
+
+        Paramètres :
+        fichiers_logs (list) : Liste des fichiers de logs à lire.
+        workers (int) : Nombre de processus à utiliser.
+        taille_segment (int) : Taille visée des segments des gros fichiers, en octets.
+        """
+        taches = []
+        positions_finales = []
+        fichiers_lus = []  # (fichier_log, stat, paramètres d'extraction, colonnes chargées depuis le cache, nombre de segments)
+        for fichier_log in fichiers_logs:
+            try:
+                # L'année des horodatages est déduite de la date de modification du fichier
+                reference = os.stat(fichier_log).st_mtime
+                self.extracteur.definir_reference(reference)
+                parametres = self.__parametres_extraction()
+                if self.cache is not None:
+                    colonnes = self.cache.charger(fichier_log, parametres)
+                    if colonnes is not None:
+                        fichiers_lus.append((fichier_log, None, parametres, colonnes, 0))
+                        continue
+
+                nb_taches = len(taches)
+                if detecter_compression(fichier_log) is not None:
+                    # Un flux compressé ne peut pas être découpé : une tâche par archive
+                    stat = os.stat(fichier_log)
+                    if self.etat is None or self.etat.archive_a_lire(fichier_log, stat):
+                        taches.append((fichier_log, 0, None, reference))
+                    if self.etat is not None:
+                        positions_finales.append((fichier_log, stat, stat.st_size))
+                else:
+                    with open(fichier_log, 'rb') as f:
+                        stat = os.fstat(f.fileno())
+                        if self.etat is None:
+                            debut, fin = 0, stat.st_size
+                        else:
+                            # En lecture incrémentale, s'arrêter à la dernière ligne complète
+                            debut, fin = self.etat.position(fichier_log, stat), fin_derniere_ligne(f, stat.st_size)
+                            positions_finales.append((fichier_log, stat, max(debut, fin)))
+                        taches.extend((fichier_log, debut_segment, fin_segment, reference)
+                                      for debut_segment, fin_segment in decouper_fichier(f, debut, fin, taille_segment))
+                fichiers_lus.append((fichier_log, stat, parametres, None, len(taches) - nb_taches))
+            except FileNotFoundError:
+                print(f"Erreur : Le fichier {fichier_log} n'a pas été trouvé.")
+            except ERREURS_DECOMPRESSION as e:
+                print(f"Erreur lors de la lecture du fichier {fichier_log} : {e}")
+
+        # Fusionner les résultats dans l'ordre des fichiers, en mettant en cache ceux qui ont été lus
+        resultats = iter(extraire_fichiers_en_parallele(taches, self.extracteur.convertisseur.annee_imposee, workers,
+                                                        self.extracteur.moteur.regles))
+        en_echec = set()  # Fichiers dont un segment n'a pas pu être lu : ignorés, et leur position conservée
+        for fichier_log, stat, parametres, colonnes_en_cache, nb_segments in fichiers_lus:
+            if colonnes_en_cache is not None:
+                self.colonnes.fusionner(colonnes_en_cache)
+                continue
+            segments = [next(resultats) for _ in range(nb_segments)]
+            erreurs = [segment for segment in segments if isinstance(segment, Exception)]
+            if erreurs:
+                print(f"Erreur lors de la lecture du fichier {fichier_log} : {erreurs[0]}")
+                en_echec.add(fichier_log)
+            elif self.cache is not None:
+                colonnes = ColonnesEvenements()
+                for segment in segments:
+                    colonnes.fusionner(segment)
+                self.colonnes.fusionner(colonnes)
+                self.cache.enregistrer(fichier_log, stat, parametres, colonnes)
+            else:
+                for segment in segments:
+                    self.colonnes.fusionner(segment)
+
+        for fichier_log, stat, offset in positions_finales:
+            if fichier_log not in en_echec:
+                self.etat.mettre_a_jour(fichier_log, stat, offset)
+
+        print(f"{len(fichiers_logs)} fichier(s) lu(s) en parallèle ({len(taches)} segment(s)), "
+              f"les informations ont été extraites avec succès.")
+
+    def __parametres_extraction(self):
+        """
+        Renvoie les paramètres dont dépendent les événements extraits du fichier en cours (année de
+        référence et empreinte des règles), qui identifient les entrées du cache avec le fichier.
+        """
+        return f"{self.extracteur.convertisseur.annee}|{self.extracteur.moteur.signature}"
+
+    def __lire_blocs(self, fichier_log):
+        """
+        Générateur qui ouvre un fichier de logs (en le décompressant à la volée s'il est compressé)
+        et renvoie les blocs de lignes à analyser.
+        En lecture incrémentale, seules les lignes complètes ajoutées depuis la dernière lecture sont
+        renvoyées (une ligne en cours d'écriture est laissée pour la lecture suivante), puis la
+        nouvelle position est enregistrée dans l'état de lecture. Une archive compressée n'est lue
+        qu'une fois, et seulement lors de la première lecture (son contenu a sinon déjà été analysé
+        avant la compression).
+
+        Paramètres :
+        fichier_log (str) : Chemin vers le fichier de logs.
+        """
+        format_compression = detecter_compression(fichier_log)
+
+        if format_compression is not None:
+            stat = os.stat(fichier_log)
+            if self.etat is None or self.etat.archive_a_lire(fichier_log, stat):
+                with ouvrir_fichier_log(fichier_log, format_compression) as f:
+                    yield from lire_blocs(f)
+            if self.etat is not None:
+                self.etat.mettre_a_jour(fichier_log, stat, stat.st_size)
+            return
+
+        with open(fichier_log, 'rb') as f:
+            if self.etat is None:
+                yield from lire_blocs(f)
+                return
+
+            stat = os.fstat(f.fileno())
+            offset = self.etat.position(fichier_log, stat)
+            f.seek(offset)
+
+            for bloc in lire_blocs(f, lignes_completes_seulement=True):
+                offset += len(bloc)
+                yield bloc
+
+            self.etat.mettre_a_jour(fichier_log, stat, offset)
 
     def creer_dataframe(self):
         """
-        Crée un DataFrame Pandas à partir des lignes extraites et l'affecte à l'attribut df_logs.
+        Crée un DataFrame Pandas à partir des colonnes extraites et l'affecte à l'attribut df_logs.
+        En lecture incrémentale, les événements de la dernière fenêtre de l'exécution précédente
+        sont réintégrés pour que la détection reste correcte à la frontière entre deux exécutions.
         """
-        if self.lignes_extraites_dict:
-            self.df_logs = pd.DataFrame(self.lignes_extraites_dict)
-            self.lignes_extraites_dict.clear()  # Effacer la liste des lignes extraites
+        import pandas as pd  # Chargé seulement lorsque le DataFrame est nécessaire
+
+        if self.horodatage_reprise is not None:
+            self.horodatage_reprise = pd.Timestamp(self.horodatage_reprise)
+        if len(self.colonnes) > self.nb_evenements_recents:
+            self.df_logs = self.colonnes.vers_dataframe()
+            # Ordonner chronologiquement (tri stable) les événements issus de plusieurs fichiers
+            if not self.df_logs['DateHeure'].is_monotonic_increasing:
+                self.df_logs = self.df_logs.sort_values('DateHeure', kind='stable', ignore_index=True)
+            self.colonnes = ColonnesEvenements()  # Libérer les colonnes extraites
+            self.nb_evenements_recents = 0
+            if self.etat is not None:
+                self.etat.conserver_fenetre(self.df_logs)
             print("Le DataFrame a été créé avec succès.")
         else:
+            self.df_logs = pd.DataFrame(columns=['DateHeure', 'Evenement', 'Utilisateur', 'AdresseIP', 'Hote'])
             print("Aucune ligne n'a été extraite. Le DataFrame est vide.")
 
     def afficher_dataframe(self):
@@ -0,0 +1,226 @@
+import json
+import sys
+import time
+import threading
+import contextlib
+from datetime import datetime, timezone
+# Le serveur HTTP et les profileurs sont importés dans ServeurMetriques et profiler : chaque exécution
+# instrumentée (y compris une simple analyse) importe ce module, qui doit donc rester léger
+
+# Préfixe des noms de métriques exposées
+PREFIXE = 'analyse_logs'
+
+
+class Metriques:
+    def __init__(self, fichier_journal=None):
+        """
+        Instrumentation de l'analyse : durée de chaque étape (lecture, extraction, DataFrame, détection,
+        persistance, notification...), compteurs cumulés depuis le démarrage (lignes lues, événements
+        extraits, alertes...) et jauges (débit, profondeur des files...). Chaque étape terminée et chaque
+        bilan sont écrits dans un journal JSON (un objet par ligne), et l'ensemble peut être exposé au
+        format texte de Prometheus.
+
+        Paramètres :
+        fichier_journal (str) : Fichier du journal JSON ('-' pour la sortie d'erreur), ou None pour ne pas journaliser.
+        """
+        self.fichier_journal = fichier_journal
+        self.verrou = threading.Lock()  # Les métriques sont lues par le thread du serveur HTTP
+        self.durees = {}  # étape -> [nombre d'exécutions, durée totale, dernière durée]
+        self.compteurs = {}  # nom -> valeur cumulée
+        self.jauges = {}  # nom -> dernière valeur
+        self.demarrage = time.time()
+
+    @contextlib.contextmanager
+    def etape(self, nom, **champs):
+        """
+        Mesure la durée d'une étape (à utiliser dans un bloc 'with') et l'enregistre dans le journal.
+
+        Paramètres :
+        nom (str) : Nom de l'étape.
+        champs : Informations supplémentaires à journaliser avec la durée.
+        """
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - debut
+            with self.verrou:
+                mesure = self.durees.setdefault(nom, [0, 0.0, 0.0])
+                mesure[0] += 1
+                mesure[1] += duree
+                mesure[2] = duree
+            self.journaliser('etape', etape=nom, duree=round(duree, 6), **champs)
+
+    def incrementer(self, nom, valeur=1):
+        """
+        Ajoute une valeur à un compteur.
+        """
+        with self.verrou:
+            self.compteurs[nom] = self.compteurs.get(nom, 0) + valeur
+
+    def definir(self, nom, valeur, compteur=False):
+        """
+        Fixe la valeur d'une jauge, ou d'un compteur tenu ailleurs (par exemple par un thread d'envoi).
+
+        Paramètres :
+        nom (str) : Nom de la métrique.
+        valeur (int ou float) : Nouvelle valeur.
+        compteur (bool) : La valeur est un cumul, exposé comme compteur plutôt que comme jauge.
+        """
+        with self.verrou:
+            if compteur:
+                self.compteurs[nom] = valeur
+            else:
+                self.jauges[nom] = valeur
+
+    def derniere_duree(self, nom):
+        """
+        Renvoie la durée de la dernière exécution d'une étape (0 si elle n'a jamais été exécutée).
+        """
+        with self.verrou:
+            return self.durees.get(nom, [0, 0.0, 0.0])[2]
+
+    def journaliser(self, evenement, **champs):
+        """
+        Écrit un objet JSON d'une ligne dans le journal.
+
+        Paramètres :
+        evenement (str) : Type d'entrée ('etape', 'bilan'...).
+        champs : Contenu de l'entrée.
+        """
+        if self.fichier_journal is None:
+            return
+        entree = {'horodatage': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                  'evenement': evenement, **champs}
+        ligne = json.dumps(entree, ensure_ascii=False, default=str) + '\n'
+        if self.fichier_journal == '-':
+            sys.stderr.write(ligne)
+            return
+        try:
+            with open(self.fichier_journal, 'a', encoding='utf-8') as f:
+                f.write(ligne)
+        except OSError as e:
+            print(f"Erreur lors de l'écriture du journal {self.fichier_journal} : {e}")
+
+    def bilan(self):
+        """
+        Journalise l'état de toutes les métriques (à la fin de chaque exécution).
+        """
+        with self.verrou:
+            durees = {nom: round(mesure[2], 6) for nom, mesure in self.durees.items()}
+            compteurs = dict(self.compteurs)
+            jauges = dict(self.jauges)
+        self.journaliser('bilan', durees=durees, compteurs=compteurs, jauges=jauges)
+
+    def exposition(self):
+        """
+        Renvoie les métriques au format texte d'exposition de Prometheus.
+        """
+        with self.verrou:
+            durees = {nom: list(mesure) for nom, mesure in self.durees.items()}
+            compteurs = dict(self.compteurs)
+            jauges = dict(self.jauges)
+
+        lignes = []
+
+        def metrique(nom, type_metrique, description, valeurs):
+            lignes.append(f"# HELP {PREFIXE}_{nom} {description}")
+            lignes.append(f"# TYPE {PREFIXE}_{nom} {type_metrique}")
+            for etiquettes, valeur in valeurs:
+                lignes.append(f"{PREFIXE}_{nom}{etiquettes} {valeur!r}")
+
+        if durees:
+            metrique('etape_executions_total', 'counter', "Nombre d'exécutions de chaque étape.",
+                     [(f'{{etape="{nom}"}}', mesure[0]) for nom, mesure in sorted(durees.items())])
+            metrique('etape_secondes_total', 'counter', "Durée cumulée de chaque étape en secondes.",
+                     [(f'{{etape="{nom}"}}', mesure[1]) for nom, mesure in sorted(durees.items())])
+            metrique('etape_derniere_duree_secondes', 'gauge', "Durée de la dernière exécution de chaque étape.",
+                     [(f'{{etape="{nom}"}}', mesure[2]) for nom, mesure in sorted(durees.items())])
+        for nom, valeur in sorted(compteurs.items()):
+            metrique(f'{nom}_total', 'counter', f"Compteur {nom}.", [('', valeur)])
+        for nom, valeur in sorted(jauges.items()):
+            metrique(nom, 'gauge', f"Jauge {nom}.", [('', valeur)])
+        metrique('demarrage_secondes', 'gauge', "Heure de démarrage (secondes depuis l'epoch).",
+                 [('', self.demarrage)])
+        return '\n'.join(lignes) + '\n'
+
+
+class ServeurMetriques:
+    def __init__(self, metriques, port, adresse='127.0.0.1'):
+        """
+        Serveur HTTP local exposant les métriques sur /metrics (format Prometheus), dans un thread
+        en arrière-plan.
+
+        Paramètres :
+        metriques (Metriques) : Les métriques à exposer.
+        port (int) : Port d'écoute.
+        adresse (str) : Adresse d'écoute (par défaut uniquement en local).
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                contenu = metriques.exposition().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(contenu)))
+                self.end_headers()
+                self.wfile.write(contenu)
+
+            def log_message(self, format, *args):
+                pass  # Pas de trace pour chaque requête
+
+        self.serveur = ThreadingHTTPServer((adresse, port), Gestionnaire)
+        self.serveur.daemon_threads = True
+        self.thread = threading.Thread(target=self.serveur.serve_forever, name='metriques', daemon=True)
+        self.thread.start()
+        print(f"Métriques exposées sur http://{adresse}:{self.serveur.server_address[1]}/metrics")
+
+    def fermer(self):
+        """
+        Arrête le serveur HTTP.
+        """
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+
+def profiler(fonction, *args, fichier_profil='profil.prof', nb_lignes=25, **kwargs):
+    """
+    Exécute une fonction sous cProfile et tracemalloc, puis affiche les fonctions les plus coûteuses
+    (en temps cumulé) et les lignes ayant le plus alloué de mémoire ; le profil complet est enregistré
+    pour être exploré avec pstats ou snakeviz.
+
+    Paramètres :
+    fonction (callable) : La fonction à profiler.
+    fichier_profil (str) : Fichier où enregistrer le profil cProfile.
+    nb_lignes (int) : Nombre de lignes de chaque rapport.
+
+    Retourne :
+    La valeur renvoyée par la fonction.
+    """
+    import io
+    import pstats
+    import cProfile
+    import tracemalloc
+
+    tracemalloc.start()
+    profil = cProfile.Profile()
+    try:
+        return profil.runcall(fonction, *args, **kwargs)
+    finally:
+        instantane = tracemalloc.take_snapshot()
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        profil.dump_stats(fichier_profil)
+        rapport = io.StringIO()
+        pstats.Stats(profil, stream=rapport).sort_stats('cumulative').print_stats(nb_lignes)
+        print(f"\nProfil d'exécution (enregistré dans {fichier_profil}) :")
+        print(rapport.getvalue())
+
+        print(f"Pic de mémoire allouée par Python : {pic / 2 ** 20:.1f} Mio. Principales allocations restantes :")
+        for statistique in instantane.statistics('lineno')[:nb_lignes]:
+            print(f"  {statistique}")
@@ -2,68 +2,281 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import configparser
+import json
+import os
+import queue
+import threading
+import time
 
 class Notification:
-    def __init__(self):
+    def __init__(self, asynchrone=False, fichier_config='config.ini'):
+        """
+        Initialise l'envoi des notifications par email à partir du fichier de configuration.
+
+        La connexion SMTP authentifiée est conservée et réutilisée d'un envoi à l'autre (avec reconnexion
+        automatique). Les alertes sont regroupées par adresse IP dans un email récapitulatif, limitées
+        en nombre par destinataire et par heure, et une adresse IP déjà signalée n'est pas signalée à
+        nouveau avant un délai, y compris d'une exécution à l'autre.
+
+        Paramètres :
+        asynchrone (bool) : Si True, les envois sont faits par un thread en arrière-plan et les alertes
+                            sont regroupées sur la fenêtre de regroupement ; l'appelant n'est jamais bloqué.
+        fichier_config (str) : Chemin du fichier de configuration.
+        """
         # Lire la configuration depuis le fichier config.ini
         self.config = configparser.ConfigParser()
-        self.config.read('config.ini')
+        self.config.read(fichier_config)
 
         # Charger les paramètres SMTP depuis la section [smtp]
         self.smtp_server = self.config['smtp']['server']
         self.smtp_port = int(self.config['smtp']['port'])
-        self.smtp_user = self.config['smtp']['user']
-        self.smtp_password = self.config['smtp']['password']
+        self.smtp_user = self.config['smtp'].get('user', '')
+        self.smtp_password = self.config['smtp'].get('password', '')
+        self.smtp_starttls = self.config['smtp'].getboolean('starttls', fallback=True)
 
-        # Charger le destinataire depuis la section [email]
+        # Charger le ou les destinataires (séparés par des virgules) depuis la section [email]
         self.recipient = self.config['email']['recipient']
+        self.destinataires = [destinataire.strip() for destinataire in self.recipient.split(',') if destinataire.strip()]
 
-    def envoyer_email(self, sujet, contenu):
+        # Paramètres de regroupement, de limitation et de suppression des doublons (section [notification] facultative)
+        self.fenetre_regroupement = self.config.getint('notification', 'fenetre_regroupement', fallback=60)
+        self.max_emails_par_heure = self.config.getint('notification', 'max_emails_par_heure', fallback=10)
+        self.delai_suppression = self.config.getint('notification', 'delai_suppression', fallback=3600)
+        self.fichier_historique = self.config.get('notification', 'fichier_historique',
+                                                  fallback='.alertes_envoyees.json')
+
+        self.serveur = None  # Connexion SMTP réutilisée
+        self.emails_envoyes = 0
+        self.emails_en_echec = 0
+        self.en_attente = {destinataire: {} for destinataire in self.destinataires}  # Alertes à regrouper par IP
+        self.historique = {}  # adresse IP -> heure du dernier signalement
+        self.envois = {destinataire: [] for destinataire in self.destinataires}  # Heures des derniers envois
+        self.__charger_historique()
+        self.verrou = threading.Lock()
+
+        self.file = None
+        self.thread = None
+        if asynchrone:
+            self.file = queue.Queue(maxsize=10000)
+            self.thread = threading.Thread(target=self.__boucle_envoi, name='notification', daemon=True)
+            self.thread.start()
+
+    def __charger_historique(self):
+        """
+        Charge les adresses IP déjà signalées et les heures des derniers envois lors des exécutions précédentes.
+        """
+        try:
+            with open(self.fichier_historique, 'r') as f:
+                historique = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        limite = time.time() - self.delai_suppression
+        self.historique = {adresse_ip: heure for adresse_ip, heure in historique.get('alertes', {}).items()
+                           if heure >= limite}
+        for destinataire, heures in historique.get('envois', {}).items():
+            if destinataire in self.envois:
+                self.envois[destinataire] = [heure for heure in heures if heure > time.time() - 3600]
+
+    def __sauvegarder_historique(self):
         """
-        Envoie un email avec le sujet et le contenu spécifiés.
+        Sauvegarde les adresses IP signalées et les heures d'envoi, pour ne pas signaler à nouveau les mêmes
+        adresses ni dépasser la limite d'envois lors des prochaines exécutions.
+        """
+        limite = time.time() - self.delai_suppression
+        self.historique = {adresse_ip: heure for adresse_ip, heure in self.historique.items() if heure >= limite}
+        fichier_temporaire = f"{self.fichier_historique}.tmp"
+        try:
+            with open(fichier_temporaire, 'w') as f:
+                json.dump({'alertes': self.historique, 'envois': self.envois}, f)
+            os.replace(fichier_temporaire, self.fichier_historique)
+        except OSError as e:
+            # Sans cela, l'erreur arrêterait le thread d'envoi et plus aucune alerte ne serait notifiée
+            print(f"Erreur lors de la sauvegarde de l'historique des alertes {self.fichier_historique} : {e}")
+
+    def __connecter(self):
+        """
+        Ouvre la connexion SMTP, passe en TLS et s'authentifie si nécessaire.
+        """
+        serveur = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        serveur.ehlo()  # Pour s'identifier auprès du serveur (nécessaire pour certains serveurs)
+        if self.smtp_starttls:
+            serveur.starttls()  # Passage à une connexion sécurisée TLS
+            serveur.ehlo()  # S'identifier à nouveau après le passage en TLS
+        if self.smtp_user:
+            serveur.login(self.smtp_user, self.smtp_password)  # Authentification
+        self.serveur = serveur
+
+    def __envoyer(self, destinataires, sujet, contenu):
+        """
+        Envoie un email en réutilisant la connexion SMTP ouverte ; en cas de connexion perdue,
+        une reconnexion est tentée une fois.
         """
         # Créer le message email
         msg = MIMEMultipart()
         msg['From'] = self.smtp_user
-        msg['To'] = self.recipient
+        msg['To'] = ', '.join(destinataires)
         msg['Subject'] = sujet
 
         # Ajouter le corps de l'email
         msg.attach(MIMEText(contenu, 'plain'))
 
-        try:
-            # Connexion au serveur SMTP
-            serveur = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
-            serveur.ehlo()  # Pour s'identifier auprès du serveur (nécessaire pour certains serveurs)
+        for tentative in range(2):
+            try:
+                if self.serveur is None:
+                    self.__connecter()
+                self.serveur.sendmail(self.smtp_user, destinataires, msg.as_string())
+                print(f"Email envoyé avec succès à {', '.join(destinataires)}")
+                self.emails_envoyes += 1
+                return True
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError) as e:
+                self.__deconnecter()
+                if tentative == 1:
+                    print(f"Erreur lors de l'envoi de l'email : {e}")
+            except Exception as e:
+                self.__deconnecter()
+                print(f"Erreur lors de l'envoi de l'email : {e}")
+                break
+        self.emails_en_echec += 1
+        return False
 
-             # Démarrer la connexion TLS
-            serveur.starttls()  # Passage à une connexion sécurisée TLS
-            # serveur.ehlo()  # S'identifier à nouveau après le passage en TLS
+    def __deconnecter(self):
+        """
+        Ferme la connexion SMTP si elle est ouverte.
+        """
+        if self.serveur is not None:
+            try:
+                self.serveur.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.serveur = None
 
-            serveur.login(self.smtp_user, self.smtp_password)  # Authentification
+    def envoyer_email(self, sujet, contenu):
+        """
+        Envoie un email avec le sujet et le contenu spécifiés à tous les destinataires
+        (en arrière-plan en mode asynchrone).
+        """
+        if self.file is not None:
+            self.file.put(('email', sujet, contenu))
+        else:
+            self.__envoyer(self.destinataires, sujet, contenu)
+
+    def envoyer_notification_evenements_critiques(self, logs_critiques, avis=None):
+        """
+        Prépare et envoie un email contenant les événements critiques détectés dans les logs.
+        Les alertes sont regroupées par adresse IP ; celles déjà signalées récemment sont ignorées.
+        En mode asynchrone, l'appel rend la main immédiatement et l'email récapitulatif est envoyé
+        à la fin de la fenêtre de regroupement.
 
-            # Envoyer l'email
-            serveur.sendmail(self.smtp_user, self.recipient, msg.as_string())
+        Paramètres :
+        logs_critiques (list) : Alertes au format ((horodatage, adresse_ip), nombre_acces).
+        avis (dict) : Avis de GPT par adresse IP (texte), ajouté à titre d'information à la ligne de
+                      l'adresse IP ; facultatif.
+        """
+        if self.file is not None:
+            try:
+                self.file.put_nowait(('alertes', logs_critiques, avis))
+            except queue.Full:
+                print("File des notifications pleine, alertes ignorées.")
+        else:
+            self.__ajouter_alertes(logs_critiques, avis)
+            self.__envoyer_recapitulatifs()
 
-            print(f"Email envoyé avec succès à {self.recipient}")
-        except Exception as e:
-            print(f"Erreur lors de l'envoi de l'email : {e}")
-        finally:
-            if serveur:
-                serveur.quit()
+    def __ajouter_alertes(self, logs_critiques, avis=None):
+        """
+        Regroupe les alertes par adresse IP et par destinataire, en ignorant les adresses déjà signalées.
+        """
+        with self.verrou:
+            for (horodatage, adresse_ip), nombre_acces in logs_critiques:
+                if adresse_ip in self.historique:
+                    continue
+                for en_attente in self.en_attente.values():
+                    regroupement = en_attente.setdefault(adresse_ip, {'debut': horodatage, 'fin': horodatage,
+                                                                       'alertes': 0, 'acces': 0})
+                    regroupement['debut'] = min(regroupement['debut'], horodatage)
+                    regroupement['fin'] = max(regroupement['fin'], horodatage)
+                    regroupement['alertes'] += 1
+                    regroupement['acces'] += nombre_acces
+                    if avis and adresse_ip in avis:
+                        regroupement['avis'] = avis[adresse_ip]
 
-    def envoyer_notification_evenements_critiques(self, logs_critiques):
+    def __envoyer_recapitulatifs(self):
         """
-        Prépare et envoie un email contenant les événements critiques détectés dans les logs.
+        Envoie à chaque destinataire le récapitulatif des alertes en attente, dans la limite du nombre
+        d'emails autorisés par heure ; au-delà, les alertes restent en attente pour l'envoi suivant.
         """
-        sujet = "Alerte : Événements critiques détectés dans les logs"
-        contenu = "Bonjour,\n\nLes événements suivants ont été détectés comme critiques dans les logs :\n\n"
+        with self.verrou:
+            maintenant = time.time()
+            for destinataire, en_attente in self.en_attente.items():
+                if not en_attente:
+                    continue
+                self.envois[destinataire] = [heure for heure in self.envois[destinataire] if heure > maintenant - 3600]
+                if len(self.envois[destinataire]) >= self.max_emails_par_heure:
+                    continue
 
-        # Ajouter chaque événement critique au contenu de l'email
-        for log in logs_critiques:
-            contenu += f"- {log}\n"
+                sujet = "Alerte : Événements critiques détectés dans les logs"
+                contenu = "Bonjour,\n\nLes événements suivants ont été détectés comme critiques dans les logs :\n\n"
 
-        contenu += "\nVotre système de surveillance."
+                # Ajouter une ligne par adresse IP suspecte au contenu de l'email
+                for adresse_ip, regroupement in en_attente.items():
+                    contenu += (f"- {adresse_ip} : {regroupement['alertes']} alerte(s), {regroupement['acces']} accès "
+                                f"entre {regroupement['debut']} et {regroupement['fin']}")
+                    if 'avis' in regroupement:
+                        contenu += f" ; avis de GPT : {regroupement['avis']}"
+                    contenu += "\n"
+
+                contenu += "\nVotre système de surveillance."
+
+                # Envoyer l'email
+                if self.__envoyer([destinataire], sujet, contenu):
+                    self.envois[destinataire].append(maintenant)
+                    for adresse_ip in en_attente:
+                        self.historique[adresse_ip] = maintenant
+                    en_attente.clear()
+
+            self.__sauvegarder_historique()
+
+    def __boucle_envoi(self):
+        """
+        Boucle du thread d'envoi : reçoit les alertes et les emails à envoyer, et envoie les récapitulatifs
+        à la fin de chaque fenêtre de regroupement.
+        """
+        prochain_envoi = None
+        while True:
+            delai = None if prochain_envoi is None else max(0.0, prochain_envoi - time.monotonic())
+            try:
+                commande = self.file.get(timeout=delai)
+            except queue.Empty:
+                commande = None
+
+            if commande is not None:
+                if commande[0] == 'alertes':
+                    self.__ajouter_alertes(commande[1], commande[2])
+                    if prochain_envoi is None:
+                        prochain_envoi = time.monotonic() + self.fenetre_regroupement
+                elif commande[0] == 'email':
+                    self.__envoyer(self.destinataires, commande[1], commande[2])
+                elif commande[0] == 'fermer':
+                    self.__envoyer_recapitulatifs()
+                    self.__deconnecter()
+                    return
+
+            if prochain_envoi is not None and time.monotonic() >= prochain_envoi:
+                self.__envoyer_recapitulatifs()
+                # Des alertes limitées par le quota restent en attente : réessayer à la fenêtre suivante
+                en_attente = any(self.en_attente.values())
+                prochain_envoi = time.monotonic() + self.fenetre_regroupement if en_attente else None
+
+    def fermer(self):
+        """
+        Envoie les récapitulatifs en attente et ferme la connexion SMTP (en attendant la fin du thread
+        d'envoi en mode asynchrone).
+        """
+        if self.thread is not None:
+            self.file.put(('fermer',))
+            self.thread.join()
+        else:
+            self.__deconnecter()
 
-        # Envoyer l'email
-        self.envoyer_email(sujet, contenu)
\ No newline at end of file
+        nb_en_attente = len({adresse_ip for en_attente in self.en_attente.values() for adresse_ip in en_attente})
+        if nb_en_attente:
+            print(f"Limite d'envoi atteinte : {nb_en_attente} adresse(s) IP suspecte(s) n'ont pas été notifiée(s).")
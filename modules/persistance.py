@@ -0,0 +1,334 @@
+import sqlite3
+from collections import Counter
+from datetime import datetime
+
+# Colonnes formant la clé naturelle d'un événement : l'occurrence numérote les événements identiques
+# survenus dans la même seconde, afin de les distinguer d'un même événement réinséré.
+CLE_NATURELLE = ('date_heure', 'hote', 'adresse_ip', 'utilisateur', 'evenement', 'occurrence')
+
+# Tables de cumuls par période : nom de la table -> expression SQL de la période d'un événement
+# ('YYYY-MM-DD HH:00' pour l'heure, 'YYYY-MM-DD' pour le jour)
+CUMULS = {
+    'cumul_heure': "substr(date_heure, 1, 13) || ':00'",
+    'cumul_jour': 'substr(date_heure, 1, 10)',
+}
+
+
+class BaseEvenements:
+    def __init__(self, chemin_base='logs_analyses.db'):
+        """
+        Couche de persistance SQLite des événements suspects : insertions groupées dans une seule
+        transaction, journal WAL, index sur (adresse_ip, date_heure) et dédoublonnage sur une clé naturelle
+        pour que des exécutions répétées n'insèrent que les nouveaux événements.
+
+        Des tables de cumuls (nombre d'événements par heure et par jour, adresse IP, type d'événement et
+        utilisateur) sont tenues à jour dans la même transaction que chaque insertion : les rapports
+        (plus actifs, séries temporelles, historique d'une adresse IP) les interrogent au lieu de parcourir
+        la table des événements.
+
+        Paramètres :
+        chemin_base (str) : Chemin du fichier de base de données SQLite.
+        """
+        self.chemin_base = chemin_base
+        self.cn = sqlite3.connect(chemin_base)
+        self.cn.execute('PRAGMA journal_mode=WAL')
+        self.cn.execute('PRAGMA synchronous=NORMAL')  # Suffisant en WAL : pas de corruption possible
+        self.derniere_seconde = None  # Dernière seconde insérée (insertion en continu)
+        self.occurrences_precedentes = {}  # Occurrences déjà insérées pour cette seconde
+        self.__creer_schema()
+
+    def __creer_schema(self):
+        """
+        Crée les tables et leurs index s'ils n'existent pas, et migre une base créée par une version précédente.
+        """
+        tables = {ligne[0] for ligne in self.cn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        with self.cn:
+            self.cn.execute('''
+                CREATE TABLE IF NOT EXISTS evenement_suspect (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    date_heure DATETIME,
+                    evenement TEXT,
+                    utilisateur TEXT,
+                    adresse_ip TEXT,
+                    occurrence INTEGER NOT NULL DEFAULT 0,
+                    hote TEXT NOT NULL DEFAULT ''
+                )
+            ''')
+
+            colonnes = [ligne[1] for ligne in self.cn.execute('PRAGMA table_info(evenement_suspect)')]
+            if 'occurrence' not in colonnes:
+                # Table d'une version précédente : numéroter les lignes identiques existantes
+                print("Migration de la table 'evenement_suspect' (ajout de la colonne 'occurrence').")
+                self.cn.execute('ALTER TABLE evenement_suspect ADD COLUMN occurrence INTEGER NOT NULL DEFAULT 0')
+                self.cn.execute('''
+                    UPDATE evenement_suspect SET occurrence = numerotation.numero
+                    FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY date_heure, adresse_ip, utilisateur, evenement ORDER BY id
+                        ) - 1 AS numero
+                        FROM evenement_suspect
+                    ) AS numerotation
+                    WHERE numerotation.id = evenement_suspect.id AND numerotation.numero > 0
+                ''')
+            if 'hote' not in colonnes:
+                # Les événements existants n'ont pas d'hôte : la clé naturelle est recréée avec l'hôte
+                print("Migration de la table 'evenement_suspect' (ajout de la colonne 'hote').")
+                self.cn.execute("ALTER TABLE evenement_suspect ADD COLUMN hote TEXT NOT NULL DEFAULT ''")
+                self.cn.execute('DROP INDEX IF EXISTS idx_evenement_suspect_cle')
+
+            self.cn.execute(f'''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_evenement_suspect_cle
+                ON evenement_suspect ({", ".join(CLE_NATURELLE)})
+            ''')
+            self.cn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_evenement_suspect_ip_date
+                ON evenement_suspect (adresse_ip, date_heure)
+            ''')
+
+            for table in CUMULS:
+                self.cn.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        periode TEXT NOT NULL,
+                        adresse_ip TEXT NOT NULL,
+                        evenement TEXT NOT NULL,
+                        utilisateur TEXT NOT NULL,
+                        nombre INTEGER NOT NULL,
+                        PRIMARY KEY (periode, adresse_ip, evenement, utilisateur)
+                    ) WITHOUT ROWID
+                ''')
+                # Index couvrant (avec le nombre) : les cumuls d'une adresse IP et le classement des adresses
+                # IP se lisent sans revenir à la table
+                self.cn.execute(f'DROP INDEX IF EXISTS idx_{table}_ip')
+                self.cn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_ip_nombre ON {table} (adresse_ip, periode, nombre)')
+            if 'cumul_heure' not in tables and 'evenement_suspect' in tables:
+                # Base d'une version précédente : calculer les cumuls des événements déjà présents
+                print("Migration de la base (calcul des cumuls par heure et par jour).")
+                self.__cumuler_depuis(0)
+
+    def __cumuler(self, cumuls_heure):
+        """
+        Ajoute aux tables de cumuls les nombres d'événements donnés par heure, et leur total par jour.
+
+        Paramètres :
+        cumuls_heure (Counter) : (heure, adresse_ip, evenement, utilisateur) -> nombre d'événements.
+        """
+        cumuls_jour = Counter()
+        for (heure, adresse_ip, evenement, utilisateur), nombre in cumuls_heure.items():
+            cumuls_jour[heure[:10], adresse_ip, evenement, utilisateur] += nombre
+        for table, cumuls in (('cumul_heure', cumuls_heure), ('cumul_jour', cumuls_jour)):
+            self.cn.executemany(f'''
+                INSERT INTO {table} (periode, adresse_ip, evenement, utilisateur, nombre) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (periode, adresse_ip, evenement, utilisateur) DO UPDATE SET nombre = nombre + excluded.nombre
+            ''', (cle + (nombre,) for cle, nombre in cumuls.items()))
+
+    def __cumuler_depuis(self, dernier_id):
+        """
+        Ajoute aux tables de cumuls les événements de la base d'identifiant supérieur à dernier_id.
+        """
+        for table, periode in CUMULS.items():
+            self.cn.execute(f'''
+                INSERT INTO {table} (periode, adresse_ip, evenement, utilisateur, nombre)
+                SELECT {periode}, adresse_ip, evenement, utilisateur, COUNT(*)
+                FROM evenement_suspect WHERE id > ?
+                GROUP BY 1, adresse_ip, evenement, utilisateur
+                ON CONFLICT (periode, adresse_ip, evenement, utilisateur) DO UPDATE SET nombre = nombre + excluded.nombre
+            ''', (dernier_id,))
+
+    def inserer(self, df_logs, suite=False):
+        """
+        Insère les événements d'un DataFrame en une seule transaction, en ignorant ceux déjà présents.
+
+        Paramètres :
+        df_logs (pd.DataFrame) : DataFrame avec les colonnes 'DateHeure' (datetime), 'Evenement',
+                                 'Utilisateur', 'AdresseIP' et 'Hote' (facultative), dans l'ordre chronologique.
+        suite (bool) : True si les événements font suite à ceux de l'insertion précédente sur cette
+                       connexion (mode démon) : la numérotation des occurrences reprend alors là où elle
+                       s'était arrêtée pour la dernière seconde insérée.
+
+        Retourne :
+        int : Le nombre d'événements réellement insérés.
+        """
+        if df_logs.empty:
+            return 0
+
+        import numpy as np  # Déjà chargé avec le DataFrame ; inutile pour les rapports
+
+        # Conversion vectorisée des dates au format 'YYYY-MM-DD HH:MM:SS'
+        dates = np.char.replace(np.datetime_as_string(df_logs['DateHeure'].to_numpy(), unit='s'), 'T', ' ').tolist()
+        evenements = df_logs['Evenement'].astype(str).tolist()
+        utilisateurs = df_logs['Utilisateur'].astype(str).tolist()
+        adresses_ip = df_logs['AdresseIP'].astype(str).tolist()
+        if 'Hote' in df_logs:
+            hotes = df_logs['Hote'].astype(str).tolist()
+            cle = ['DateHeure', 'Hote', 'AdresseIP', 'Utilisateur', 'Evenement']
+        else:
+            hotes = [''] * len(df_logs)
+            cle = ['DateHeure', 'AdresseIP', 'Utilisateur', 'Evenement']
+        occurrences = df_logs.groupby(cle, observed=True, sort=False).cumcount().tolist()
+
+        lignes = list(zip(dates, hotes, adresses_ip, utilisateurs, evenements, occurrences))
+        if suite:
+            lignes = self.__poursuivre_occurrences(lignes)
+
+        avant = self.cn.total_changes
+        with self.cn:
+            # Les identifiants étant croissants (AUTOINCREMENT), les événements réellement insérés sont ceux
+            # d'identifiant supérieur au dernier existant : seuls ceux-là sont ajoutés aux cumuls
+            dernier_id = self.cn.execute('SELECT COALESCE(MAX(id), 0) FROM evenement_suspect').fetchone()[0]
+            self.cn.executemany(f'''
+                INSERT OR IGNORE INTO evenement_suspect ({", ".join(CLE_NATURELLE)})
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', lignes)
+            nb_inseres = self.cn.total_changes - avant
+            if nb_inseres == len(lignes):
+                # Cas courant : tout le lot est nouveau, les cumuls sont calculés sans relire la base
+                self.__cumuler(Counter((date[:13] + ':00', adresse_ip, evenement, utilisateur)
+                                       for date, _, adresse_ip, utilisateur, evenement, _ in lignes))
+            elif nb_inseres:
+                self.__cumuler_depuis(dernier_id)
+        return nb_inseres
+
+    def __poursuivre_occurrences(self, lignes):
+        """
+        Décale la numérotation des occurrences des événements survenus dans la même seconde que la fin
+        de l'insertion précédente, et mémorise les occurrences de la dernière seconde de ce lot.
+        """
+        if self.occurrences_precedentes:
+            lignes = [ligne[:-1] + (ligne[-1] + self.occurrences_precedentes.get(ligne[:-1], 0),) for ligne in lignes]
+
+        derniere_seconde = lignes[-1][0]
+        if derniere_seconde != self.derniere_seconde:
+            self.occurrences_precedentes = {}
+            self.derniere_seconde = derniere_seconde
+        for ligne in lignes:
+            if ligne[0] == derniere_seconde:
+                self.occurrences_precedentes[ligne[:-1]] = ligne[-1] + 1
+        return lignes
+
+    @staticmethod
+    def periode(valeur, par_heure):
+        """
+        Convertit une date en période des tables de cumuls.
+
+        Paramètres :
+        valeur (str ou datetime) : Date ('YYYY-MM-DD', 'YYYY-MM-DD HH:MM'...), ou None.
+        par_heure (bool) : True pour une période horaire ('YYYY-MM-DD HH:00'), False pour un jour ('YYYY-MM-DD').
+
+        Retourne :
+        str : La période, ou None si valeur vaut None.
+        """
+        if valeur is None:
+            return None
+        if not isinstance(valeur, datetime):
+            valeur = datetime.fromisoformat(str(valeur))
+        return valeur.strftime('%Y-%m-%d %H:00' if par_heure else '%Y-%m-%d')
+
+    def __filtres(self, par_heure, debut=None, fin=None, **egalites):
+        """
+        Construit la clause WHERE d'une requête sur les cumuls : période entre debut et fin (inclus) et
+        colonnes égales aux valeurs données (les valeurs None sont ignorées).
+
+        Retourne :
+        tuple : (clause WHERE, paramètres).
+        """
+        conditions, parametres = [], []
+        if debut is not None:
+            conditions.append('periode >= ?')
+            parametres.append(self.periode(debut, par_heure))
+        if fin is not None:
+            conditions.append('periode <= ?')
+            parametres.append(self.periode(fin, par_heure))
+        for colonne, valeur in egalites.items():
+            if valeur is not None:
+                conditions.append(f'{colonne} = ?')
+                parametres.append(valeur)
+        return ('WHERE ' + ' AND '.join(conditions)) if conditions else '', parametres
+
+    @staticmethod
+    def __precision_horaire(*dates):
+        """
+        Indique si l'une des dates est précisée à l'heure près (et non au jour).
+        """
+        return any(date is not None and (isinstance(date, datetime) or len(str(date)) > 10) for date in dates)
+
+    def plus_actifs(self, k=10, debut=None, fin=None, critere='adresse_ip', evenement=None):
+        """
+        Renvoie les k adresses IP (ou utilisateurs, ou types d'événements) comptant le plus d'événements
+        sur une période, d'après les cumuls par jour (par heure si une borne est précisée à l'heure).
+
+        Paramètres :
+        k (int) : Nombre de résultats.
+        debut, fin (str ou datetime) : Bornes incluses de la période (par défaut toute la base).
+        critere (str) : 'adresse_ip', 'utilisateur' ou 'evenement'.
+        evenement (str) : Ne compter que ce type d'événement (par défaut tous).
+
+        Retourne :
+        list : Tuples (valeur, nombre d'événements, nombre de jours ou d'heures actifs), par nombre décroissant.
+        """
+        if critere not in ('adresse_ip', 'utilisateur', 'evenement'):
+            raise ValueError(f"Critère inconnu : {critere}")
+        par_heure = self.__precision_horaire(debut, fin)
+        clause, parametres = self.__filtres(par_heure, debut, fin, evenement=evenement)
+        return self.cn.execute(f'''
+            SELECT {critere}, SUM(nombre) AS total, COUNT(DISTINCT periode)
+            FROM {'cumul_heure' if par_heure else 'cumul_jour'} {clause}
+            GROUP BY {critere} ORDER BY total DESC LIMIT ?
+        ''', parametres + [k]).fetchall()
+
+    def serie(self, pas='heure', debut=None, fin=None, adresse_ip=None, evenement=None):
+        """
+        Renvoie le nombre d'événements par heure ou par jour, éventuellement pour une adresse IP ou un type
+        d'événement. Les périodes sans événement sont absentes.
+
+        Paramètres :
+        pas (str) : 'heure' ou 'jour'.
+        debut, fin (str ou datetime) : Bornes incluses de la période (par défaut toute la base).
+        adresse_ip (str) : Ne compter que les événements de cette adresse IP.
+        evenement (str) : Ne compter que ce type d'événement.
+
+        Retourne :
+        list : Tuples (période, nombre d'événements) dans l'ordre chronologique.
+        """
+        if pas not in ('heure', 'jour'):
+            raise ValueError(f"Pas inconnu : {pas}")
+        clause, parametres = self.__filtres(pas == 'heure', debut, fin, adresse_ip=adresse_ip, evenement=evenement)
+        return self.cn.execute(f'''
+            SELECT periode, SUM(nombre) FROM cumul_{pas} {clause}
+            GROUP BY periode ORDER BY periode
+        ''', parametres).fetchall()
+
+    def historique_adresse(self, adresse_ip, debut=None, fin=None, evenement=None, nb_utilisateurs=10):
+        """
+        Renvoie l'historique d'une adresse IP d'après les cumuls par jour.
+
+        Paramètres :
+        adresse_ip (str) : Adresse IP.
+        debut, fin (str ou datetime) : Bornes incluses de la période (par défaut toute la base).
+        evenement (str) : Ne compter que ce type d'événement (par défaut tous).
+        nb_utilisateurs (int) : Nombre d'utilisateurs les plus visés à renvoyer.
+
+        Retourne :
+        dict : 'jours' (liste de tuples (jour, type d'événement, nombre d'événements, nombre d'utilisateurs
+               distincts)), 'utilisateurs' (liste de tuples (utilisateur, nombre d'événements)), et 'premier'
+               et 'dernier' (dates du premier et du dernier événement de l'adresse IP dans la base, ou None).
+        """
+        clause, parametres = self.__filtres(False, debut, fin, adresse_ip=adresse_ip, evenement=evenement)
+        jours = self.cn.execute(f'''
+            SELECT periode, evenement, SUM(nombre), COUNT(*) FROM cumul_jour {clause}
+            GROUP BY periode, evenement ORDER BY periode, evenement
+        ''', parametres).fetchall()
+        utilisateurs = self.cn.execute(f'''
+            SELECT utilisateur, SUM(nombre) AS total FROM cumul_jour {clause}
+            GROUP BY utilisateur ORDER BY total DESC LIMIT ?
+        ''', parametres + [nb_utilisateurs]).fetchall()
+        # Premier et dernier événement : lus sur l'index (adresse_ip, date_heure) de la table des événements
+        premier, dernier = (
+            self.cn.execute(f'SELECT date_heure FROM evenement_suspect WHERE adresse_ip = ? '
+                            f'ORDER BY date_heure {ordre} LIMIT 1', (adresse_ip,)).fetchone()
+            for ordre in ('ASC', 'DESC')
+        )
+        return {'jours': jours, 'utilisateurs': utilisateurs,
+                'premier': premier[0] if premier else None, 'dernier': dernier[0] if dernier else None}
+
+    def fermer(self):
+        self.cn.close()
@@ -0,0 +1,338 @@
+import heapq
+import bisect
+import ipaddress
+import pandas as pd
+
+# Longueurs de préfixe suivies par défaut : réseau local (/24, /64) et plage d'opérateur (/16, /48)
+LONGUEURS_IPV4 = (24, 16)
+LONGUEURS_IPV6 = (64, 48)
+
+# Nombre maximal d'adresses IP distinctes mémorisées par préfixe (au-delà, les nouvelles ne sont plus retenues)
+MAX_ADRESSES_PAR_PREFIXE = 256
+
+
+class IndexPrefixes:
+    def __init__(self, fenetre='1min', seuil=30, adresses_min=3, longueurs_ipv4=LONGUEURS_IPV4,
+                 longueurs_ipv6=LONGUEURS_IPV6, nb_tranches=6, max_prefixes=100_000):
+        """
+        Index en mémoire des accès par préfixe réseau, pour détecter les attaques réparties entre de
+        nombreuses adresses d'un même réseau (chacune restant sous le seuil par adresse IP).
+
+        Les adresses sont converties en entiers (IPv4 et IPv6) et chaque accès est compté pour chacune
+        des longueurs de préfixe suivies ; la clé d'un préfixe est l'adresse masquée, si bien que la
+        recherche d'un préfixe se fait en temps constant. Le nombre d'accès de chaque préfixe est tenu
+        sur une fenêtre glissante découpée en nb_tranches tranches (tampon circulaire de compteurs) :
+        la mémoire par préfixe est fixe et la fenêtre est approchée à une tranche près.
+        Au-delà de max_prefixes préfixes suivis, les moins actifs sont oubliés.
+        Les préfixes sont aussi rangés par nombre d'accès (à leur dernière mise à jour), ce qui permet
+        d'obtenir les plus actifs sans parcourir tous les préfixes suivis (voir plus_actifs).
+
+        Paramètres :
+        fenetre (str) : Durée de la fenêtre glissante (par exemple '1min').
+        seuil (int) : Nombre d'accès d'un préfixe dans la fenêtre au-delà duquel une alerte est émise.
+        adresses_min (int) : Nombre minimal d'adresses IP distinctes du préfixe dans la fenêtre pour une
+                             alerte (une adresse seule est déjà signalée par le détecteur par adresse IP).
+        longueurs_ipv4 (tuple) : Longueurs de préfixe suivies pour IPv4.
+        longueurs_ipv6 (tuple) : Longueurs de préfixe suivies pour IPv6.
+        nb_tranches (int) : Nombre de tranches de la fenêtre glissante.
+        max_prefixes (int) : Nombre maximal de préfixes suivis.
+        """
+        self.fenetre = pd.Timedelta(fenetre).value  # Durée de la fenêtre en nanosecondes
+        self.seuil = seuil
+        self.adresses_min = adresses_min
+        self.nb_tranches = nb_tranches
+        self.duree_tranche = max(1, self.fenetre // nb_tranches)
+        self.max_prefixes = max_prefixes
+        # Masques des préfixes suivis pour chaque version d'IP : (longueur, masque)
+        self.masques = {
+            4: [(longueur, ((1 << longueur) - 1) << (32 - longueur)) for longueur in longueurs_ipv4],
+            6: [(longueur, ((1 << longueur) - 1) << (128 - longueur)) for longueur in longueurs_ipv6],
+        }
+        # (version, longueur, réseau) -> [dernière tranche, compteurs par tranche, {adresse IP: tranche}, en_alerte,
+        #                               nombre d'accès dans la fenêtre à la dernière mise à jour]
+        self.prefixes = {}
+        # Classement des préfixes : nombre d'accès à la dernière mise à jour -> clés des préfixes, et nombres
+        # d'accès présents par ordre croissant. Ce nombre majore le nombre d'accès actuel (la fenêtre n'a pu
+        # que glisser depuis)
+        self.par_nombre_acces = {}
+        self.nombres_acces = []
+        self.adresses_converties = {}  # adresse IP (str) -> (version, entier), ou None si invalide
+        self.derniere_purge = None
+        self.derniere_tranche = None  # Tranche du dernier accès vu
+
+    def __len__(self):
+        """
+        Nombre de préfixes actuellement suivis.
+        """
+        return len(self.prefixes)
+
+    def convertir_adresse(self, adresse_ip):
+        """
+        Convertit une adresse IP en (version, entier) ; une adresse IPv4 incluse dans une adresse IPv6
+        ('::ffff:a.b.c.d') est traitée comme une adresse IPv4.
+
+        Retourne :
+        tuple : (version, entier), ou None si l'adresse est invalide.
+        """
+        if adresse_ip in self.adresses_converties:
+            return self.adresses_converties[adresse_ip]
+        try:
+            adresse = ipaddress.ip_address(adresse_ip.split('%', 1)[0])  # Sans la zone ('%eth0')
+            if adresse.version == 6 and adresse.ipv4_mapped is not None:
+                adresse = adresse.ipv4_mapped
+            resultat = (adresse.version, int(adresse))
+        except ValueError:
+            resultat = None
+        if len(self.adresses_converties) > 1_000_000:
+            self.adresses_converties.clear()
+        self.adresses_converties[adresse_ip] = resultat
+        return resultat
+
+    @staticmethod
+    def formater_prefixe(cle):
+        """
+        Renvoie la notation CIDR d'un préfixe (par exemple '203.0.113.0/24').
+        """
+        version, longueur, reseau = cle
+        return str(ipaddress.ip_network(((ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address)(reseau),
+                                         longueur)))
+
+    def __avancer(self, suivi, tranche):
+        """
+        Fait glisser la fenêtre d'un préfixe jusqu'à la tranche donnée, en remettant à zéro les tranches sorties.
+        """
+        ecart = tranche - suivi[0]
+        if ecart >= self.nb_tranches:
+            suivi[1] = [0] * self.nb_tranches
+        else:
+            compteurs = suivi[1]
+            for t in range(suivi[0] + 1, tranche + 1):
+                compteurs[t % self.nb_tranches] = 0
+        suivi[0] = tranche
+
+    def ajouter(self, horodatage, adresse_ip):
+        """
+        Prend en compte un accès pour chaque préfixe contenant l'adresse IP, et renvoie les alertes des
+        préfixes qui viennent de dépasser le seuil. Un préfixe en alerte ne déclenche pas de nouvelle
+        alerte tant que son nombre d'accès dans la fenêtre n'est pas redescendu sous le seuil.
+
+        Paramètres :
+        horodatage (int) : Horodatage de l'accès en nanosecondes depuis l'epoch.
+        adresse_ip (str) : Adresse IP source de l'accès.
+
+        Retourne :
+        list : Alertes au format ((pd.Timestamp, préfixe en notation CIDR), nombre_acces).
+        """
+        adresse = self.convertir_adresse(adresse_ip)
+        if adresse is None:
+            return []
+        version, valeur = adresse
+        tranche = horodatage // self.duree_tranche
+
+        if self.derniere_purge is None:
+            self.derniere_purge = self.derniere_tranche = tranche
+        elif tranche - self.derniere_purge > self.nb_tranches:
+            self.purger(tranche)
+        if tranche > self.derniere_tranche:
+            self.derniere_tranche = tranche
+
+        alertes = []
+        for longueur, masque in self.masques[version]:
+            cle = (version, longueur, valeur & masque)
+            suivi = self.prefixes.get(cle)
+            if suivi is None:
+                if len(self.prefixes) >= self.max_prefixes:
+                    self.__reduire(tranche)
+                suivi = self.prefixes[cle] = [tranche, [0] * self.nb_tranches, {}, False, 0]
+            elif tranche > suivi[0]:
+                self.__avancer(suivi, tranche)
+            elif tranche <= suivi[0] - self.nb_tranches:
+                continue  # Accès antérieur à la fenêtre courante du préfixe
+
+            suivi[1][tranche % self.nb_tranches] += 1
+            adresses = suivi[2]
+            if adresse_ip in adresses or len(adresses) < MAX_ADRESSES_PAR_PREFIXE:
+                adresses[adresse_ip] = max(tranche, adresses.get(adresse_ip, tranche))
+
+            nombre_acces = sum(suivi[1])
+            self.__classer(cle, suivi[4], nombre_acces)
+            suivi[4] = nombre_acces
+            if nombre_acces > self.seuil:
+                if not suivi[3] and self.__nb_adresses(suivi) >= self.adresses_min:
+                    suivi[3] = True
+                    alertes.append(((pd.Timestamp(horodatage), self.formater_prefixe(cle)), nombre_acces))
+            else:
+                suivi[3] = False
+        return alertes
+
+    def __classer(self, cle, ancien, nouveau):
+        """
+        Déplace un préfixe dans le classement par nombre d'accès (0 : hors du classement).
+        """
+        if ancien == nouveau:
+            return
+        if ancien:
+            cles = self.par_nombre_acces[ancien]
+            cles.discard(cle)
+            if not cles:
+                del self.par_nombre_acces[ancien]
+                del self.nombres_acces[bisect.bisect_left(self.nombres_acces, ancien)]
+        if nouveau:
+            cles = self.par_nombre_acces.get(nouveau)
+            if cles is None:
+                cles = self.par_nombre_acces[nouveau] = set()
+                bisect.insort(self.nombres_acces, nouveau)
+            cles.add(cle)
+
+    def __reclasser(self):
+        """
+        Reconstruit le classement par nombre d'accès après l'oubli de préfixes.
+        """
+        self.par_nombre_acces = {}
+        for cle, suivi in self.prefixes.items():
+            if suivi[4]:
+                self.par_nombre_acces.setdefault(suivi[4], set()).add(cle)
+        self.nombres_acces = sorted(self.par_nombre_acces)
+
+    def ajouter_lot(self, horodatages, adresses_ip):
+        """
+        Prend en compte un lot d'accès dans l'ordre chronologique.
+
+        Paramètres :
+        horodatages (iterable) : Horodatages en nanosecondes depuis l'epoch.
+        adresses_ip (iterable) : Adresses IP correspondantes.
+
+        Retourne :
+        list : Liste des alertes déclenchées, au format ((pd.Timestamp, préfixe), nombre_acces).
+        """
+        ajouter = self.ajouter
+        alertes = []
+        for horodatage, adresse_ip in zip(horodatages, adresses_ip):
+            alertes.extend(ajouter(horodatage, adresse_ip))
+        return alertes
+
+    def __nb_adresses(self, suivi):
+        """
+        Nombre d'adresses IP distinctes du préfixe vues dans la fenêtre.
+        """
+        limite = suivi[0] - self.nb_tranches
+        return sum(1 for tranche in suivi[2].values() if tranche > limite)
+
+    def __nombre_acces(self, suivi, tranche):
+        """
+        Nombre d'accès d'un préfixe dans la fenêtre se terminant à la tranche donnée.
+        """
+        ecart = tranche - suivi[0]
+        if ecart <= 0:
+            return sum(suivi[1])
+        if ecart >= self.nb_tranches:
+            return 0
+        # Les tranches suivant la dernière mise à jour sont vides ; les plus anciennes sont sorties de la fenêtre
+        return sum(suivi[1][t % self.nb_tranches] for t in range(tranche - self.nb_tranches + 1, suivi[0] + 1))
+
+    def decompte(self, prefixe, horodatage=None):
+        """
+        Renvoie le nombre d'accès d'un préfixe et son nombre d'adresses IP distinctes dans la fenêtre se
+        terminant à l'instant donné.
+
+        Paramètres :
+        prefixe (str) : Préfixe en notation CIDR (par exemple '203.0.113.0/24').
+        horodatage (int) : Fin de la fenêtre en nanosecondes depuis l'epoch (par défaut le dernier accès vu).
+
+        Retourne :
+        tuple : (nombre d'accès, nombre d'adresses IP distinctes), (0, 0) si le préfixe n'est pas suivi.
+        """
+        reseau = ipaddress.ip_network(prefixe, strict=False)
+        suivi = self.prefixes.get((reseau.version, reseau.prefixlen, int(reseau.network_address)))
+        if suivi is None:
+            return 0, 0
+        tranche = (self.derniere_tranche or 0) if horodatage is None else horodatage // self.duree_tranche
+        return self.__nombre_acces(suivi, tranche), self.__nb_adresses(suivi)
+
+    def taux(self, prefixe, horodatage):
+        """
+        Renvoie le taux d'accès d'un préfixe (accès par seconde sur la fenêtre) à un instant donné.
+
+        Paramètres :
+        prefixe (str) : Préfixe en notation CIDR (par exemple '203.0.113.0/24').
+        horodatage (int) : Instant en nanosecondes depuis l'epoch.
+        """
+        return self.decompte(prefixe, horodatage)[0] / (self.fenetre / 1e9)
+
+    def plus_actifs(self, k=10, horodatage=None, longueur=None):
+        """
+        Renvoie les k préfixes ayant le plus d'accès dans la fenêtre se terminant à l'instant donné.
+
+        Les préfixes sont examinés par nombre d'accès décroissant à leur dernière mise à jour ; ce nombre
+        majorant le nombre d'accès actuel, l'examen s'arrête dès qu'il ne peut plus dépasser le k-ième
+        meilleur trouvé. Seuls les préfixes les plus actifs récemment sont donc examinés, sauf si de
+        nombreux préfixes très actifs sont devenus inactifs depuis leur dernier accès (au pire, tous les
+        préfixes suivis sont examinés).
+
+        Paramètres :
+        k (int) : Nombre de préfixes.
+        horodatage (int) : Fin de la fenêtre en nanosecondes depuis l'epoch (par défaut le dernier accès vu).
+        longueur (int) : Ne considérer que les préfixes de cette longueur (par défaut toutes).
+
+        Retourne :
+        list : Tuples (préfixe en notation CIDR, nombre d'accès, nombre d'adresses IP distinctes), par
+               nombre d'accès décroissant.
+        """
+        if horodatage is None:
+            tranche = self.derniere_tranche or 0
+        else:
+            tranche = horodatage // self.duree_tranche
+
+        meilleurs = []  # Tas des k meilleurs (nombre d'accès, clé), le moins bon en tête
+        for majorant in reversed(self.nombres_acces):
+            if len(meilleurs) >= k and majorant < meilleurs[0][0]:
+                break
+            for cle in self.par_nombre_acces[majorant]:
+                if longueur is not None and cle[1] != longueur:
+                    continue
+                candidat = (self.__nombre_acces(self.prefixes[cle], tranche), cle)
+                if not candidat[0]:
+                    continue
+                if len(meilleurs) < k:
+                    heapq.heappush(meilleurs, candidat)
+                elif candidat > meilleurs[0]:
+                    heapq.heapreplace(meilleurs, candidat)
+        return [(self.formater_prefixe(cle), nombre_acces, self.__nb_adresses(self.prefixes[cle]))
+                for nombre_acces, cle in sorted(meilleurs, reverse=True)]
+
+    def prefixes_en_alerte(self):
+        """
+        Renvoie l'ensemble des préfixes (notation CIDR) actuellement au-dessus du seuil.
+        """
+        return {self.formater_prefixe(cle) for cle, suivi in self.prefixes.items() if suivi[3]}
+
+    def adresses_en_alerte(self):
+        """
+        Renvoie les adresses IP vues dans les préfixes actuellement en alerte.
+        """
+        return {adresse_ip for suivi in self.prefixes.values() if suivi[3] for adresse_ip in suivi[2]}
+
+    def purger(self, tranche):
+        """
+        Oublie les préfixes sans aucun accès dans la fenêtre se terminant à la tranche donnée, ainsi que
+        les adresses IP sorties de la fenêtre des préfixes restants.
+        """
+        limite = tranche - self.nb_tranches
+        self.prefixes = {cle: suivi for cle, suivi in self.prefixes.items() if suivi[0] > limite}
+        for suivi in self.prefixes.values():
+            if len(suivi[2]) >= MAX_ADRESSES_PAR_PREFIXE:
+                suivi[2] = {adresse_ip: t for adresse_ip, t in suivi[2].items() if t > limite}
+        self.__reclasser()
+        self.derniere_purge = tranche
+
+    def __reduire(self, tranche):
+        """
+        Ramène le nombre de préfixes suivis sous la limite : les préfixes inactifs sont oubliés, puis,
+        si besoin, le dixième le moins actif.
+        """
+        self.purger(tranche)
+        if len(self.prefixes) >= self.max_prefixes:
+            a_oublier = heapq.nsmallest(max(1, self.max_prefixes // 10), self.prefixes,
+                                        key=lambda cle: self.__nombre_acces(self.prefixes[cle], tranche))
+            for cle in a_oublier:
+                self.__classer(cle, self.prefixes.pop(cle)[4], 0)
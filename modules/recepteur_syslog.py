@@ -0,0 +1,337 @@
+import re
+import time
+import socket
+import asyncio
+import calendar
+from collections import deque
+from modules.regles import REGEX_HORODATAGE
+
+MOIS = (b'Jan', b'Feb', b'Mar', b'Apr', b'May', b'Jun', b'Jul', b'Aug', b'Sep', b'Oct', b'Nov', b'Dec')
+
+# En-tête RFC 5424 (après la priorité) : version, horodatage ISO 8601 ou '-', hôte, application,
+# identifiant de processus et de message ; suivent les données structurées puis le message.
+REGEX_RFC5424 = re.compile(
+    rb"1 (?:(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.\d+)?(Z|[+-]\d{2}:\d{2})|-) (\S+) (\S+) (\S+) \S+ ")
+
+# Taille maximale d'un message TCP : au-delà, le flux est considéré comme invalide et le tampon vidé
+TAILLE_MAX_MESSAGE = 64 * 1024
+
+
+class RecepteurSyslog:
+    def __init__(self, adresse='0.0.0.0', port=5140, udp=True, tcp=True, taille_lot=2000, delai_lot=0.2,
+                 taille_file=50):
+        """
+        Récepteur syslog asyncio (UDP et TCP, RFC 3164 et RFC 5424, trames TCP délimitées par une fin de
+        ligne ou préfixées par leur longueur selon la RFC 6587). Chaque message est réécrit sous la forme
+        d'une ligne de fichier 'secure' ('Mon DD HH:MM:SS hôte message'), l'hôte étant celui de l'en-tête
+        ou, à défaut, l'adresse de l'émetteur ; les lignes sont regroupées en lots (blocs de lignes) pour
+        être analysées par le même moteur d'extraction que les fichiers.
+
+        La file des lots est bornée : quand elle est pleine, la lecture des connexions TCP est suspendue
+        (les émetteurs sont ralentis par le contrôle de flux TCP) et les datagrammes UDP sont comptés
+        comme perdus, jusqu'à ce que la file se soit vidée de moitié.
+
+        Paramètres :
+        adresse (str) : Adresse d'écoute.
+        port (int) : Port d'écoute UDP et TCP.
+        udp (bool) : Écouter en UDP.
+        tcp (bool) : Écouter en TCP.
+        taille_lot (int) : Nombre de messages d'un lot.
+        delai_lot (float) : Durée maximale, en secondes, pendant laquelle un lot incomplet attend d'être traité.
+        taille_file (int) : Nombre maximal de lots en attente de traitement.
+        """
+        self.adresse = adresse
+        self.port = port
+        self.udp = udp
+        self.tcp = tcp
+        self.taille_lot = taille_lot
+        self.delai_lot = delai_lot
+        self.taille_file = taille_file
+
+        self.lot = []  # Lignes du lot en cours
+        self.file = deque()  # Lots (bytes) en attente de traitement
+        self.sature = False
+        self.transports_tcp = set()
+        self.lot_pret = None  # asyncio.Event, créé dans la boucle d'événements
+
+        self.messages_recus = 0
+        self.messages_perdus = 0
+        self.lots_traites = 0
+
+        self.hotes_sources = {}  # adresse de l'émetteur -> bytes
+        self.dates_rfc5424 = {}  # horodatage ISO 8601 (à la seconde) -> date au format syslog
+        self.seconde_courante = None
+        self.date_courante = None
+
+    @staticmethod
+    def formater_date(instant):
+        """
+        Formate un instant (secondes depuis l'epoch) en date syslog locale 'Mon DD HH:MM:SS' (bytes).
+        """
+        t = time.localtime(instant)
+        return b'%s %2d %02d:%02d:%02d' % (MOIS[t.tm_mon - 1], t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec)
+
+    def __date_reception(self):
+        """
+        Date de réception, pour les messages sans horodatage (recalculée une fois par seconde).
+        """
+        seconde = int(time.time())
+        if seconde != self.seconde_courante:
+            self.seconde_courante = seconde
+            self.date_courante = self.formater_date(seconde)
+        return self.date_courante
+
+    def __convertir_rfc5424(self, message, hote_source):
+        """
+        Réécrit un message RFC 5424 (sans sa priorité) en ligne syslog traditionnelle. L'horodatage est
+        converti dans le fuseau local, comme celui des lignes des fichiers.
+        """
+        match = REGEX_RFC5424.match(message)
+        if match is None:
+            return None
+
+        if match.group(1) is None:
+            date = self.__date_reception()
+        else:
+            cle = message[2:match.end(6)] + match.group(7)  # Horodatage à la seconde près, avec le fuseau
+            date = self.dates_rfc5424.get(cle)
+            if date is None:
+                annee, mois, jour, heure, minute, seconde = (int(valeur) for valeur in match.group(1, 2, 3, 4, 5, 6))
+                instant = calendar.timegm((annee, mois, jour, heure, minute, seconde))
+                fuseau = match.group(7)
+                if fuseau != b'Z':
+                    decalage = int(fuseau[1:3]) * 3600 + int(fuseau[4:6]) * 60
+                    instant -= decalage if fuseau[:1] == b'+' else -decalage
+                if len(self.dates_rfc5424) > 10000:
+                    self.dates_rfc5424.clear()
+                date = self.dates_rfc5424[cle] = self.formater_date(instant)
+
+        hote, application, processus = match.group(8, 9, 10)
+        if hote == b'-':
+            hote = hote_source
+        if application == b'-':
+            etiquette = b''
+        elif processus == b'-':
+            etiquette = application + b': '
+        else:
+            etiquette = b'%s[%s]: ' % (application, processus)
+
+        # Ignorer les données structurées : '-' ou une suite d'éléments '[...]' (']' échappé par '\')
+        position = match.end()
+        if message[position:position + 1] == b'-':
+            position += 1
+        else:
+            while message[position:position + 1] == b'[':
+                fin = message.find(b']', position)
+                while fin != -1 and message[fin - 1] == 92:  # '\]'
+                    fin = message.find(b']', fin + 1)
+                if fin == -1:
+                    return None
+                position = fin + 1
+        corps = message[position + 1:]
+        if corps[:3] == b'\xef\xbb\xbf':  # Indicateur d'ordre des octets UTF-8
+            corps = corps[3:]
+        return b'%s %s %s%s' % (date, hote, etiquette, corps)
+
+    def convertir_message(self, message, hote_source):
+        """
+        Réécrit un message syslog (RFC 3164 ou RFC 5424) en ligne au format des fichiers 'secure'.
+
+        Paramètres :
+        message (bytes) : Le message reçu, avec ou sans priorité '<PRI>'.
+        hote_source (bytes) : Adresse de l'émetteur, utilisée si l'en-tête ne nomme pas l'hôte.
+
+        Retourne :
+        bytes : La ligne (sans fin de ligne), ou None si le message est invalide.
+        """
+        if message[:1] == b'<':
+            fin_priorite = message.find(b'>', 1, 5)
+            if fin_priorite != -1:
+                message = message[fin_priorite + 1:]
+        message = message.rstrip(b'\r\n\x00')
+        if b'\n' in message:
+            message = message.replace(b'\r', b' ').replace(b'\n', b' ')
+
+        if message[:2] == b'1 ':
+            return self.__convertir_rfc5424(message, hote_source)
+        if REGEX_HORODATAGE.match(message):
+            # Certains émetteurs omettent l'hôte : le champ qui suit l'horodatage est alors l'étiquette
+            fin_champ = message.find(b' ', 16)
+            champ = message[16:fin_champ] if fin_champ != -1 else message[16:]
+            if fin_champ == -1 or champ[-1:] == b':' or b'[' in champ:
+                return b'%s%s %s' % (message[:16], hote_source, message[16:])
+            return message
+        # Pas d'horodatage : dater le message de sa réception
+        return b'%s %s %s' % (self.__date_reception(), hote_source, message)
+
+    def __hote_source(self, adresse):
+        hote = self.hotes_sources.get(adresse)
+        if hote is None:
+            if len(self.hotes_sources) > 100000:
+                self.hotes_sources.clear()
+            hote = self.hotes_sources[adresse] = adresse.encode()
+        return hote
+
+    def ajouter(self, message, adresse):
+        """
+        Ajoute un message reçu au lot en cours, et clôt le lot s'il est complet.
+
+        Paramètres :
+        message (bytes) : Le message reçu.
+        adresse (str) : Adresse IP de l'émetteur.
+        """
+        self.messages_recus += 1
+        ligne = self.convertir_message(message, self.__hote_source(adresse))
+        if ligne is None:
+            return
+        self.lot.append(ligne)
+        if len(self.lot) >= self.taille_lot:
+            self.clore_lot()
+
+    def clore_lot(self):
+        """
+        Place le lot en cours dans la file de traitement, en suspendant la lecture TCP si la file est pleine.
+        """
+        if not self.lot:
+            return
+        self.lot.append(b'')  # Fin de ligne après la dernière ligne
+        self.file.append(b'\n'.join(self.lot))
+        self.lot = []
+        self.lot_pret.set()
+        if len(self.file) >= self.taille_file and not self.sature:
+            self.sature = True
+            for transport in self.transports_tcp:
+                transport.pause_reading()
+
+    def desaturer(self):
+        """
+        Reprend la lecture TCP une fois la file vidée de moitié après une saturation.
+        """
+        if self.sature and len(self.file) <= self.taille_file // 2:
+            self.sature = False
+            for transport in self.transports_tcp:
+                transport.resume_reading()
+
+    async def __clore_periodiquement(self):
+        """
+        Clôt le lot en cours à intervalle régulier, pour qu'un faible débit ne retarde pas les alertes.
+        """
+        while True:
+            await asyncio.sleep(self.delai_lot)
+            self.clore_lot()
+
+    async def __traiter_lots(self, traiter):
+        """
+        Traite les lots dans l'ordre d'arrivée, en rendant la main à la boucle d'événements entre deux lots.
+        """
+        while True:
+            await self.lot_pret.wait()
+            self.lot_pret.clear()
+            while self.file:
+                traiter(self.file.popleft())
+                self.lots_traites += 1
+                self.desaturer()
+                await asyncio.sleep(0)
+
+    async def __servir(self, traiter):
+        boucle = asyncio.get_running_loop()
+        self.lot_pret = asyncio.Event()
+        serveurs = []
+
+        if self.udp:
+            transport, _ = await boucle.create_datagram_endpoint(lambda: ProtocoleUDP(self), local_addr=(self.adresse, self.port))
+            serveurs.append(transport)
+        if self.tcp:
+            serveurs.append(await boucle.create_server(lambda: ProtocoleTCP(self), self.adresse, self.port, reuse_address=True))
+        print(f"Réception syslog sur {self.adresse}:{self.port} "
+              f"({' et '.join(nom for nom, actif in (('UDP', self.udp), ('TCP', self.tcp)) if actif)}).")
+
+        taches = [asyncio.create_task(self.__clore_periodiquement()), asyncio.create_task(self.__traiter_lots(traiter))]
+        try:
+            await asyncio.gather(*taches)
+        finally:
+            for tache in taches:
+                tache.cancel()
+            for serveur in serveurs:
+                serveur.close()
+            # Traiter les messages déjà reçus
+            self.clore_lot()
+            while self.file:
+                traiter(self.file.popleft())
+                self.lots_traites += 1
+
+    def servir(self, traiter):
+        """
+        Reçoit les messages jusqu'à une interruption (Ctrl+C) et appelle traiter pour chaque lot.
+
+        Paramètres :
+        traiter (callable) : Fonction appelée avec chaque lot (bytes : lignes terminées par une fin de ligne).
+        """
+        asyncio.run(self.__servir(traiter))
+
+
+class ProtocoleUDP(asyncio.DatagramProtocol):
+    def __init__(self, recepteur):
+        """
+        Réception des datagrammes syslog UDP, perdus tant que la file des lots est saturée.
+        """
+        self.recepteur = recepteur
+
+    def connection_made(self, transport):
+        # Un tampon de réception plus grand absorbe les pics pendant le traitement d'un lot
+        transport.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+
+    def datagram_received(self, donnees, adresse):
+        if self.recepteur.sature:
+            self.recepteur.messages_perdus += 1
+            return
+        self.recepteur.ajouter(donnees, adresse[0])
+
+
+class ProtocoleTCP(asyncio.Protocol):
+    def __init__(self, recepteur):
+        """
+        Connexion syslog TCP : le flux est découpé en messages délimités par une fin de ligne ou préfixés
+        par leur longueur (RFC 6587), selon son premier octet.
+        """
+        self.recepteur = recepteur
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.hote = transport.get_extra_info('peername')[0]
+        self.tampon = b''
+        self.par_longueur = None  # Trames préfixées par leur longueur (RFC 6587), déterminé au 1er octet
+        self.recepteur.transports_tcp.add(transport)
+        if self.recepteur.sature:
+            transport.pause_reading()
+
+    def connection_lost(self, exc):
+        self.recepteur.transports_tcp.discard(self.transport)
+
+    def data_received(self, donnees):
+        tampon = self.tampon + donnees if self.tampon else donnees
+        if self.par_longueur is None:
+            self.par_longueur = tampon[:1].isdigit()
+        if self.par_longueur:
+            position = 0
+            while True:
+                espace = tampon.find(b' ', position, position + 10)
+                if espace == -1 or not tampon[position:espace].isdigit():
+                    if len(tampon) - position >= 10:  # Trame invalide : abandonner le flux
+                        position = len(tampon)
+                    break
+                fin = espace + 1 + int(tampon[position:espace])
+                if fin > len(tampon):
+                    break
+                self.recepteur.ajouter(tampon[espace + 1:fin], self.hote)
+                position = fin
+            self.tampon = tampon[position:]
+        else:
+            lignes = tampon.split(b'\n')
+            self.tampon = lignes.pop()
+            for ligne in lignes:
+                if ligne:
+                    self.recepteur.ajouter(ligne, self.hote)
+        if len(self.tampon) > TAILLE_MAX_MESSAGE:
+            print(f"Message syslog trop long reçu de {self.hote} : ignoré.")
+            self.tampon = b''
@@ -0,0 +1,228 @@
+import re
+import hashlib
+import configparser
+
+# Sous-motifs utilisables dans les motifs des règles
+MACROS = {
+    # Adresse IPv4, ou IPv6 (y compris compressée, avec IPv4 incluse ou zone '%eth0')
+    '{IP}': r"(?P<ip>(?:\d{1,3}\.){3}\d{1,3}|[0-9A-Fa-f]{0,4}(?::[0-9A-Fa-f]{0,4}){2,7}(?:\.\d{1,3}){0,3}(?:%[\w.]+)?)",
+    # Nom d'utilisateur quelconque (éventuellement vide ou avec des espaces) : le plus long possible, pour
+    # qu'un nom contenant lui-même ' from <IP> port <N>' ne puisse pas imputer l'accès à une autre adresse
+    # (le motif doit alors être ancré en fin de ligne, la partie qui suit l'utilisateur étant fixée par sshd)
+    '{UTILISATEUR}': r"(?P<utilisateur>.*)",
+}
+
+# Début d'une ligne syslog : 'Mon DD HH:MM:SS ' (le jour peut être complété par une espace)
+REGEX_HORODATAGE = re.compile(rb"[A-Za-z]{3} [ \d]\d \d{2}:\d{2}:\d{2} ")
+
+# Règles utilisées si le fichier de configuration n'en déclare aucune.
+# Le littéral est recherché tel quel dans le bloc lu (pré-filtre) et doit être propre à la règle ;
+# le motif n'est ensuite appliqué qu'aux lignes dont le premier littéral trouvé est celui de la règle.
+# 'compter' indique si l'événement compte dans la détection des adresses IP trop actives.
+REGLES_PAR_DEFAUT = (
+    {
+        'nom': 'sshd_utilisateur_invalide',
+        'evenement': 'Invalid user',
+        'litteral': 'Invalid user ',
+        'motif': r"Invalid user {UTILISATEUR} from {IP}(?: port \d+)?\s*$",
+        'compter': True,
+        'exemples': ["Sep 29 03:29:38 localhost sshd[3396462]: Invalid user roott from 89.208.103.230 port 57294"],
+    },
+    {
+        # Les échecs pour un utilisateur invalide sont déjà comptés par la ligne 'Invalid user'
+        'nom': 'sshd_echec_mot_de_passe',
+        'evenement': 'Failed password',
+        'litteral': 'Failed password for ',
+        'motif': r"Failed password for (?!invalid user ){UTILISATEUR} from {IP} port \d+(?: ssh2)?\s*$",
+        'compter': True,
+        'exemples': ["Sep 29 03:29:40 localhost sshd[3396462]: Failed password for root from 2001:db8::7 port 57294 ssh2"],
+    },
+    {
+        'nom': 'sshd_connexion_acceptee',
+        'evenement': 'Accepted',
+        'litteral': 'Accepted ',
+        'motif': r"Accepted \S+ for {UTILISATEUR} from {IP} port \d+(?: ssh2(?:: .*)?)?\s*$",
+        'compter': False,
+        'exemples': ["Sep 29 03:30:01 localhost sshd[3396470]: Accepted publickey for bob from 192.0.2.10 port 50022 ssh2"],
+    },
+    {
+        # Doublon des échecs sshd, mais aussi produit par les autres services utilisant PAM
+        'nom': 'pam_echec_authentification',
+        'evenement': 'PAM authentication failure',
+        'litteral': 'authentication failure;',
+        'motif': r"authentication failure;.* rhost=(?:{IP}|\S*)(?:\s+user=(?P<utilisateur>\S+))?\s*$",
+        'compter': False,
+        'exemples': ["Sep 29 03:29:39 localhost sshd[3396462]: pam_unix(sshd:auth): authentication failure; "
+                     "logname= uid=0 euid=0 tty=ssh ruser= rhost=89.208.103.230  user=root"],
+    },
+    {
+        'nom': 'sudo_echec',
+        'evenement': 'sudo incorrect password',
+        'litteral': 'incorrect password attempt',
+        'motif': r"sudo:\s+(?P<utilisateur>\S+) : \d+ incorrect password attempts?",
+        'compter': False,
+        'exemples': ["Sep 29 04:00:00 localhost sudo:    alice : 3 incorrect password attempts ; TTY=pts/0 ; "
+                     "PWD=/home/alice ; USER=root ; COMMAND=/bin/bash"],
+    },
+    {
+        'nom': 'sudo_commande',
+        'evenement': 'sudo',
+        'litteral': ' : TTY=',
+        'motif': r"sudo:\s+(?P<utilisateur>\S+) : TTY=",
+        'compter': False,
+        'exemples': ["Sep 29 04:01:00 localhost sudo:    alice : TTY=pts/0 ; PWD=/home/alice ; USER=root ; "
+                     "COMMAND=/usr/bin/systemctl restart sshd"],
+    },
+)
+
+
+def charger_regles(fichier_config='config.ini'):
+    """
+    Charge les règles d'extraction déclarées dans le fichier de configuration, dans des sections
+    '[regle <nom>]' avec les clés 'evenement', 'litteral', 'motif' et, facultativement, 'compter'
+    et 'exemples' (une ligne par exemple). Si aucune règle n'est déclarée, les règles par défaut
+    sont utilisées.
+
+    Paramètres :
+    fichier_config (str) : Chemin du fichier de configuration.
+
+    Retourne :
+    list : Liste de dictionnaires décrivant les règles, dans l'ordre de déclaration.
+    """
+    config = configparser.ConfigParser(interpolation=None)  # Les motifs peuvent contenir des '%'
+    config.read(fichier_config)
+
+    regles = []
+    for section in config.sections():
+        if not section.startswith('regle '):
+            continue
+        try:
+            regles.append({
+                'nom': section[len('regle '):].strip(),
+                'evenement': config[section]['evenement'],
+                'litteral': config[section]['litteral'],
+                'motif': config[section]['motif'],
+                'compter': config[section].getboolean('compter', fallback=True),
+                'exemples': [ligne for ligne in config[section].get('exemples', '').splitlines() if ligne.strip()],
+            })
+        except KeyError as e:
+            print(f"Règle '{section}' ignorée : clé {e} manquante dans '{fichier_config}'.")
+
+    return regles if regles else [dict(regle) for regle in REGLES_PAR_DEFAUT]
+
+
+class MoteurRegles:
+    def __init__(self, regles):
+        """
+        Compile les règles d'extraction. Les lignes candidates sont repérées en parcourant le bloc entier une
+        fois par littéral (bytes.find) : ce repérage croît donc avec le nombre de règles. Chaque ligne est
+        ensuite confiée à la seule règle dont le littéral y apparaît en premier, si bien que chaque ligne
+        candidate ne subit qu'une seule expression rationnelle.
+
+        Paramètres :
+        regles (list) : Liste de dictionnaires décrivant les règles (voir charger_regles).
+        """
+        self.regles = []
+        self.regexes = []
+        self.evenements = []  # Libellé (bytes) de l'événement de chaque règle
+        self.litteraux = []  # (littéral en bytes, indice de la règle)
+        for regle in regles:
+            litteral = regle['litteral'].encode()
+            if not litteral or any(litteral == autre for autre, _ in self.litteraux):
+                print(f"Règle '{regle['nom']}' ignorée : littéral vide ou déjà utilisé par une autre règle.")
+                continue
+            motif = regle['motif']
+            for macro, sous_motif in MACROS.items():
+                motif = motif.replace(macro, sous_motif)
+            try:
+                regex = re.compile(motif.encode())
+            except re.error as e:
+                print(f"Règle '{regle['nom']}' ignorée : motif invalide ({e}).")
+                continue
+
+            self.litteraux.append((litteral, len(self.regles)))
+            self.regles.append(regle)
+            self.regexes.append(regex)
+            self.evenements.append(regle['evenement'].encode())
+
+        # Groupes nommés de chaque règle (une règle peut ne capturer ni utilisateur ni adresse IP)
+        self.groupes = [(regex.groupindex.get('utilisateur'), regex.groupindex.get('ip')) for regex in self.regexes]
+        # Événements pris en compte pour la détection des adresses IP trop actives
+        self.evenements_comptes = {regle['evenement'] for regle in self.regles if regle.get('compter', True)}
+        # Empreinte des règles, pour invalider les événements mis en cache avec d'autres règles
+        description = repr([(regle['evenement'], regle['litteral'], regle['motif']) for regle in self.regles])
+        self.signature = hashlib.sha1(description.encode()).hexdigest()[:12]
+
+    def lignes_candidates(self, bloc):
+        """
+        Renvoie les lignes du bloc contenant le littéral d'une règle, dans l'ordre du fichier, chacune avec
+        l'indice de la règle dont le littéral y apparaît en premier.
+
+        Retourne :
+        list : Liste de tuples (position de début de ligne, indice de la règle).
+        """
+        candidates = {}  # début de ligne -> (position du littéral, indice de la règle)
+        trouver = bloc.find
+        trouver_avant = bloc.rfind
+        for litteral, indice in self.litteraux:
+            position = trouver(litteral)
+            while position != -1:
+                debut = trouver_avant(b'\n', 0, position) + 1
+                precedente = candidates.get(debut)
+                if precedente is None or position < precedente[0]:
+                    candidates[debut] = (position, indice)
+                fin_ligne = trouver(b'\n', position)
+                if fin_ligne == -1:
+                    break
+                position = trouver(litteral, fin_ligne)
+        return sorted((debut, indice) for debut, (_, indice) in candidates.items())
+
+    def analyser(self, bloc, debut, fin, indice):
+        """
+        Applique une règle à une ligne du bloc.
+
+        Paramètres :
+        bloc (bytes) : Bloc de lignes de logs.
+        debut (int) : Position de début de la ligne.
+        fin (int) : Position de fin de la ligne (sans la fin de ligne).
+        indice (int) : Indice de la règle à appliquer.
+
+        Retourne :
+        tuple : (horodatage, evenement, utilisateur, adresse_ip, hote) en bytes (utilisateur et adresse IP
+                vides si la règle ne les capture pas ; hôte lu dans l'en-tête syslog), ou None si la ligne
+                ne correspond pas à la règle.
+        """
+        if fin > debut and bloc[fin - 1] == 13:  # Fin de ligne '\r\n'
+            fin -= 1
+        if not REGEX_HORODATAGE.match(bloc, debut, fin):
+            return None
+        # L'hôte qui a émis la ligne suit l'horodatage ; la règle s'applique au reste de la ligne
+        fin_hote = bloc.find(b' ', debut + 16, fin)
+        if fin_hote == -1:
+            return None
+        match = self.regexes[indice].search(bloc, fin_hote + 1, fin)
+        if match is None:
+            return None
+        groupe_utilisateur, groupe_ip = self.groupes[indice]
+        utilisateur = (match.group(groupe_utilisateur) or b'') if groupe_utilisateur else b''
+        adresse_ip = (match.group(groupe_ip) or b'') if groupe_ip else b''
+        return bloc[debut:debut + 15], self.evenements[indice], utilisateur, adresse_ip, bloc[debut + 16:fin_hote]
+
+    def analyser_ligne(self, ligne):
+        """
+        Analyse une ligne isolée (pour tester les règles).
+
+        Paramètres :
+        ligne (str) : La ligne de log.
+
+        Retourne :
+        tuple : (nom de la règle, evenement, utilisateur, adresse_ip) en str, ou None si aucune règle ne s'applique.
+        """
+        bloc = ligne.rstrip('\r\n').encode()
+        for debut, indice in self.lignes_candidates(bloc):
+            resultat = self.analyser(bloc, debut, len(bloc), indice)
+            if resultat is not None:
+                _, evenement, utilisateur, adresse_ip, _ = resultat
+                return (self.regles[indice]['nom'], evenement.decode(), utilisateur.decode('utf-8', 'backslashreplace'),
+                        adresse_ip.decode())
+        return None
@@ -0,0 +1,228 @@
+import os
+import time
+import fnmatch
+import select
+import ctypes
+import ctypes.util
+from modules.compression import detecter_compression, TAILLE_ENTETE
+from modules.extraction import TAILLE_BLOC
+
+# Événements inotify surveillés sur le répertoire (modification, création, renommage, suppression de fichiers)
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+MASQUE_INOTIFY = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class Inotify:
+    def __init__(self, repertoire):
+        """
+        Surveillance d'un répertoire avec inotify (Linux), via la libc et ctypes.
+        Lève OSError si inotify n'est pas disponible.
+
+        Paramètres :
+        repertoire (str) : Répertoire à surveiller.
+        """
+        nom_libc = ctypes.util.find_library('c')
+        if nom_libc is None:
+            raise OSError("libc introuvable")
+        libc = ctypes.CDLL(nom_libc, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify n'est pas disponible sur ce système")
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+        if libc.inotify_add_watch(self.fd, os.fsencode(repertoire), MASQUE_INOTIFY) < 0:
+            erreur = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(erreur, f"inotify_add_watch a échoué sur {repertoire}")
+
+    def attendre(self, delai):
+        """
+        Attend un événement sur le répertoire, au plus delai secondes, sans consommer de CPU.
+        Les événements en attente sont vidés : seul le réveil compte, le répertoire est ensuite réexaminé.
+
+        Retourne :
+        bool : True si un événement a été reçu.
+        """
+        pret, _, _ = select.select([self.fd], [], [], delai)
+        if not pret:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def fermer(self):
+        os.close(self.fd)
+
+
+class SuiviFichiers:
+    def __init__(self, repertoire, pattern="secure*", etat=None, intervalle_sondage=1.0):
+        """
+        Suit en continu les fichiers de logs d'un répertoire à mesure qu'ils grossissent (à la manière de
+        'tail -F'). Le réveil se fait par inotify lorsqu'il est disponible, sinon par sondage périodique (stat).
+        Les fichiers sont identifiés par device:inode : un fichier renommé par logrotate est lu jusqu'au bout,
+        puis le nouveau fichier est suivi depuis son début.
+
+        Paramètres :
+        repertoire (str) : Répertoire contenant les fichiers de logs.
+        pattern (str) : Pattern des fichiers à suivre.
+        etat (EtatLecture) : État de lecture pour reprendre là où le démon s'était arrêté.
+        intervalle_sondage (float) : Délai entre deux examens sans inotify, en secondes.
+        """
+        self.repertoire = repertoire
+        self.pattern = pattern
+        self.etat = etat
+        self.intervalle_sondage = intervalle_sondage
+        self.fichiers = {}  # 'device:inode' -> {'chemin', 'fichier', 'position', 'reste'}
+        self.compresses = {}  # 'device:inode' -> fichier compressé ou non, pour ne pas le rouvrir à chaque examen
+        self.demarrage = True  # Au premier examen, les fichiers sans état sont suivis depuis leur fin
+
+        try:
+            self.inotify = Inotify(repertoire)
+            print(f"Surveillance du répertoire {repertoire} avec inotify.")
+        except (OSError, AttributeError) as e:
+            self.inotify = None
+            print(f"inotify indisponible ({e}), sondage toutes les {intervalle_sondage} s.")
+
+    def __chemins_presents(self):
+        """
+        Renvoie les chemins des fichiers correspondant au pattern (archives compressées comprises).
+        """
+        return [os.path.join(self.repertoire, nom) for nom in os.listdir(self.repertoire)
+                if fnmatch.fnmatch(nom, self.pattern)]
+
+    def __fichiers_presents(self):
+        """
+        Renvoie les fichiers non compressés correspondant au pattern, indexés par 'device:inode'. Le format
+        d'un fichier n'est lu qu'une fois par inode, dès que son en-tête est complet.
+        """
+        presents = {}
+        compresses = {}
+        for chemin in self.__chemins_presents():
+            try:
+                stat = os.stat(chemin)
+                cle = f"{stat.st_dev}:{stat.st_ino}"
+                compresse = self.compresses.get(cle)
+                if compresse is None:
+                    compresse = detecter_compression(chemin) is not None
+                if stat.st_size >= TAILLE_ENTETE:
+                    # Mémorisé seulement une fois l'en-tête complet (une archive peut être en cours d'écriture)
+                    compresses[cle] = compresse
+                if not compresse:
+                    presents[cle] = (chemin, stat)
+            except (FileNotFoundError, IsADirectoryError):
+                continue
+        self.compresses = compresses
+        return presents
+
+    def __ouvrir(self, cle, chemin, stat):
+        """
+        Commence le suivi d'un fichier, à la position enregistrée dans l'état, à sa fin s'il existait déjà
+        au démarrage, ou à son début s'il vient d'apparaître.
+        """
+        if self.etat is not None and cle in self.etat.fichiers:
+            position = self.etat.position(chemin, stat)
+        elif self.demarrage:
+            position = stat.st_size
+        else:
+            position = 0
+
+        fichier = open(chemin, 'rb')
+        fichier.seek(position)
+        self.fichiers[cle] = {'chemin': chemin, 'fichier': fichier, 'position': position, 'reste': b''}
+
+    def __lire_ajouts(self, suivi, stat):
+        """
+        Générateur qui lit par blocs les octets ajoutés à un fichier suivi et renvoie les lignes complètes.
+        Une ligne en cours d'écriture est conservée jusqu'à l'examen suivant.
+        """
+        if stat is not None and stat.st_size < suivi['position']:
+            print(f"Le fichier {suivi['chemin']} a été tronqué, lecture depuis le début.")
+            suivi['fichier'].seek(0)
+            suivi['position'] = 0
+            suivi['reste'] = b''
+
+        while True:
+            donnees = suivi['fichier'].read(TAILLE_BLOC)
+            if not donnees:
+                break
+            suivi['position'] += len(donnees)
+            donnees = suivi['reste'] + donnees
+            fin = donnees.rfind(b'\n') + 1
+            suivi['reste'] = donnees[fin:]
+
+            if self.etat is not None and stat is not None:
+                self.etat.mettre_a_jour(suivi['chemin'], stat, suivi['position'] - len(suivi['reste']))
+            if fin:
+                yield donnees[:fin]
+
+    def verifier(self):
+        """
+        Générateur qui examine le répertoire : ouvre les nouveaux fichiers, renvoie les blocs de lignes
+        complètes ajoutées aux fichiers suivis, et termine la lecture des fichiers disparus (renommés hors
+        du pattern ou supprimés) avant de les fermer.
+        """
+        presents = self.__fichiers_presents()
+
+        disparus = False
+        for cle, suivi in list(self.fichiers.items()):
+            if cle in presents:
+                continue
+            yield from self.__lire_ajouts(suivi, None)
+            suivi['fichier'].close()
+            del self.fichiers[cle]
+            disparus = True
+
+        if self.etat is not None and (disparus or self.demarrage):
+            # Oublier les fichiers qui n'existent plus (rotation définitive, compression, suppression), au
+            # démarrage puis après chaque disparition : sans cela, l'état garderait chaque inode tourné
+            self.etat.nettoyer(self.__chemins_presents())
+
+        for cle, (chemin, stat) in presents.items():
+            if cle not in self.fichiers:
+                try:
+                    self.__ouvrir(cle, chemin, stat)
+                except FileNotFoundError:
+                    continue
+            suivi = self.fichiers[cle]
+            if suivi['chemin'] != chemin:
+                print(f"Rotation détectée : {suivi['chemin']} a été renommé en {chemin}.")
+                suivi['chemin'] = chemin
+            yield from self.__lire_ajouts(suivi, stat)
+
+        self.demarrage = False
+
+    def attendre(self):
+        """
+        Attend la prochaine activité dans le répertoire (inotify) ou le prochain sondage.
+        Avec inotify, un examen est tout de même fait régulièrement par sécurité.
+        """
+        if self.inotify is not None:
+            self.inotify.attendre(max(self.intervalle_sondage, 5.0))
+        else:
+            time.sleep(self.intervalle_sondage)
+
+    def surveiller(self):
+        """
+        Générateur infini qui renvoie, à chaque examen du répertoire, un générateur des blocs de lignes ajoutées.
+        """
+        while True:
+            yield self.verifier()
+            self.attendre()
+
+    def fermer(self):
+        """
+        Ferme les fichiers suivis et la surveillance inotify.
+        """
+        for suivi in self.fichiers.values():
+            suivi['fichier'].close()
+        self.fichiers.clear()
+        if self.inotify is not None:
+            self.inotify.fermer()
@@ -1,20 +1,95 @@
-import re
-
-# Exemple de ligne de log
-log_line = "Sep 29 03:29:38 localhost sshd[3396462]: Invalid user roott from 89.208.103.230 port 57294"
-
-# Expression rationnelle
-regex = r"([A-Za-z]{3} \d{2} \d{2}:\d{2}:\d{2}) .* (Invalid user|Failed password) (\w+) from (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"
-
-# Extraction des informations
-match = re.search(regex, log_line)
-if match:
-    date_heure = match.group(1)
-    evenement = match.group(2)
-    utilisateur = match.group(3)
-    adresse_ip = match.group(4)
-
-    print(f"Date et heure : {date_heure}")
-    print(f"Événement : {evenement}")
-    print(f"Utilisateur : {utilisateur}")
-    print(f"Adresse IP : {adresse_ip}")
\ No newline at end of file
+import sys
+from modules.regles import MoteurRegles, charger_regles
+
+# Lignes de test des règles par défaut : (ligne de log, (règle, événement, utilisateur, adresse IP) attendus,
+# ou None si aucune règle ne doit s'appliquer)
+CAS_DE_TEST = [
+    ("Sep 29 03:29:38 localhost sshd[3396462]: Invalid user roott from 89.208.103.230 port 57294",
+     ('sshd_utilisateur_invalide', 'Invalid user', 'roott', '89.208.103.230')),
+    ("Sep  9 03:29:38 localhost sshd[3396462]: Invalid user admin test from 2001:db8::1 port 57294",
+     ('sshd_utilisateur_invalide', 'Invalid user', 'admin test', '2001:db8::1')),
+    ("Sep 29 03:29:38 localhost sshd[3396462]: Invalid user  from 89.208.103.230 port 57294",
+     ('sshd_utilisateur_invalide', 'Invalid user', '', '89.208.103.230')),
+    ("Sep 29 03:29:38 localhost sshd[3396462]: Invalid user j.doe-2 from ::ffff:10.1.2.3",
+     ('sshd_utilisateur_invalide', 'Invalid user', 'j.doe-2', '::ffff:10.1.2.3')),
+    ("Sep 29 03:29:40 localhost sshd[3396462]: Failed password for root from 89.208.103.230 port 57294 ssh2",
+     ('sshd_echec_mot_de_passe', 'Failed password', 'root', '89.208.103.230')),
+    ("Sep 29 03:29:40 localhost sshd[3396462]: Failed password for invalid user roott from 89.208.103.230 port 57294 ssh2",
+     None),
+    ("Sep 29 03:30:01 localhost sshd[3396470]: Accepted publickey for bob from fe80::1%eth0 port 50022 ssh2",
+     ('sshd_connexion_acceptee', 'Accepted', 'bob', 'fe80::1%eth0')),
+    ("Sep 29 03:29:39 localhost sshd[3396462]: pam_unix(sshd:auth): authentication failure; logname= uid=0 "
+     "euid=0 tty=ssh ruser= rhost=89.208.103.230  user=root",
+     ('pam_echec_authentification', 'PAM authentication failure', 'root', '89.208.103.230')),
+    ("Sep 29 03:29:39 localhost login[812]: pam_unix(login:auth): authentication failure; logname=LOGIN uid=0 "
+     "euid=0 tty=tty1 ruser= rhost=",
+     ('pam_echec_authentification', 'PAM authentication failure', '', '')),
+    ("Sep 29 04:00:00 localhost sudo:    alice : 3 incorrect password attempts ; TTY=pts/0 ; PWD=/home/alice ; "
+     "USER=root ; COMMAND=/bin/bash",
+     ('sudo_echec', 'sudo incorrect password', 'alice', '')),
+    ("Sep 29 04:01:00 localhost sudo:    alice : TTY=pts/0 ; PWD=/home/alice ; USER=root ; COMMAND=/bin/bash",
+     ('sudo_commande', 'sudo', 'alice', '')),
+    ("Sep 29 03:29:41 localhost sshd[3396462]: Connection closed by invalid user roott 89.208.103.230 port 57294 [preauth]",
+     None),
+    ("Invalid user roott from 89.208.103.230 port 57294", None),
+    # Nom d'utilisateur choisi par l'attaquant pour imputer la tentative à une autre adresse IP : c'est
+    # toujours la dernière adresse de la ligne, écrite par sshd, qui est retenue
+    ("Sep 29 03:29:38 localhost sshd[3396462]: Invalid user a from 10.0.0.1 port 1 from 1.2.3.4 port 5555",
+     ('sshd_utilisateur_invalide', 'Invalid user', 'a from 10.0.0.1 port 1', '1.2.3.4')),
+    ("Sep 29 03:29:38 localhost sshd[3396462]: Invalid user a from 10.0.0.1 from 2001:db8::9 port 5555",
+     ('sshd_utilisateur_invalide', 'Invalid user', 'a from 10.0.0.1', '2001:db8::9')),
+    ("Sep 29 03:29:40 localhost sshd[3396462]: Failed password for a from 10.0.0.1 port 1 ssh2 from 1.2.3.4 port 5555 ssh2",
+     ('sshd_echec_mot_de_passe', 'Failed password', 'a from 10.0.0.1 port 1 ssh2', '1.2.3.4')),
+    ("Sep 29 03:30:01 localhost sshd[3396470]: Accepted password for a from 10.0.0.1 port 1 from 1.2.3.4 port 5555 ssh2",
+     ('sshd_connexion_acceptee', 'Accepted', 'a from 10.0.0.1 port 1', '1.2.3.4')),
+    ("Sep 29 03:30:01 localhost sshd[3396470]: Accepted publickey for bob from 192.0.2.10 port 50022 ssh2: "
+     "RSA SHA256:2Kf0bZ8n1M9s",
+     ('sshd_connexion_acceptee', 'Accepted', 'bob', '192.0.2.10')),
+    # Texte ajouté après la fin attendue d'une ligne sshd : rien n'est imputé
+    ("Sep 29 03:29:38 localhost sshd[3396462]: Invalid user a from 1.2.3.4 port 5555 from 10.0.0.1 junk", None),
+]
+
+
+def tester_regles(moteur, cas_de_test):
+    """
+    Vérifie les règles sur leurs lignes d'exemple (chaque exemple doit être reconnu par sa propre règle)
+    et sur les cas de test fournis.
+
+    Paramètres :
+    moteur (MoteurRegles) : Les règles compilées.
+    cas_de_test (list) : Liste de tuples (ligne de log, résultat attendu).
+
+    Retourne :
+    int : Le nombre d'échecs.
+    """
+    echecs = 0
+    for regle in moteur.regles:
+        for exemple in regle.get('exemples', []):
+            resultat = moteur.analyser_ligne(exemple)
+            if resultat is None or resultat[0] != regle['nom']:
+                echecs += 1
+                print(f"ÉCHEC  règle '{regle['nom']}' : exemple non reconnu par la règle ({resultat})\n       {exemple}")
+            else:
+                print(f"OK     règle '{regle['nom']}' : {resultat[1:]}")
+
+    for ligne, attendu in cas_de_test:
+        resultat = moteur.analyser_ligne(ligne)
+        if resultat != attendu:
+            echecs += 1
+            print(f"ÉCHEC  {ligne}\n       attendu : {attendu}\n       obtenu  : {resultat}")
+        else:
+            print(f"OK     {ligne[:80]}")
+    return echecs
+
+
+if __name__ == '__main__':
+    # Règles de la configuration (ou règles par défaut) : les cas de test ne s'appliquent qu'aux règles par défaut
+    fichier_config = sys.argv[1] if len(sys.argv) > 1 else 'config.ini'
+    regles = charger_regles(fichier_config)
+    moteur = MoteurRegles(regles)
+    noms_par_defaut = {attendu[0] for _, attendu in CAS_DE_TEST if attendu}
+    cas_de_test = CAS_DE_TEST if noms_par_defaut <= {regle['nom'] for regle in moteur.regles} else []
+
+    echecs = tester_regles(moteur, cas_de_test)
+    print(f"\n{len(moteur.regles)} règle(s) testée(s), {echecs} échec(s).")
+    sys.exit(1 if echecs else 0)
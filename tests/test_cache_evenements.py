@@ -0,0 +1,58 @@
+import os
+import time
+import pytest
+from modules.cache_evenements import CacheEvenements
+from modules.log_reader import LogReader
+
+
+def ecrire_log(repertoire):
+    fichier_log = repertoire / 'secure'
+    fichier_log.write_text("".join(f"Sep 29 03:29:{seconde:02d} localhost sshd[1]: Invalid user admin "
+                                   f"from 10.0.0.1 port 1\n" for seconde in range(20)))
+    # Fichier tourné, qui ne change plus : il est mis en cache
+    ancien = time.time() - 3600
+    os.utime(fichier_log, (ancien, ancien))
+    return str(fichier_log)
+
+
+def lire(repertoire, cache, workers=1):
+    lecteur = LogReader(str(repertoire), cache=cache)
+    fichiers_logs = lecteur.trouver_fichiers_logs()
+    if workers > 1:
+        lecteur.lire_et_extraire_logs_parallele(fichiers_logs, workers)
+    else:
+        for fichier_log in fichiers_logs:
+            lecteur.lire_et_extraire_logs(fichier_log)
+    return len(lecteur.colonnes)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_evenements_conserves_si_le_cache_ne_peut_pas_etre_ecrit(tmp_path, monkeypatch, workers):
+    ecrire_log(tmp_path)
+    cache = CacheEvenements(repertoire=str(tmp_path / 'cache'))
+
+    def disque_plein(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr('modules.cache_evenements.np.savez', disque_plein)
+
+    assert lire(tmp_path, cache, workers) == 20
+    assert not any(nom.endswith('.tmp') for nom in os.listdir(tmp_path / 'cache'))
+
+
+def test_cache_desactive_si_le_repertoire_ne_peut_pas_etre_cree(tmp_path):
+    ecrire_log(tmp_path)
+    (tmp_path / 'fichier').write_text("")
+    # Le répertoire du cache ne peut pas être créé (un fichier porte déjà ce chemin)
+    cache = CacheEvenements(repertoire=str(tmp_path / 'fichier' / 'cache'))
+    assert not cache.actif
+    assert lire(tmp_path, cache) == 20
+    assert lire(tmp_path, cache) == 20
+
+
+
+def test_fichier_inchange_charge_depuis_le_cache(tmp_path, capsys):
+    ecrire_log(tmp_path)
+    cache = CacheEvenements(repertoire=str(tmp_path / 'cache'))
+    assert lire(tmp_path, cache) == 20
+    assert lire(tmp_path, cache) == 20
+    assert "chargées depuis le cache" in capsys.readouterr().out
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'analyse.py')
+
+
+def modules_charges(*arguments, repertoire=None):
+    processus = subprocess.run([sys.executable, '-X', 'importtime', SCRIPT, *arguments], cwd=repertoire,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    return {ligne.rsplit('|', 1)[1].strip() for ligne in processus.stderr.splitlines()
+            if ligne.startswith('import time:')}
+
+
+def test_aide_et_rapport_sans_dependances_lourdes(tmp_path):
+    for arguments in (['--help'], ['rapport', 'top']):
+        charges = modules_charges(*arguments, repertoire=tmp_path)
+        assert not charges & {'numpy', 'pandas', 'http.server', 'cProfile', 'tracemalloc'}, arguments
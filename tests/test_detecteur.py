@@ -0,0 +1,52 @@
+import sys
+import pandas as pd
+from modules.detecteur import DetecteurFenetreGlissante
+
+DEBUT = pd.Timestamp('2024-09-29 03:00:00')
+
+
+def secondes(*valeurs):
+    return [(DEBUT + pd.Timedelta(seconds=valeur)).value for valeur in valeurs]
+
+
+def test_nombre_d_acces_reel_de_l_alerte():
+    detecteur = DetecteurFenetreGlissante(fenetre='1min', seuil=10)
+    # 25 accès en 24 secondes : une seule alerte, au franchissement du seuil (11e accès), avec les 25 accès
+    alertes = detecteur.ajouter_lot(secondes(*range(25)), ['10.0.0.1'] * 25)
+    assert alertes == [((DEBUT + pd.Timedelta(seconds=10), '10.0.0.1'), 25)]
+
+
+def test_nouvelle_alerte_apres_retour_sous_le_seuil():
+    detecteur = DetecteurFenetreGlissante(fenetre='1min', seuil=10)
+    horodatages = secondes(*range(15), *range(200, 215))
+    alertes = detecteur.ajouter_lot(horodatages, ['10.0.0.1'] * 30)
+    assert [nombre_acces for _, nombre_acces in alertes] == [15, 15]
+    assert detecteur.adresses_en_alerte() == {'10.0.0.1'}
+
+
+def ligne(seconde, adresse_ip):
+    horodatage = DEBUT + pd.Timedelta(seconds=seconde)
+    return f"{horodatage:%b %d %H:%M:%S} localhost sshd[1]: Failed password for root from {adresse_ip} port 22 ssh2\n"
+
+
+def test_rafale_a_cheval_sur_deux_executions_signalee_une_fois(tmp_path, monkeypatch, capsys):
+    import analyse
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'logs').mkdir()
+    fichier_log = tmp_path / 'logs' / 'secure'
+    # Rafale de 10.0.0.1 signalée à 03:00:54 et toujours en cours à 03:01:08 ; la dernière fenêtre conservée
+    # (à partir de 03:00:15, dernier événement à 03:01:15) ne contient que 10 de ses accès
+    lignes = [ligne(seconde, '10.0.0.1') for seconde in (*range(0, 15, 2), *range(50, 70, 2))]
+    fichier_log.write_text("".join(lignes) + ligne(75, '10.0.0.9'))
+    monkeypatch.setattr(sys, 'argv', ['analyse.py', 'logs', '--incremental', '--seuil', '10'])
+    analyse.main()
+    assert "Accès suspects détectés" in capsys.readouterr().out
+
+    # Accès suivant de la même rafale (11 accès dans la fenêtre) : pas de nouvelle alerte
+    with open(fichier_log, 'a') as f:
+        f.write(ligne(76, '10.0.0.1'))
+    analyse.main()
+    sortie = capsys.readouterr().out
+    assert "Aucun nouvel événement" not in sortie
+    assert "Accès suspects détectés" not in sortie
@@ -0,0 +1,66 @@
+import os
+import pandas as pd
+from modules.generateur_logs import GenerateurLogs
+from modules.log_reader import LogReader
+
+
+def lire(repertoire, workers=1, taille_segment=None):
+    """
+    Lit et extrait tous les fichiers 'secure*' du répertoire, en séquentiel ou en parallèle.
+
+    Retourne :
+    pd.DataFrame : Les colonnes extraites, dans l'ordre de fusion (avant tout tri).
+    """
+    lecteur = LogReader(str(repertoire))
+    fichiers_logs = lecteur.trouver_fichiers_logs()
+    if workers > 1:
+        lecteur.lire_et_extraire_logs_parallele(fichiers_logs, workers, taille_segment=taille_segment)
+    else:
+        for fichier_log in fichiers_logs:
+            lecteur.lire_et_extraire_logs(fichier_log)
+    return lecteur.colonnes.vers_dataframe()
+
+
+def test_lecture_parallele_identique_a_la_lecture_sequentielle(tmp_path):
+    # Un fichier courant et deux fichiers tournés, dont un compressé (lu d'un bloc)
+    GenerateurLogs(graine=3).generer(tmp_path, 30_000, rotations=2, compression='gzip')
+
+    sequentiel = lire(tmp_path)
+    # Segments de 4 Kio : des centaines de coupures, dont beaucoup au milieu d'une rafale d'attaque
+    parallele = lire(tmp_path, workers=2, taille_segment=4096)
+
+    assert len(sequentiel) > 5_000
+    # Mêmes lignes dans le même ordre, et mêmes catégories dans le même ordre (codes identiques)
+    pd.testing.assert_frame_equal(sequentiel, parallele)
+    for colonne in ('Evenement', 'Utilisateur', 'AdresseIP', 'Hote'):
+        assert list(sequentiel[colonne].cat.categories) == list(parallele[colonne].cat.categories)
+
+
+def test_segment_coupe_en_debut_de_ligne(tmp_path):
+    # Une seule ligne plus longue qu'un segment : elle n'est pas coupée
+    fichier_log = tmp_path / 'secure'
+    ligne = "Sep 29 03:29:38 localhost sshd[1]: Invalid user " + "a" * 10_000 + " from 10.0.0.1 port 1\n"
+    fichier_log.write_text(ligne * 3)
+
+    sequentiel = lire(tmp_path)
+    parallele = lire(tmp_path, workers=2, taille_segment=4096)
+
+    assert len(sequentiel) == 3
+    pd.testing.assert_frame_equal(sequentiel, parallele)
+
+
+def test_fichier_illisible_ignore_comme_en_lecture_sequentielle(tmp_path, monkeypatch):
+    # Pool de processus même sur une machine à un seul cœur
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    GenerateurLogs(graine=5).generer(tmp_path, 5_000, rotations=2, compression='gzip')
+    archives = [chemin for chemin in tmp_path.iterdir() if chemin.read_bytes()[:2] == b'\x1f\x8b']
+    assert archives
+    # Archive tronquée (EOFError à la décompression) et entrée illisible (IsADirectoryError dès l'ouverture)
+    archives[0].write_bytes(archives[0].read_bytes()[:len(archives[0].read_bytes()) // 2])
+    (tmp_path / 'secure.d').mkdir()
+
+    sequentiel = lire(tmp_path)
+    parallele = lire(tmp_path, workers=2, taille_segment=4096)
+
+    assert len(sequentiel) > 0
+    pd.testing.assert_frame_equal(sequentiel, parallele)
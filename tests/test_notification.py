@@ -0,0 +1,152 @@
+import email
+import socket
+import time
+import pandas as pd
+import pytest
+from modules.notification import Notification
+
+controller_module = pytest.importorskip("aiosmtpd.controller")
+
+
+class BoiteReception:
+    """
+    Gestionnaire du serveur SMTP de test : conserve chaque message reçu avec le port source de la connexion.
+    """
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        message = email.message_from_bytes(envelope.content)
+        corps = next(partie for partie in message.walk() if partie.get_content_type() == 'text/plain')
+        self.messages.append({'port_source': session.peer[1], 'destinataires': envelope.rcpt_tos,
+                              'sujet': message['Subject'], 'corps': corps.get_payload(decode=True).decode()})
+        return '250 OK'
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def serveur_smtp():
+    boite = BoiteReception()
+    controleur = controller_module.Controller(boite, hostname='127.0.0.1', port=port_libre())
+    controleur.start()
+    boite.port = controleur.port
+    yield boite
+    controleur.stop()
+
+
+def ecrire_config(tmp_path, port, fichier_historique=None, max_emails_par_heure=10, fenetre_regroupement=60):
+    fichier_config = tmp_path / 'config.ini'
+    fichier_config.write_text(f"""
+[smtp]
+server = 127.0.0.1
+port = {port}
+starttls = false
+
+[email]
+recipient = admin@example.com, secu@example.com
+
+[notification]
+fenetre_regroupement = {fenetre_regroupement}
+max_emails_par_heure = {max_emails_par_heure}
+delai_suppression = 3600
+fichier_historique = {fichier_historique or tmp_path / 'historique.json'}
+""")
+    return str(fichier_config)
+
+
+def alerte(adresse_ip, minute, nombre_acces=12):
+    return ((pd.Timestamp(f'2024-09-29 03:{minute:02d}:00'), adresse_ip), nombre_acces)
+
+
+def test_connexion_reutilisee_et_reconnexion(serveur_smtp, tmp_path):
+    notification = Notification(fichier_config=ecrire_config(tmp_path, serveur_smtp.port))
+    notification.envoyer_email("Sujet 1", "Contenu 1")
+    notification.envoyer_email("Sujet 2", "Contenu 2")
+    # Connexion coupée sans prévenir (serveur redémarré, délai d'inactivité) : reconnexion transparente
+    notification.serveur.sock.shutdown(socket.SHUT_RDWR)
+    notification.envoyer_email("Sujet 3", "Contenu 3")
+    notification.fermer()
+
+    assert [message['sujet'] for message in serveur_smtp.messages] == ["Sujet 1", "Sujet 2", "Sujet 3"]
+    ports = [message['port_source'] for message in serveur_smtp.messages]
+    assert ports[0] == ports[1] != ports[2]
+    assert notification.emails_envoyes == 3 and notification.emails_en_echec == 0
+
+
+def test_recapitulatif_par_adresse_ip(serveur_smtp, tmp_path):
+    notification = Notification(fichier_config=ecrire_config(tmp_path, serveur_smtp.port))
+    notification.envoyer_notification_evenements_critiques(
+        [alerte('10.0.0.1', 1, 12), alerte('10.0.0.2', 2, 15), alerte('10.0.0.1', 5, 20)])
+    notification.fermer()
+
+    # Un email par destinataire, avec une ligne par adresse IP
+    assert sorted(destinataire for message in serveur_smtp.messages for destinataire in message['destinataires']) \
+        == ['admin@example.com', 'secu@example.com']
+    corps = serveur_smtp.messages[0]['corps']
+    assert "- 10.0.0.1 : 2 alerte(s), 32 accès entre 2024-09-29 03:01:00 et 2024-09-29 03:05:00" in corps
+    assert "- 10.0.0.2 : 1 alerte(s), 15 accès" in corps
+
+
+def test_avis_de_gpt_joint_aux_alertes(serveur_smtp, tmp_path):
+    notification = Notification(fichier_config=ecrire_config(tmp_path, serveur_smtp.port))
+    notification.envoyer_notification_evenements_critiques(
+        [alerte('10.0.0.1', 1), alerte('10.0.0.2', 2)], avis={'10.0.0.1': "activité légitime (bouchon)"})
+    notification.fermer()
+
+    # L'avis accompagne l'alerte, sans la supprimer
+    lignes = serveur_smtp.messages[0]['corps'].splitlines()
+    assert any(ligne.startswith("- 10.0.0.1 : 1 alerte(s)") and ligne.endswith("avis de GPT : activité légitime (bouchon)")
+               for ligne in lignes)
+    assert any(ligne.startswith("- 10.0.0.2 : 1 alerte(s)") and "avis" not in ligne for ligne in lignes)
+
+
+def test_limite_d_envois_par_destinataire(serveur_smtp, tmp_path):
+    notification = Notification(fichier_config=ecrire_config(tmp_path, serveur_smtp.port, max_emails_par_heure=2))
+    for numero in range(3):
+        notification.envoyer_notification_evenements_critiques([alerte(f'10.0.0.{numero}', numero)])
+    notification.fermer()
+
+    # Deux emails par destinataire ; la troisième adresse IP reste en attente
+    assert len(serveur_smtp.messages) == 4
+    assert all('10.0.0.2' not in message['corps'] for message in serveur_smtp.messages)
+    assert all('10.0.0.2' in en_attente for en_attente in notification.en_attente.values())
+
+
+def test_doublons_supprimes_d_une_execution_a_l_autre(serveur_smtp, tmp_path):
+    fichier_config = ecrire_config(tmp_path, serveur_smtp.port, max_emails_par_heure=2)
+    premiere = Notification(fichier_config=fichier_config)
+    premiere.envoyer_notification_evenements_critiques([alerte('10.0.0.1', 1)])
+    premiere.fermer()
+
+    # Exécution suivante : l'adresse déjà signalée est ignorée, et l'envoi précédent compte dans la limite
+    seconde = Notification(fichier_config=fichier_config)
+    seconde.envoyer_notification_evenements_critiques([alerte('10.0.0.1', 2), alerte('10.0.0.9', 2)])
+    seconde.envoyer_notification_evenements_critiques([alerte('10.0.0.8', 3)])
+    seconde.fermer()
+
+    corps = [message['corps'] for message in serveur_smtp.messages if message['destinataires'] == ['admin@example.com']]
+    assert len(corps) == 2
+    assert '10.0.0.1' in corps[0]
+    assert '10.0.0.9' in corps[1] and '10.0.0.1' not in corps[1]
+
+
+def test_envoi_asynchrone_malgre_un_historique_impossible_a_sauvegarder(serveur_smtp, tmp_path):
+    # Répertoire inexistant : chaque sauvegarde de l'historique échoue
+    fichier_config = ecrire_config(tmp_path, serveur_smtp.port, fenetre_regroupement=0,
+                                   fichier_historique=tmp_path / 'absent' / 'historique.json')
+    notification = Notification(asynchrone=True, fichier_config=fichier_config)
+    notification.envoyer_notification_evenements_critiques([alerte('10.0.0.1', 1)])
+    notification.envoyer_email("Sujet", "Contenu")
+    notification.envoyer_notification_evenements_critiques([alerte('10.0.0.2', 2)])
+    time.sleep(0.5)
+    assert notification.thread.is_alive()
+    notification.fermer()
+
+    corps = " ".join(message['corps'] for message in serveur_smtp.messages)
+    assert '10.0.0.1' in corps and '10.0.0.2' in corps
+    assert any(message['sujet'] == "Sujet" for message in serveur_smtp.messages)
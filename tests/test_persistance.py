@@ -0,0 +1,89 @@
+import sqlite3
+import pandas as pd
+from modules.persistance import BaseEvenements, CUMULS
+
+
+def evenements(*lignes):
+    """DataFrame d'événements à partir de tuples (date, adresse IP, utilisateur, événement)."""
+    return pd.DataFrame({
+        'DateHeure': pd.to_datetime([ligne[0] for ligne in lignes]),
+        'AdresseIP': [ligne[1] for ligne in lignes],
+        'Utilisateur': [ligne[2] for ligne in lignes],
+        'Evenement': [ligne[3] for ligne in lignes],
+    })
+
+
+def verifier_cumuls(base):
+    """Vérifie que chaque table de cumuls correspond au décompte des événements de la table de base."""
+    for table, periode in CUMULS.items():
+        attendu = base.cn.execute(f'''
+            SELECT {periode}, adresse_ip, evenement, utilisateur, COUNT(*) FROM evenement_suspect
+            GROUP BY 1, adresse_ip, evenement, utilisateur ORDER BY 1, 2, 3, 4
+        ''').fetchall()
+        obtenu = base.cn.execute(f'''
+            SELECT periode, adresse_ip, evenement, utilisateur, nombre FROM {table} ORDER BY 1, 2, 3, 4
+        ''').fetchall()
+        assert obtenu == attendu, table
+
+
+LOT_1 = [
+    ('2024-09-29 03:29:38', '10.0.0.1', 'root', 'Échec de connexion'),
+    ('2024-09-29 03:29:38', '10.0.0.1', 'root', 'Échec de connexion'),
+    ('2024-09-29 03:59:59', '10.0.0.2', 'admin', 'Utilisateur invalide'),
+    ('2024-09-29 04:00:00', '10.0.0.1', 'root', 'Échec de connexion'),
+]
+
+
+def test_lots_chevauchants(tmp_path):
+    base = BaseEvenements(str(tmp_path / 'logs.db'))
+    assert base.inserer(evenements(*LOT_1)) == 4
+    verifier_cumuls(base)
+
+    # Relecture du même fichier complété : seuls les événements nouveaux sont comptés (insertion partielle)
+    lot_2 = LOT_1 + [
+        ('2024-09-29 03:29:38', '10.0.0.1', 'root', 'Échec de connexion'),  # 3e occurrence de la seconde
+        ('2024-09-30 00:00:01', '10.0.0.2', 'admin', 'Utilisateur invalide'),
+    ]
+    assert base.inserer(evenements(*lot_2)) == 2
+    assert base.inserer(evenements(*lot_2)) == 0
+    verifier_cumuls(base)
+
+    assert base.plus_actifs() == [('10.0.0.1', 4, 1), ('10.0.0.2', 2, 2)]
+    assert base.serie('heure') == [('2024-09-29 03:00', 4), ('2024-09-29 04:00', 1), ('2024-09-30 00:00', 1)]
+    assert base.historique_adresse('10.0.0.1')['jours'] == [('2024-09-29', 'Échec de connexion', 4, 1)]
+    base.fermer()
+
+
+def test_mode_demon(tmp_path):
+    base = BaseEvenements(str(tmp_path / 'logs.db'))
+    # Lots successifs coupés au milieu d'une seconde : les occurrences se poursuivent d'un lot à l'autre
+    assert base.inserer(evenements(*LOT_1[:2]), suite=True) == 2
+    assert base.inserer(evenements(LOT_1[1], *LOT_1[2:]), suite=True) == 3
+    verifier_cumuls(base)
+    assert base.serie('jour') == [('2024-09-29', 5)]
+    base.fermer()
+
+
+def test_migration_ancienne_base(tmp_path):
+    chemin = str(tmp_path / 'logs.db')
+    # Base d'une version précédente : ni occurrence, ni hôte, ni cumuls
+    cn = sqlite3.connect(chemin)
+    cn.execute('''
+        CREATE TABLE evenement_suspect (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, date_heure DATETIME, evenement TEXT,
+            utilisateur TEXT, adresse_ip TEXT
+        )
+    ''')
+    cn.executemany('INSERT INTO evenement_suspect (date_heure, adresse_ip, utilisateur, evenement) VALUES (?, ?, ?, ?)',
+                   LOT_1)
+    cn.commit()
+    cn.close()
+
+    base = BaseEvenements(chemin)
+    verifier_cumuls(base)
+    # Les lignes identiques existantes sont numérotées : leur réinsertion est ignorée
+    assert base.inserer(evenements(*LOT_1)) == 0
+    assert base.inserer(evenements(*LOT_1, ('2024-09-29 05:00:00', '10.0.0.3', 'test', 'Échec de connexion'))) == 1
+    verifier_cumuls(base)
+    assert sorted(base.plus_actifs(critere='utilisateur')) == [('admin', 1, 1), ('root', 3, 1), ('test', 1, 1)]
+    base.fermer()
@@ -0,0 +1,76 @@
+import heapq
+import ipaddress
+import random
+from modules.prefixes import IndexPrefixes
+
+
+def prefixes_de(adresse_ip):
+    """
+    Préfixes suivis (longueurs par défaut) contenant une adresse IP.
+    """
+    version = ipaddress.ip_address(adresse_ip).version
+    return [ipaddress.ip_network(f"{adresse_ip}/{longueur}", strict=False)
+            for longueur in ((24, 16) if version == 4 else (64, 48))]
+
+
+def decomptes(index, prefixes_vus, horodatage=None):
+    """
+    Décompte de chaque préfixe vu, par l'interface publique de l'index.
+    """
+    return [(index.decompte(str(reseau), horodatage), reseau) for reseau in prefixes_vus]
+
+
+def plus_actifs_par_parcours(decomptes_prefixes, k, longueur=None):
+    """
+    Référence : classement de tous les préfixes vus.
+    """
+    candidats = [(nombre, (reseau.version, reseau.prefixlen, int(reseau.network_address)), str(reseau), nb_adresses)
+                 for (nombre, nb_adresses), reseau in decomptes_prefixes
+                 if nombre and (longueur is None or reseau.prefixlen == longueur)]
+    # Même ordre que l'index à nombre d'accès égal : (version, longueur, réseau)
+    return [(prefixe, nombre, nb_adresses) for nombre, _, prefixe, nb_adresses in heapq.nlargest(k, candidats)]
+
+
+def test_plus_actifs_identique_au_parcours_complet():
+    hasard = random.Random(5)
+    for essai in range(6):
+        # Petite limite de préfixes (oublis fréquents) ou grande ; trafic dense ou clairsemé (purges)
+        max_prefixes = 50 if essai % 3 == 0 else 100_000
+        index = IndexPrefixes(fenetre='1min', max_prefixes=max_prefixes)
+        prefixes_vus = set()
+        horodatage = 0
+        for numero in range(2000):
+            horodatage += int(hasard.expovariate(1 / (0.2e9 if essai % 2 else 2e9)))
+            if hasard.random() < 0.05:
+                adresse_ip = f"2001:db8:{hasard.randrange(3):x}::{hasard.randrange(99):x}"
+            elif hasard.random() < 0.7:
+                adresse_ip = f"10.{hasard.randrange(4)}.{hasard.randrange(8)}.{hasard.randrange(256)}"
+            else:
+                adresse_ip = f"{hasard.randrange(1, 200)}.{hasard.randrange(256)}.{hasard.randrange(256)}.1"
+            index.ajouter_lot([horodatage], [adresse_ip])
+            prefixes_vus.update(prefixes_de(adresse_ip))
+            assert len(index) <= max_prefixes
+
+            if numero % 101 == 0:
+                for instant in (None, horodatage, horodatage + int(hasard.uniform(0, 120e9))):
+                    decomptes_prefixes = decomptes(index, prefixes_vus, instant)
+                    for k in (1, 5, 20):
+                        for longueur in (None, 24, 16, 64):
+                            assert index.plus_actifs(k, instant, longueur) == \
+                                plus_actifs_par_parcours(decomptes_prefixes, k, longueur)
+
+
+def test_decompte_et_taux():
+    index = IndexPrefixes(fenetre='1min', seuil=3, adresses_min=2)
+    seconde = 1_000_000_000
+    alertes = index.ajouter_lot([0, seconde, 2 * seconde, 3 * seconde],
+                                ['203.0.113.1', '203.0.113.2', '203.0.113.1', '203.0.114.9'])
+    assert alertes and alertes[0][0][1] == '203.0.0.0/16'
+    assert len(index) == 3  # 203.0.113.0/24, 203.0.114.0/24 et 203.0.0.0/16
+    assert index.decompte('203.0.113.0/24') == (3, 2)
+    assert index.decompte('203.0.113.77/24', 3 * seconde) == (3, 2)
+    assert index.decompte('198.51.100.0/24') == (0, 0)
+    assert index.taux('203.0.0.0/16', 3 * seconde) == 4 / 60
+    # Fenêtre entièrement écoulée
+    assert index.decompte('203.0.0.0/16', 120 * seconde)[0] == 0
+    assert index.taux('203.0.0.0/16', 120 * seconde) == 0.0
@@ -0,0 +1,121 @@
+import asyncio
+import calendar
+import pytest
+from modules.recepteur_syslog import RecepteurSyslog, ProtocoleTCP, ProtocoleUDP
+
+MESSAGE = b"Failed password for root from 10.0.0.1 port 22 ssh2"
+
+
+def date_locale(annee, mois, jour, heure, minute, seconde):
+    """Date syslog locale attendue pour un instant UTC."""
+    return RecepteurSyslog.formater_date(calendar.timegm((annee, mois, jour, heure, minute, seconde)))
+
+
+@pytest.fixture
+def recepteur():
+    recepteur = RecepteurSyslog(taille_lot=1000, taille_file=2)
+    recepteur.lot_pret = asyncio.Event()
+    return recepteur
+
+
+def test_rfc3164(recepteur):
+    ligne = b"Sep 29 03:29:38 srv1 sshd[12]: " + MESSAGE
+    assert recepteur.convertir_message(b"<38>" + ligne + b"\n", b"192.0.2.1") == ligne
+    # Sans hôte : l'adresse de l'émetteur est insérée avant l'étiquette
+    assert recepteur.convertir_message(b"<38>Sep 29 03:29:38 sshd[12]: " + MESSAGE, b"192.0.2.1") == \
+        b"Sep 29 03:29:38 192.0.2.1 sshd[12]: " + MESSAGE
+
+
+def test_rfc5424_fuseaux(recepteur):
+    attendu = date_locale(2024, 9, 29, 3, 29, 38) + b" srv1 sshd[12]: " + MESSAGE
+    assert recepteur.convertir_message(b"<38>1 2024-09-29T03:29:38.123Z srv1 sshd 12 - - " + MESSAGE,
+                                       b"192.0.2.1") == attendu
+    # 05:29:38 à UTC+2 et 22:59:38 la veille à UTC-04:30 : même instant
+    assert recepteur.convertir_message(b"<38>1 2024-09-29T05:29:38+02:00 srv1 sshd 12 - - " + MESSAGE,
+                                       b"192.0.2.1") == attendu
+    assert recepteur.convertir_message(b"<38>1 2024-09-28T22:59:38-04:30 srv1 sshd 12 - - " + MESSAGE,
+                                       b"192.0.2.1") == attendu
+
+
+def test_rfc5424_sans_hote_donnees_structurees_et_bom(recepteur):
+    date = date_locale(2024, 9, 29, 3, 29, 38)
+    # Hôte et processus absents ('-'), données structurées avec un ']' échappé, indicateur d'ordre des octets
+    message = (b'<38>1 2024-09-29T03:29:38Z - sshd - ID47 [exemple@32473 cle="a\\]b"][autre x="1"] '
+               b'\xef\xbb\xbf' + MESSAGE)
+    assert recepteur.convertir_message(message, b"192.0.2.1") == date + b" 192.0.2.1 sshd: " + MESSAGE
+    # Données structurées non terminées : message invalide
+    assert recepteur.convertir_message(b'<38>1 2024-09-29T03:29:38Z srv1 sshd 12 - [x="1" ' + MESSAGE,
+                                       b"192.0.2.1") is None
+
+
+def test_message_sans_horodatage(recepteur):
+    ligne = recepteur.convertir_message(b"<38>" + MESSAGE, b"192.0.2.1")
+    assert ligne.endswith(b" 192.0.2.1 " + MESSAGE) and len(ligne) == 16 + len(b"192.0.2.1 ") + len(MESSAGE)
+
+
+class FauxTransport:
+    def __init__(self):
+        self.suspendu = False
+
+    def get_extra_info(self, nom):
+        return ('192.0.2.1', 40000)
+
+    def pause_reading(self):
+        self.suspendu = True
+
+    def resume_reading(self):
+        self.suspendu = False
+
+
+def connexion(recepteur):
+    protocole = ProtocoleTCP(recepteur)
+    transport = FauxTransport()
+    protocole.connection_made(transport)
+    return protocole, transport
+
+
+def test_tcp_trames_prefixees_par_leur_longueur_et_decoupees(recepteur):
+    protocole, _ = connexion(recepteur)
+    trames = b"".join(b"%d %s" % (len(message), message)
+                      for message in (b"<38>Sep 29 03:29:38 srv1 sshd[1]: " + MESSAGE,
+                                      b"<38>Sep 29 03:29:39 srv1 sshd[2]: ligne\navec fin de ligne"))
+    # Flux reçu par morceaux de 7 octets, coupés au milieu des longueurs et des messages
+    for debut in range(0, len(trames), 7):
+        protocole.data_received(trames[debut:debut + 7])
+    assert recepteur.lot == [b"Sep 29 03:29:38 srv1 sshd[1]: " + MESSAGE,
+                             b"Sep 29 03:29:39 srv1 sshd[2]: ligne avec fin de ligne"]
+    assert protocole.tampon == b""
+
+    # Trame invalide : le flux en attente est abandonné
+    protocole.data_received(b"pas une longueur valide")
+    assert protocole.tampon == b"" and len(recepteur.lot) == 2
+
+
+def test_tcp_trames_delimitees_par_une_fin_de_ligne(recepteur):
+    protocole, _ = connexion(recepteur)
+    protocole.data_received(b"<38>Sep 29 03:29:38 srv1 sshd[1]: Fail")
+    assert recepteur.lot == []
+    protocole.data_received(b"ed\n\n<38>Sep 29 03:29:39 srv1 sshd[2]: x\n<38>Sep")
+    assert recepteur.lot == [b"Sep 29 03:29:38 srv1 sshd[1]: Failed", b"Sep 29 03:29:39 srv1 sshd[2]: x"]
+    assert protocole.tampon == b"<38>Sep"
+
+
+def test_saturation_et_desaturation(recepteur):
+    _, transport = connexion(recepteur)
+    udp = ProtocoleUDP(recepteur)
+    for numero in range(2):
+        recepteur.ajouter(b"<38>Sep 29 03:29:38 srv1 sshd[1]: " + MESSAGE, '192.0.2.1')
+        recepteur.clore_lot()
+    # File pleine (2 lots) : lecture TCP suspendue, datagrammes UDP perdus
+    assert recepteur.sature and transport.suspendu
+    udp.datagram_received(MESSAGE, ('192.0.2.2', 514))
+    assert recepteur.messages_perdus == 1
+    # Une nouvelle connexion est suspendue dès son ouverture
+    assert connexion(recepteur)[1].suspendu
+
+    # File vidée de moitié : reprise
+    recepteur.file.popleft()
+    recepteur.desaturer()
+    assert not recepteur.sature and not transport.suspendu
+    udp.datagram_received(b"<38>Sep 29 03:29:40 srv1 sshd[1]: " + MESSAGE, ('192.0.2.2', 514))
+    assert recepteur.messages_perdus == 1 and recepteur.lot
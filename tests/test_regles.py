@@ -0,0 +1,7 @@
+import testre
+from modules.regles import MoteurRegles, REGLES_PAR_DEFAUT
+
+
+def test_regles_par_defaut():
+    # Mêmes vérifications que 'python testre.py' : exemples des règles et tableau des résultats attendus
+    assert testre.tester_regles(MoteurRegles(list(REGLES_PAR_DEFAUT)), testre.CAS_DE_TEST) == 0
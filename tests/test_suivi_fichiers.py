@@ -0,0 +1,33 @@
+from modules import suivi_fichiers
+from modules.etat_lecture import EtatLecture
+from modules.suivi_fichiers import SuiviFichiers
+
+
+def lire_tout(suivi):
+    return b"".join(suivi.verifier())
+
+
+def test_pas_d_ecriture_ni_de_reouverture_au_repos(tmp_path, monkeypatch):
+    fichier_log = tmp_path / 'secure'
+    fichier_log.write_bytes(b"")
+    detections = []
+    detecter_compression = suivi_fichiers.detecter_compression
+    monkeypatch.setattr(suivi_fichiers, 'detecter_compression',
+                        lambda chemin: detections.append(chemin) or detecter_compression(chemin))
+
+    etat = EtatLecture(str(tmp_path / 'etat.json'))
+    suivi = SuiviFichiers(str(tmp_path), etat=etat)
+    lire_tout(suivi)
+    with open(fichier_log, 'ab') as f:
+        f.write(b"Sep 29 03:29:38 localhost sshd[1]: Invalid user admin from 10.0.0.1 port 1\n")
+    assert lire_tout(suivi).startswith(b"Sep 29")
+    assert etat.modifie
+    etat.sauvegarder()
+
+    # Examens au repos : l'état n'a pas changé et le format du fichier n'est plus relu
+    nb_detections = len(detections)
+    for _ in range(3):
+        assert lire_tout(suivi) == b""
+        assert not etat.modifie
+    assert len(detections) == nb_detections
+    suivi.fermer()